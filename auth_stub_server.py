@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Emergent OAuth session-data service.
+Lets the /auth/process-session flow run offline, with injectable latency and failures.
+
+Usage:
+    python auth_stub_server.py --port 8090 --latency 0.2 --failure-rate 0.1
+    AUTH_SESSION_URL=http://localhost:8090/auth/v1/env/oauth/session-data uvicorn server:app
+
+Session ids:
+    invalid*  -> 404 (rejected session)
+    error*    -> 500
+    hang*     -> never answers (exercises the read timeout)
+    anything else -> a user derived from the session id
+"""
+
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+def make_app(latency: float, jitter: float, failure_rate: float) -> web.Application:
+    stats = {"requests": 0, "failures": 0}
+
+    async def session_data(request: web.Request) -> web.Response:
+        stats["requests"] += 1
+        session_id = request.headers.get("X-Session-ID", "")
+        await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+        if not session_id or session_id.startswith("invalid"):
+            return web.json_response({"detail": "Invalid session"}, status=404)
+        if session_id.startswith("hang"):
+            await asyncio.sleep(3600)
+        if session_id.startswith("error") or random.random() < failure_rate:
+            stats["failures"] += 1
+            return web.json_response({"detail": "Upstream failure"}, status=500)
+
+        return web.json_response({
+            "id": session_id,
+            "email": f"{session_id}@stub.local",
+            "name": f"Stub User {session_id}",
+            "picture": "https://example.com/avatar.png",
+            "session_token": f"stub-token-{session_id}",
+        })
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_get("/auth/v1/env/oauth/session-data", session_data)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- delay in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    args = parser.parse_args()
+
+    web.run_app(make_app(args.latency, args.jitter, args.failure_rate), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""App-scoped HTTP client for the OAuth session-data exchange"""
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+class InvalidSessionError(Exception):
+    """The identity provider rejected the session id"""
+
+class AuthServiceUnavailable(Exception):
+    """The identity provider is down, timing out, or the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; lets one trial call through after `reset_after` seconds.
+
+    Other callers are rejected while the trial is in flight; a trial that never reports back (e.g. its
+    request was cancelled) is given up on after another `reset_after` seconds.
+    """
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state != "half-open":
+            return state == "closed"
+        now = time.monotonic()
+        if self.trial_started_at is not None and now - self.trial_started_at < self.reset_after:
+            return False
+        self.trial_started_at = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold or self.state == "half-open":
+            self.opened_at = time.monotonic()
+        self.trial_started_at = None
+
+class SessionDataClient:
+    """Session-data exchange with retries; `total_timeout` bounds one exchange across all its attempts"""
+
+    def __init__(
+        self,
+        url: str,
+        connect_timeout: float = 3,
+        read_timeout: float = 10,
+        total_timeout: float = 15,
+        max_retries: int = 2,
+        pool_size: int = 100,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # Created lazily so it binds to the running event loop, and so aiohttp is only imported
+        # by workers that actually exchange a session
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            timeout = aiohttp.ClientTimeout(total=None, connect=self.connect_timeout, sock_read=self.read_timeout)
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def fetch_session_data(self, session_id: str) -> dict:
+        import aiohttp
+
+        if not self.breaker.allow():
+            raise AuthServiceUnavailable("Auth service circuit breaker is open")
+
+        deadline = time.monotonic() + self.total_timeout
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                backoff = 0.1 * 2 ** (attempt - 1)
+                if time.monotonic() + backoff >= deadline:
+                    break
+                await asyncio.sleep(backoff)
+            # Each attempt only gets what is left of the budget, so retries cannot multiply it
+            timeout = aiohttp.ClientTimeout(total=deadline - time.monotonic(), connect=self.connect_timeout, sock_read=self.read_timeout)
+            try:
+                async with self._get_session().get(self.url, headers={"X-Session-ID": session_id}, timeout=timeout) as resp:
+                    if resp.status < 500:
+                        # The provider answered, so it is healthy even if it rejects the session
+                        self.breaker.record_success()
+                        if resp.status != 200:
+                            raise InvalidSessionError(f"Auth service returned {resp.status}")
+                        return await resp.json()
+                    last_error = f"Auth service returned {resp.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = f"{type(e).__name__}: {e}"
+            logger.warning("Session exchange attempt %d failed: %s", attempt + 1, last_error)
+
+        self.breaker.record_failure()
+        raise AuthServiceUnavailable(last_error)
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "total_timeout": self.total_timeout,
+            "max_retries": self.max_retries,
+            "breaker_state": self.breaker.state,
+            "breaker_trial_in_flight": self.breaker.trial_started_at is not None,
+            "consecutive_failures": self.breaker.failures,
+        }
@@ -0,0 +1,144 @@
+"""Category -> subcategory -> product tree, joined in memory from the reference collections"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Source collections; the tree is rebuilt whenever one of their versions changes
+CATALOG_SOURCES = ("categories", "subcategories", "brands", "products")
+NODE_TYPES = ("category", "subcategory", "product")
+MAX_DEPTH = len(NODE_TYPES)
+
+CATEGORY_FIELDS = {"_id": 0, "id": 1, "name": 1, "code": 1, "status": 1}
+SUBCATEGORY_FIELDS = {"_id": 0, "id": 1, "name": 1, "code": 1, "status": 1, "category_id": 1}
+BRAND_FIELDS = {"_id": 0, "id": 1, "name": 1, "short_name": 1, "status": 1}
+PRODUCT_FIELDS = {"_id": 0, "id": 1, "name": 1, "ean_code": 1, "mrp": 1, "status": 1, "brand_id": 1, "subcategory_id": 1}
+
+# Id of the category and subcategory that hold products and subcategories whose parent does not exist
+UNASSIGNED = "unassigned"
+
+def _by_name(docs: List[dict]) -> List[dict]:
+    return sorted(docs, key=lambda doc: str(doc.get("name") or "").lower())
+
+class CatalogTree:
+    """The joined catalog for one set of source versions.
+
+    Built with dict lookups (brand by id, children grouped by parent id) in one pass over each
+    collection; `render` then cuts depth-limited views or single subtrees out of it. Products and
+    subcategories whose parent is missing are listed under an "Unassigned" category.
+    Building is CPU-bound for large catalogs; callers construct it off the event loop.
+    """
+
+    def __init__(self, categories: List[dict], subcategories: List[dict], brands: List[dict], products: List[dict]):
+        categories, subcategories, products = self._adopt_orphans(categories, subcategories, products)
+        brand_by_id = {brand["id"]: brand for brand in brands}
+        self.products_by_subcategory: Dict[str, List[dict]] = {}
+        for product in _by_name(products):
+            brand = brand_by_id.get(product.get("brand_id"))
+            node = {
+                "node": f"product:{product['id']}",
+                "type": "product",
+                "id": product["id"],
+                "name": product.get("name"),
+                "ean_code": product.get("ean_code"),
+                "mrp": product.get("mrp"),
+                "status": product.get("status"),
+                "brand": {"id": brand["id"], "name": brand.get("name"), "short_name": brand.get("short_name")} if brand else None,
+            }
+            self.products_by_subcategory.setdefault(product.get("subcategory_id"), []).append(node)
+
+        self.subcategories_by_category: Dict[str, List[dict]] = {}
+        self.subcategories: Dict[str, dict] = {}
+        for subcategory in _by_name(subcategories):
+            node = {
+                "node": f"subcategory:{subcategory['id']}",
+                "type": "subcategory",
+                "id": subcategory["id"],
+                "name": subcategory.get("name"),
+                "code": subcategory.get("code"),
+                "status": subcategory.get("status"),
+                "counts": {"products": len(self.products_by_subcategory.get(subcategory["id"], []))},
+            }
+            self.subcategories[subcategory["id"]] = node
+            self.subcategories_by_category.setdefault(subcategory.get("category_id"), []).append(node)
+
+        self.categories: Dict[str, dict] = {}
+        self.roots: List[dict] = []
+        for category in _by_name(categories):
+            children = self.subcategories_by_category.get(category["id"], [])
+            node = {
+                "node": f"category:{category['id']}",
+                "type": "category",
+                "id": category["id"],
+                "name": category.get("name"),
+                "code": category.get("code"),
+                "status": category.get("status"),
+                "counts": {
+                    "subcategories": len(children),
+                    "products": sum(child["counts"]["products"] for child in children),
+                },
+            }
+            self.categories[category["id"]] = node
+            self.roots.append(node)
+
+    @staticmethod
+    def _adopt_orphans(categories: List[dict], subcategories: List[dict], products: List[dict]) -> Tuple[List[dict], List[dict], List[dict]]:
+        """Move products and subcategories whose parent does not exist under an Unassigned category"""
+        category_ids = {category["id"] for category in categories}
+        subcategory_ids = {subcategory["id"] for subcategory in subcategories}
+        orphan_subcategories = sum(1 for subcategory in subcategories if subcategory.get("category_id") not in category_ids)
+        orphan_products = sum(1 for product in products if product.get("subcategory_id") not in subcategory_ids)
+        if not orphan_subcategories and not orphan_products:
+            return categories, subcategories, products
+
+        logger.warning("Catalog tree: %d products and %d subcategories without a parent are listed under Unassigned", orphan_products, orphan_subcategories)
+        subcategories = [
+            subcategory if subcategory.get("category_id") in category_ids else {**subcategory, "category_id": UNASSIGNED}
+            for subcategory in subcategories
+        ]
+        products = [
+            product if product.get("subcategory_id") in subcategory_ids else {**product, "subcategory_id": UNASSIGNED}
+            for product in products
+        ]
+        if orphan_products:
+            subcategories.append({"id": UNASSIGNED, "name": "Unassigned", "category_id": UNASSIGNED})
+        return categories + [{"id": UNASSIGNED, "name": "Unassigned"}], subcategories, products
+
+    @staticmethod
+    async def fetch(db) -> Tuple[List[dict], List[dict], List[dict], List[dict]]:
+        """The source documents, in constructor order"""
+        return (
+            await db.categories.find({}, CATEGORY_FIELDS).to_list(length=None),
+            await db.subcategories.find({}, SUBCATEGORY_FIELDS).to_list(length=None),
+            await db.brands.find({}, BRAND_FIELDS).to_list(length=None),
+            await db.products.find({}, PRODUCT_FIELDS).to_list(length=None),
+        )
+
+    def _children(self, node: dict) -> Optional[List[dict]]:
+        if node["type"] == "category":
+            return self.subcategories_by_category.get(node["id"], [])
+        if node["type"] == "subcategory":
+            return self.products_by_subcategory.get(node["id"], [])
+        return None
+
+    def _render(self, node: dict, depth: int) -> dict:
+        children = self._children(node)
+        if children is None:
+            return node
+        if depth <= 1:
+            # Collapsed: counts tell the client whether expanding is worthwhile
+            return {**node, "children": None}
+        return {**node, "children": [self._render(child, depth - 1) for child in children]}
+
+    def render(self, depth: int = MAX_DEPTH, node: Optional[str] = None) -> List[dict]:
+        """Top-level nodes down to `depth` levels, or the subtree under one "category:<id>"/"subcategory:<id>" node.
+
+        Collapsed nodes carry "children": null; raises KeyError for an unknown node.
+        """
+        if node is None:
+            return [self._render(root, depth) for root in self.roots]
+        node_type, _, node_id = node.partition(":")
+        parent = {"category": self.categories, "subcategory": self.subcategories}.get(node_type, {}).get(node_id)
+        if parent is None:
+            raise KeyError(node)
+        return [self._render(child, depth) for child in self._children(parent)]
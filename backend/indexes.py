@@ -0,0 +1,118 @@
+"""Declared MongoDB indexes, created idempotently at startup and audited on demand"""
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+def _unique_id():
+    return IndexModel([("id", ASCENDING)], name="id_unique", unique=True)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        _unique_id(),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "sessions": [
+        IndexModel([("session_token", ASCENDING), ("is_active", ASCENDING)], name="session_token_active"),
+        # Sessions are removed by the server once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "departments": [_unique_id()],
+    "brands": [_unique_id()],
+    "categories": [_unique_id()],
+    "subcategories": [
+        _unique_id(),
+        IndexModel([("category_id", ASCENDING)], name="category_id"),
+    ],
+    "products": [
+        _unique_id(),
+        # Catalog imports upsert on ean_code
+        IndexModel([("ean_code", ASCENDING)], name="ean_code_unique", unique=True),
+        IndexModel([("brand_id", ASCENDING)], name="brand_id"),
+        IndexModel([("category_id", ASCENDING), ("subcategory_id", ASCENDING)], name="category_subcategory"),
+    ],
+    "plans": [_unique_id()],
+    "planning_data": [
+        _unique_id(),
+        # One row per cell; bulk upserts and create_planning_data rely on it (see migrations.ensure_unique_cells)
+        IndexModel(
+            [("plan_id", ASCENDING), ("department_id", ASCENDING), ("product_id", ASCENDING)],
+            name="plan_department_product",
+            unique=True
+        ),
+    ],
+    "notifications": [
+        _unique_id(),
+        # One index per $or branch in get_notifications, in _id (newest first) order
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)], name="user_recent"),
+        IndexModel([("department_id", ASCENDING), ("_id", DESCENDING)], name="department_recent"),
+    ],
+    "plan_totals": [
+        IndexModel([("plan_id", ASCENDING), ("level", ASCENDING)], name="plan_level"),
+    ],
+    "notification_reads": [
+        IndexModel([("user_id", ASCENDING), ("notification_id", ASCENDING)], name="user_notification_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("notification_oid", ASCENDING)], name="user_notification_oid"),
+    ],
+    "report_jobs": [
+        # Results for superseded data versions are never served again; keep a week for polling clients
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "notification_counters": [
+        IndexModel([("department_id", ASCENDING)], name="department_id"),
+        IndexModel([("admin", ASCENDING)], name="admin"),
+    ],
+}
+
+async def ensure_indexes(db):
+    """Create every declared index; existing ones are left untouched"""
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                await db[collection].create_indexes([index])
+            except OperationFailure as e:
+                # e.g. duplicate data blocking a unique index, or a conflicting definition
+                logger.warning("Could not create index %s.%s: %s", collection, index.document["name"], e)
+
+def _key(spec) -> tuple:
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in spec)
+
+async def audit_indexes(db) -> Dict[str, dict]:
+    """Report missing, unused, redundant and undeclared indexes per collection"""
+    report = {}
+    existing_collections = set(await db.list_collection_names())
+    for collection in sorted(set(INDEXES) | existing_collections):
+        declared = {_key(index.document["key"].items()): index.document["name"] for index in INDEXES.get(collection, [])}
+        info = await db[collection].index_information() if collection in existing_collections else {}
+        present = {name: _key(spec["key"]) for name, spec in info.items()}
+
+        usage = {}
+        if collection in existing_collections:
+            try:
+                async for stat in db[collection].aggregate([{"$indexStats": {}}]):
+                    usage[stat["name"]] = usage.get(stat["name"], 0) + int(stat["accesses"]["ops"])
+            except OperationFailure as e:
+                logger.warning("$indexStats unavailable for %s: %s", collection, e)
+
+        present_keys = set(present.values())
+        redundant = []
+        for name, key in present.items():
+            if name == "_id_" or info[name].get("unique") or "expireAfterSeconds" in info[name]:
+                continue
+            # A non-unique index is redundant when another index starts with the same keys
+            for other_name, other_key in present.items():
+                if other_name != name and len(other_key) > len(key) and other_key[:len(key)] == key:
+                    redundant.append({"name": name, "covered_by": other_name})
+                    break
+
+        report[collection] = {
+            "missing": [name for key, name in declared.items() if key not in present_keys],
+            "unused": sorted(name for name in present if name != "_id_" and usage.get(name) == 0),
+            "redundant": redundant,
+            "undeclared": sorted(name for name, key in present.items() if name != "_id_" and key not in declared),
+            "usage": usage,
+        }
+    return report
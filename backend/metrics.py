@@ -0,0 +1,232 @@
+"""Process-local Prometheus metrics: HTTP middleware, MongoDB command listener and text exposition"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Observations arrive from the event loop and from pymongo's monitoring threads
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in values]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (not cumulative) + overflow, sum]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = self.header()
+        for labels, counts, total in values:
+            lines += _histogram_lines(self.name, self.labelnames, labels, self.buckets, counts, total)
+        return lines
+
+def _histogram_lines(name: str, labelnames: Tuple[str, ...], labels: tuple, buckets: Tuple[float, ...], counts: List[int], total: float) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(buckets + (float("inf"),), counts):
+        cumulative += count
+        le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+        lines.append(f"{name}_bucket{_labels(labelnames, labels, le)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labelnames, labels)} {total}")
+    lines.append(f"{name}_count{_labels(labelnames, labels)} {cumulative}")
+    return lines
+
+class HttpMetrics:
+    """Requests, latency and response size per (method, route template), plus in-flight requests.
+
+    Only ever updated from the event loop, so unlike the generic metrics it takes no lock, and one
+    dict lookup per request covers all series.
+    """
+
+    LABELS = ("method", "route")
+
+    def __init__(self):
+        self.in_flight = 0
+        # (method, route) -> [latency bucket counts, latency sum, size bucket counts, size sum, {status: count}]
+        self._routes: Dict[tuple, list] = {}
+
+    def record(self, labels: tuple, status: int, seconds: float, size: int):
+        entry = self._routes.get(labels)
+        if entry is None:
+            entry = self._routes[labels] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, [0] * (len(SIZE_BUCKETS) + 1), 0, {}]
+        entry[0][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        entry[1] += seconds
+        entry[2][bisect.bisect_left(SIZE_BUCKETS, size)] += 1
+        entry[3] += size
+        statuses = entry[4]
+        statuses[status] = statuses.get(status, 0) + 1
+
+    def render(self) -> List[str]:
+        routes = [(labels, [list(entry[0]), entry[1], list(entry[2]), entry[3], dict(entry[4])]) for labels, entry in list(self._routes.items())]
+        lines = [
+            "# HELP http_requests_total HTTP requests by route template, method and status",
+            "# TYPE http_requests_total counter",
+        ]
+        for labels, entry in routes:
+            for status, count in entry[4].items():
+                lines.append(f"http_requests_total{_labels(self.LABELS + ('status',), labels + (status,))} {count}")
+        lines += [
+            "# HELP http_request_duration_seconds Time until the response body is fully sent",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for labels, entry in routes:
+            lines += _histogram_lines("http_request_duration_seconds", self.LABELS, labels, LATENCY_BUCKETS, entry[0], entry[1])
+        lines += [
+            "# HELP http_response_size_bytes Response body size",
+            "# TYPE http_response_size_bytes histogram",
+        ]
+        for labels, entry in routes:
+            lines += _histogram_lines("http_response_size_bytes", self.LABELS, labels, SIZE_BUCKETS, entry[2], entry[3])
+        lines += [
+            "# HELP http_requests_in_flight Requests currently being handled",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> bytes:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode()
+
+registry = MetricsRegistry()
+
+http = registry.register(HttpMetrics())
+mongo_latency = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trips by collection and command", ("collection", "command")))
+mongo_failures = registry.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands by collection and command", ("collection", "command")))
+operation_latency = registry.register(Histogram(
+    "app_operation_duration_seconds", "In-process work worth separating from route time (e.g. bcrypt)", ("operation",)))
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so timing adds no extra task or response copy per request.
+
+    Routes are labelled by their template (/api/plans/{plan_id}); unmatched paths share one label
+    to keep label cardinality bounded.
+    """
+
+    def __init__(self, app, exclude: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        state = [500, 0]
+
+        async def send_wrapper(message):
+            if "body" in message:
+                state[1] += len(message["body"])
+            elif "status" in message:
+                state[0] = message["status"]
+            await send(message)
+
+        http.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http.in_flight -= 1
+            route = scope.get("route")
+            http.record((scope["method"], route.path if route is not None else "unmatched"), state[0], time.perf_counter() - started, state[1])
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every driver command; pass to the client with event_listeners=[...]"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[int, object], str] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple[int, object]:
+        return event.request_id, event.connection_id
+
+    def started(self, event):
+        command = event.command
+        collection = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        self._collections[self._key(event)] = collection if isinstance(collection, str) else ""
+
+    def _labels(self, event) -> tuple:
+        return self._collections.pop(self._key(event), ""), event.command_name
+
+    def succeeded(self, event):
+        mongo_latency.observe(self._labels(event), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        labels = self._labels(event)
+        mongo_latency.observe(labels, event.duration_micros / 1e6)
+        mongo_failures.inc(labels)
+
+@contextmanager
+def timed(operation: str):
+    """Record the enclosed block in app_operation_duration_seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        operation_latency.observe((operation,), time.perf_counter() - started)
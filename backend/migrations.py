@@ -0,0 +1,158 @@
+"""Data fixes that declared indexes depend on.
+
+Startup only runs the non-destructive ones (run_migrations); merging duplicate planning cells changes
+user data and is run by hand with dedupe_planning_cells.py.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import List
+
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from indexes import INDEXES
+from plan_totals import apply_deltas
+
+logger = logging.getLogger(__name__)
+
+CELL_INDEX = "plan_department_product"
+# Rows folded into another row of the same cell by merge_duplicate_cells, kept for audit and recovery
+MERGED_COLLECTION = "planning_data_merged"
+
+class DuplicatePlanningCells(RuntimeError):
+    """planning_data has several rows for one (plan, department, product) cell, so the unique cell index cannot be built"""
+
+async def find_duplicate_cells(db) -> List[dict]:
+    """Cells with more than one row; each lists its rows newest first, the first being the one merged into"""
+    pipeline = [
+        {"$group": {
+            "_id": {"plan_id": "$plan_id", "department_id": "$department_id", "product_id": "$product_id"},
+            "rows": {"$push": {"_id": "$_id", "id": "$id", "planned": "$planned", "actual": "$actual", "updated_at": "$updated_at", "version": "$version"}},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    cells = []
+    async for cell in db.planning_data.aggregate(pipeline, allowDiskUse=True):
+        rows = sorted(cell["rows"], key=lambda row: (str(row.get("updated_at") or ""), row.get("version") or 0), reverse=True)
+        cells.append({
+            **cell["_id"],
+            "rows": rows,
+            "planned": sum(row.get("planned") or 0.0 for row in rows),
+            "actual": sum(row.get("actual") or 0.0 for row in rows),
+        })
+    return cells
+
+async def merge_duplicate_cells(db, apply: bool = False) -> dict:
+    """Fold every duplicate row into the most recently updated row of its cell, summing planned and actual.
+
+    Rollups and plan_totals already count every row, so the sums keep every reported figure unchanged.
+    Each folded row is removed with find_one_and_delete and its final value added to the survivor, so a
+    concurrent edit is never lost; the removed row is copied to planning_data_merged first. Without
+    `apply` nothing is written and the report shows what would be merged.
+    """
+    cells = await find_duplicate_cells(db)
+    merged = 0
+    if apply:
+        for cell in cells:
+            survivor, duplicates = cell["rows"][0], cell["rows"][1:]
+            for row in duplicates:
+                doc = await db.planning_data.find_one_and_delete({"_id": row["_id"]})
+                if doc is None:
+                    continue
+                await db[MERGED_COLLECTION].insert_one({
+                    **doc,
+                    "merged_into": survivor["id"],
+                    "merged_at": datetime.now(timezone.utc),
+                })
+                # A pipeline so a null planned/actual on the survivor counts as 0 instead of failing the $inc
+                await db.planning_data.update_one({"_id": survivor["_id"]}, [{"$set": {
+                    "planned": {"$add": [{"$ifNull": ["$planned", 0.0]}, doc.get("planned") or 0.0]},
+                    "actual": {"$add": [{"$ifNull": ["$actual", 0.0]}, doc.get("actual") or 0.0]},
+                    "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+                    "updated_at": {"$literal": datetime.now(timezone.utc).isoformat()},
+                }}])
+                # Planned and actual moved to the survivor; only the row count changes
+                await apply_deltas(db, [{**{key: cell[key] for key in ("plan_id", "department_id", "product_id")}, "rows": -1}])
+                merged += 1
+        if merged:
+            logger.warning("Merged %d duplicate planning_data rows in %d cells into %s", merged, len(cells), MERGED_COLLECTION)
+
+    return {
+        "applied": apply,
+        "cells": len(cells),
+        "duplicate_rows": sum(len(cell["rows"]) - 1 for cell in cells),
+        "merged": merged,
+        "details": [
+            {
+                **{key: cell[key] for key in ("plan_id", "department_id", "product_id", "planned", "actual")},
+                "keep": cell["rows"][0]["id"],
+                "merge": [row["id"] for row in cell["rows"][1:]],
+            }
+            for cell in cells
+        ],
+    }
+
+async def ensure_unique_cells(db):
+    """Create the unique cell index, replacing the non-unique one older deployments have.
+
+    Raises DuplicatePlanningCells while duplicate rows remain; nothing is changed then.
+    """
+    index = (await db.planning_data.index_information()).get(CELL_INDEX)
+    if index and index.get("unique"):
+        return
+
+    duplicates = await db.planning_data.aggregate([
+        {"$group": {"_id": {"plan_id": "$plan_id", "department_id": "$department_id", "product_id": "$product_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$count": "cells"},
+    ], allowDiskUse=True).to_list(length=1)
+    if duplicates and duplicates[0]["cells"]:
+        raise DuplicatePlanningCells(
+            f"{duplicates[0]['cells']} planning cells have more than one planning_data row; "
+            "review them with `python dedupe_planning_cells.py` and merge with --apply"
+        )
+
+    if index:
+        # The non-unique index has the same name and keys; it has to go before the unique one is created
+        try:
+            await db.planning_data.drop_index(CELL_INDEX)
+        except OperationFailure as e:
+            # Another worker dropped it first
+            logger.info("Could not drop %s: %s", CELL_INDEX, e)
+    model = next(index for index in INDEXES["planning_data"] if index.document["name"] == CELL_INDEX)
+    try:
+        await db.planning_data.create_indexes([model])
+    except DuplicateKeyError as e:
+        raise DuplicatePlanningCells(f"Duplicate planning cells were written while {CELL_INDEX} was built: {e}")
+
+async def convert_session_expiry(db, batch_size: int = 1000) -> int:
+    """Rewrite sessions stored with an ISO-string expires_at as BSON dates, so session lookups match
+    them again and the TTL index can expire them; unparseable ones are deleted.
+
+    Returns the number of sessions rewritten or deleted; finds nothing to do once every session is converted.
+    """
+    operations, changed = [], 0
+    async for session in db.sessions.find({"expires_at": {"$type": "string"}}, {"expires_at": 1}):
+        try:
+            expires_at = datetime.fromisoformat(session["expires_at"])
+        except ValueError:
+            operations.append(DeleteOne({"_id": session["_id"]}))
+        else:
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            operations.append(UpdateOne({"_id": session["_id"]}, {"$set": {"expires_at": expires_at}}))
+        if len(operations) >= batch_size:
+            changed += len(operations)
+            await db.sessions.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        changed += len(operations)
+        await db.sessions.bulk_write(operations, ordered=False)
+    if changed:
+        logger.warning("Converted %d sessions with a string expires_at", changed)
+    return changed
+
+async def run_migrations(db):
+    await ensure_unique_cells(db)
+    await convert_session_expiry(db)
@@ -0,0 +1,51 @@
+"""Environment-driven MongoDB client options and read preferences"""
+from typing import Dict, Mapping
+
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+# Environment variable -> MongoClient option; unset variables keep the driver defaults
+CLIENT_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": "maxPoolSize",
+    "MONGO_MIN_POOL_SIZE": "minPoolSize",
+    "MONGO_MAX_IDLE_TIME_MS": "maxIdleTimeMS",
+    "MONGO_MAX_CONNECTING": "maxConnecting",
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+    "MONGO_CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+    "MONGO_SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+}
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+def client_options(environ: Mapping[str, str]) -> Dict[str, int]:
+    return {option: int(environ[name]) for name, option in CLIENT_OPTIONS.items() if environ.get(name)}
+
+def read_preference(mode: str, max_staleness: float = -1):
+    """A pymongo read preference by mode name; `max_staleness` (seconds, at least 90) bounds how far
+    behind the primary a secondary may be to serve the read, -1 means no bound"""
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference {mode!r}, expected one of: {', '.join(READ_PREFERENCES)}")
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCES[mode](max_staleness=int(max_staleness))
+
+def describe_topology(client) -> dict:
+    """Servers the client currently sees, with their roles and round-trip times"""
+    topology = client.topology_description
+    return {
+        "type": topology.topology_type_name,
+        "servers": [
+            {
+                "address": f"{server.address[0]}:{server.address[1]}",
+                "type": server.server_type_name,
+                "round_trip_ms": round(server.round_trip_time * 1000, 1) if server.round_trip_time is not None else None,
+            }
+            for server in topology.server_descriptions().values()
+        ],
+    }
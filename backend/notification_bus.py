@@ -0,0 +1,90 @@
+"""In-process fan-out of new notifications to streaming subscribers"""
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    def __init__(self, keys: Set[str], queue_size: int):
+        self.keys = keys
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def deliver(self, notification: dict):
+        if self.queue.full():
+            # Slow consumer: drop the oldest rather than block publishers
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(notification)
+
+class NotificationBus:
+    """Routes a notification to subscribers keyed by user, department, broadcast, or all (admins).
+
+    Mirrors the visibility rules of GET /notifications: a notification reaches its user_id, members of
+    its department_id, everyone when it has neither, and admins always.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+
+    def subscribe(self, user_id: str, department_id: Optional[str], see_all: bool = False) -> Subscription:
+        keys = {"all"} if see_all else {f"user:{user_id}", "broadcast"}
+        if department_id and not see_all:
+            keys.add(f"department:{department_id}")
+        subscription = Subscription(keys, self.queue_size)
+        for key in keys:
+            self._subscribers.setdefault(key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for key in subscription.keys:
+            subscribers = self._subscribers.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[key]
+
+    def publish(self, notification: dict):
+        keys = ["all"]
+        if notification.get("user_id"):
+            keys.append(f"user:{notification['user_id']}")
+        if notification.get("department_id"):
+            keys.append(f"department:{notification['department_id']}")
+        if not notification.get("user_id") and not notification.get("department_id"):
+            keys.append("broadcast")
+
+        targets = set()
+        for key in keys:
+            targets |= self._subscribers.get(key, set())
+        for subscription in targets:
+            subscription.deliver(notification)
+        self.published += 1
+
+    async def follow_change_stream(self, collection, serialize):
+        """Publish inserts seen by a MongoDB change stream, so every worker fans out every notification.
+
+        Requires a replica set; reconnects after errors.
+        """
+        while True:
+            try:
+                async with collection.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                    async for change in stream:
+                        self.publish(serialize(change["fullDocument"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Notification change stream failed, retrying: %s", e)
+                await asyncio.sleep(5)
+
+    def stats(self) -> dict:
+        subscriptions = set()
+        for subscribers in self._subscribers.values():
+            subscriptions |= subscribers
+        return {
+            "subscribers": len(subscriptions),
+            "published": self.published,
+            "dropped": sum(subscription.dropped for subscription in subscriptions),
+        }
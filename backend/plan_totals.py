@@ -0,0 +1,193 @@
+"""Incrementally maintained planned/actual totals per plan, department, brand and category"""
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+
+# Level -> dimensions (besides plan_id) that identify a plan_totals document
+TOTAL_LEVELS = {
+    "plan": (),
+    "department": ("department_id",),
+    "brand": ("brand_id",),
+    "category": ("category_id",),
+    "department_brand": ("department_id", "brand_id"),
+    "department_category": ("department_id", "category_id"),
+}
+DIMENSIONS = ("department_id", "brand_id", "category_id")
+
+def total_id(level: str, plan_id: str, cell: dict) -> str:
+    """Deterministic _id, so any total is a point read"""
+    return "|".join([level, plan_id] + [str(cell.get(dimension)) for dimension in TOTAL_LEVELS[level]])
+
+async def plan_versions(db, plan_ids: List[str]) -> Dict[str, int]:
+    """Write counters of the plan-level totals; a changed counter means the plan's planning data changed"""
+    ids = [total_id("plan", plan_id, {}) for plan_id in plan_ids]
+    return {doc["plan_id"]: doc.get("writes", 0) async for doc in db.plan_totals.find({"_id": {"$in": ids}}, {"plan_id": 1, "writes": 1})}
+
+def _expand(plan_id: str, cell: dict, planned: float, actual: float, rows: int, into: Dict[str, dict]):
+    for level, dimensions in TOTAL_LEVELS.items():
+        doc_id = total_id(level, plan_id, cell)
+        entry = into.get(doc_id)
+        if entry is None:
+            entry = into[doc_id] = {
+                "_id": doc_id,
+                "level": level,
+                "plan_id": plan_id,
+                **{dimension: cell.get(dimension) if dimension in dimensions else None for dimension in DIMENSIONS},
+                "planned": 0.0,
+                "actual": 0.0,
+                "rows": 0,
+            }
+        entry["planned"] += planned
+        entry["actual"] += actual
+        entry["rows"] += rows
+
+async def apply_deltas(db, deltas: List[dict]):
+    """Apply planning_data changes as $inc deltas in one bulk_write.
+
+    Each delta has plan_id, department_id, product_id and optional planned, actual and rows (+1 for a new row).
+    """
+    deltas = [d for d in deltas if d.get("planned") or d.get("actual") or d.get("rows")]
+    if not deltas:
+        return
+    product_ids = list({d["product_id"] for d in deltas})
+    products = {
+        product["id"]: product
+        async for product in db.products.find({"id": {"$in": product_ids}}, {"_id": 0, "id": 1, "brand_id": 1, "category_id": 1})
+    }
+
+    totals: Dict[str, dict] = {}
+    for d in deltas:
+        product = products.get(d["product_id"], {})
+        cell = {"department_id": d["department_id"], "brand_id": product.get("brand_id"), "category_id": product.get("category_id")}
+        _expand(d["plan_id"], cell, d.get("planned") or 0.0, d.get("actual") or 0.0, d.get("rows", 0), totals)
+    await _increment(db, totals)
+
+async def _increment(db, totals: Dict[str, dict]):
+    await _write(db, [
+        UpdateOne({"_id": doc_id}, {"$inc": {key: entry[key] for key in ("planned", "actual", "rows")}, **_insert_fields(entry)}, upsert=True)
+        for doc_id, entry in totals.items()
+    ], {entry["plan_id"] for entry in totals.values()})
+
+def _insert_fields(entry: dict) -> dict:
+    return {"$setOnInsert": {key: entry[key] for key in ("level", "plan_id") + DIMENSIONS}}
+
+async def _write(db, operations: List[UpdateOne], plan_ids: Set[str]):
+    """Every plan_totals write goes through here: it also bumps `writes` on each plan's plan-level total,
+    the data version cached reports are keyed by"""
+    for plan_id in plan_ids:
+        doc_id = total_id("plan", plan_id, {})
+        operations.append(UpdateOne(
+            {"_id": doc_id},
+            {"$inc": {"writes": 1}, **_insert_fields({"level": "plan", "plan_id": plan_id, **{dimension: None for dimension in DIMENSIONS}})},
+            upsert=True
+        ))
+    if operations:
+        await db.plan_totals.bulk_write(operations, ordered=False)
+
+async def reclassify_products(db, changes: List[Tuple[dict, dict]]):
+    """Move the totals of products whose brand or category changed, given (before, after) product documents"""
+    moved = {after["id"]: (before, after) for before, after in changes
+             if (before.get("brand_id"), before.get("category_id")) != (after.get("brand_id"), after.get("category_id"))}
+    if not moved:
+        return
+    pipeline = [
+        {"$match": {"product_id": {"$in": list(moved)}}},
+        {"$group": {
+            "_id": {"plan_id": "$plan_id", "department_id": "$department_id", "product_id": "$product_id"},
+            "planned": {"$sum": "$planned"},
+            "actual": {"$sum": "$actual"},
+            "rows": {"$sum": 1},
+        }},
+    ]
+    totals: Dict[str, dict] = {}
+    async for cell in db.planning_data.aggregate(pipeline):
+        key = cell["_id"]
+        planned, actual = float(cell["planned"] or 0), float(cell["actual"] or 0)
+        for product, sign in zip(moved[key["product_id"]], (-1, 1)):
+            classified = {"department_id": key["department_id"], "brand_id": product.get("brand_id"), "category_id": product.get("category_id")}
+            _expand(key["plan_id"], classified, sign * planned, sign * actual, sign * cell["rows"], totals)
+    await _increment(db, totals)
+
+async def compute_totals(db, plan_id: Optional[str] = None) -> Dict[str, dict]:
+    """Recompute every total from planning_data"""
+    match = {"plan_id": plan_id} if plan_id else {}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"plan_id": "$plan_id", "department_id": "$department_id", "product_id": "$product_id"},
+            "planned": {"$sum": "$planned"},
+            "actual": {"$sum": "$actual"},
+            "rows": {"$sum": 1},
+        }},
+        {"$lookup": {"from": "products", "localField": "_id.product_id", "foreignField": "id", "as": "product"}},
+        {"$unwind": {"path": "$product", "preserveNullAndEmptyArrays": True}},
+        {"$group": {
+            "_id": {
+                "plan_id": "$_id.plan_id",
+                "department_id": "$_id.department_id",
+                "brand_id": "$product.brand_id",
+                "category_id": "$product.category_id",
+            },
+            "planned": {"$sum": "$planned"},
+            "actual": {"$sum": "$actual"},
+            "rows": {"$sum": "$rows"},
+        }},
+    ]
+    totals: Dict[str, dict] = {}
+    async for cell in db.planning_data.aggregate(pipeline):
+        key = cell["_id"]
+        _expand(key["plan_id"], key, float(cell["planned"] or 0), float(cell["actual"] or 0), cell["rows"], totals)
+    return totals
+
+async def _drift(db, plan_id: Optional[str], tolerance: float) -> Tuple[Dict[str, dict], Dict[str, dict], List[dict]]:
+    expected = await compute_totals(db, plan_id)
+    stored = {doc["_id"]: doc async for doc in db.plan_totals.find({"plan_id": plan_id} if plan_id else {})}
+
+    drift = []
+    for doc_id in sorted(set(expected) | set(stored)):
+        want = expected.get(doc_id, {"planned": 0.0, "actual": 0.0, "rows": 0})
+        have = stored.get(doc_id, {"planned": 0.0, "actual": 0.0, "rows": 0})
+        if (abs(want["planned"] - have.get("planned", 0.0)) > tolerance
+                or abs(want["actual"] - have.get("actual", 0.0)) > tolerance
+                or want["rows"] != have.get("rows", 0)):
+            drift.append({
+                "_id": doc_id,
+                "expected": {k: want[k] for k in ("planned", "actual", "rows")},
+                "stored": {k: have.get(k) for k in ("planned", "actual", "rows")} if doc_id in stored else None,
+            })
+    return expected, stored, drift
+
+async def verify_totals(db, plan_id: Optional[str] = None, repair: bool = False, tolerance: float = 1e-6, settle: float = 0) -> dict:
+    """Compare plan_totals with a fresh recomputation; with repair, rewrite the drifted documents.
+
+    With `settle`, drift is checked again after that many seconds and only drift that did not change
+    in between is repaired, so a write whose totals update is still in flight is not counted twice.
+    Each repair only applies while the stored total still holds the values it was checked against;
+    a total a concurrent $inc changed in the meantime is left for the next run.
+    """
+    expected, stored, drift = await _drift(db, plan_id, tolerance)
+    if repair and drift and settle > 0:
+        first = {item["_id"]: item for item in drift}
+        await asyncio.sleep(settle)
+        expected, stored, drift = await _drift(db, plan_id, tolerance)
+        drift = [item for item in drift if first.get(item["_id"]) == item]
+
+    if repair and drift:
+        operations = []
+        for item in drift:
+            values = {key: expected[item["_id"]][key] for key in ("planned", "actual", "rows")} if item["_id"] in expected else {"planned": 0.0, "actual": 0.0, "rows": 0}
+            if item["stored"] is None:
+                # Created by a concurrent write since it was checked: $setOnInsert leaves that one alone
+                operations.append(UpdateOne({"_id": item["_id"]}, {"$setOnInsert": {**values, **_insert_fields(expected[item["_id"]])["$setOnInsert"]}}, upsert=True))
+            else:
+                operations.append(UpdateOne({"_id": item["_id"], **item["stored"]}, {"$set": values}))
+        await _write(db, operations, {(expected.get(item["_id"]) or stored[item["_id"]])["plan_id"] for item in drift})
+
+    return {
+        "plan_id": plan_id,
+        "checked": len(set(expected) | set(stored)),
+        "drifted": len(drift),
+        "repaired": repair and bool(drift),
+        "drift": drift,
+    }
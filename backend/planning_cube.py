@@ -0,0 +1,251 @@
+"""In-process NumPy cube of planning facts per plan, for fast repeated slicing"""
+import asyncio
+import sys
+import time
+from importlib.util import find_spec
+from typing import Dict, Iterable, List, Optional
+
+# NumPy is optional and slow to import, so it is only imported once the first cube is built
+HAS_NUMPY = find_spec("numpy") is not None
+np = None
+
+def load_numpy():
+    global np
+    if np is None:
+        import numpy
+
+        np = numpy
+    return np
+
+CUBE_LEVELS = ("department", "product", "brand", "category")
+
+class Dimension:
+    """Maps string ids to dense integer codes"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+
+    def code(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.ids)
+            self.ids.append(value)
+        return code
+
+    def lookup(self, values: Iterable[str]) -> List[int]:
+        return [self.codes[value] for value in values if value in self.codes]
+
+    def __len__(self):
+        return len(self.ids)
+
+class PlanningCube:
+    """Planned/actual per (department, product) cell, stored as parallel arrays.
+
+    Brand and category are attributes of the product, so they are resolved through per-product code
+    arrays rather than stored per cell.
+    """
+
+    def __init__(self, plan_id: str, capacity: int = 1024):
+        load_numpy()
+        self.plan_id = plan_id
+        self.departments = Dimension()
+        self.products = Dimension()
+        self.brands = Dimension()
+        self.categories = Dimension()
+        self.cells: Dict[tuple, int] = {}
+        self.size = 0
+        self.department_code = np.zeros(capacity, dtype=np.int32)
+        self.product_code = np.zeros(capacity, dtype=np.int32)
+        self.planned = np.zeros(capacity, dtype=np.float64)
+        self.actual = np.zeros(capacity, dtype=np.float64)
+        self.product_brand = np.zeros(capacity, dtype=np.int32)
+        self.product_category = np.zeros(capacity, dtype=np.int32)
+        self.loaded_at = time.monotonic()
+        self.stale = False
+
+    def add_product(self, product_id: str, brand_id: Optional[str], category_id: Optional[str]):
+        code = self.products.code(product_id)
+        if code >= len(self.product_brand):
+            self.product_brand = np.resize(self.product_brand, max(code + 1, len(self.product_brand) * 2))
+            self.product_category = np.resize(self.product_category, len(self.product_brand))
+        self.product_brand[code] = self.brands.code(brand_id)
+        self.product_category[code] = self.categories.code(category_id)
+
+    def has_product(self, product_id: str) -> bool:
+        return product_id in self.products.codes
+
+    def _cell(self, department_id: str, product_id: str) -> int:
+        key = (department_id, product_id)
+        row = self.cells.get(key)
+        if row is None:
+            if self.size == len(self.planned):
+                capacity = self.size * 2
+                self.department_code = np.resize(self.department_code, capacity)
+                self.product_code = np.resize(self.product_code, capacity)
+                self.planned = np.resize(self.planned, capacity)
+                self.actual = np.resize(self.actual, capacity)
+                self.planned[self.size:] = 0
+                self.actual[self.size:] = 0
+            row = self.cells[key] = self.size
+            self.department_code[row] = self.departments.code(department_id)
+            self.product_code[row] = self.products.codes[product_id]
+            self.size += 1
+        return row
+
+    def add(self, department_id: str, product_id: str, planned: float = 0.0, actual: float = 0.0):
+        row = self._cell(department_id, product_id)
+        self.planned[row] += planned
+        self.actual[row] += actual
+
+    def set(self, department_id: str, product_id: str, planned: Optional[float] = None, actual: Optional[float] = None):
+        row = self._cell(department_id, product_id)
+        if planned is not None:
+            self.planned[row] = planned
+        if actual is not None:
+            self.actual[row] = actual
+
+    def _mask(self, department_ids=None, product_ids=None, brand_ids=None, category_ids=None):
+        n = self.size
+        mask = np.ones(n, dtype=bool)
+        if department_ids:
+            mask &= np.isin(self.department_code[:n], self.departments.lookup(department_ids))
+        if product_ids:
+            mask &= np.isin(self.product_code[:n], self.products.lookup(product_ids))
+        if brand_ids:
+            mask &= np.isin(self.product_brand[self.product_code[:n]], self.brands.lookup(brand_ids))
+        if category_ids:
+            mask &= np.isin(self.product_category[self.product_code[:n]], self.categories.lookup(category_ids))
+        return mask
+
+    def _group_codes(self, level: str):
+        n = self.size
+        if level == "department":
+            return self.department_code[:n], self.departments
+        if level == "product":
+            return self.product_code[:n], self.products
+        if level == "brand":
+            return self.product_brand[self.product_code[:n]], self.brands
+        return self.product_category[self.product_code[:n]], self.categories
+
+    def query(self, group_by: Optional[str] = None, **filters) -> dict:
+        mask = self._mask(**filters)
+        planned = self.planned[:self.size][mask]
+        actual = self.actual[:self.size][mask]
+        result = {
+            "plan_id": self.plan_id,
+            "totals": _totals(float(planned.sum()), float(actual.sum())),
+            "cells": int(mask.sum()),
+        }
+        if group_by:
+            codes, dimension = self._group_codes(group_by)
+            codes = codes[mask]
+            planned_by = np.bincount(codes, weights=planned, minlength=len(dimension))
+            actual_by = np.bincount(codes, weights=actual, minlength=len(dimension))
+            present = np.flatnonzero(np.bincount(codes, minlength=len(dimension)))
+            result["groups"] = [
+                {"key": dimension.ids[code], **_totals(float(planned_by[code]), float(actual_by[code]))}
+                for code in present
+            ]
+        return result
+
+    def memory_bytes(self) -> int:
+        arrays = (self.department_code, self.product_code, self.planned, self.actual, self.product_brand, self.product_category)
+        lookups = sum(sys.getsizeof(d.codes) + sys.getsizeof(d.ids) for d in (self.departments, self.products, self.brands, self.categories))
+        return int(sum(a.nbytes for a in arrays) + sys.getsizeof(self.cells) + lookups)
+
+def _totals(planned: float, actual: float) -> dict:
+    return {
+        "planned": planned,
+        "actual": actual,
+        "variance": actual - planned,
+        "completion": (actual / planned * 100) if planned > 0 else 0.0,
+    }
+
+class PlanningCubeRegistry:
+    """Loads cubes on first use and keeps them current with the writes made through this process.
+
+    Writes made by other workers are picked up when a cube is reloaded after `ttl` seconds.
+    """
+
+    def __init__(self, db, ttl: float = 60, max_plans: int = 16):
+        self.db = db
+        self.ttl = ttl
+        self.max_plans = max_plans
+        self._cubes: Dict[str, PlanningCube] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def available(self) -> bool:
+        return HAS_NUMPY
+
+    async def get(self, plan_id: str) -> PlanningCube:
+        cube = self._cubes.get(plan_id)
+        if cube is not None and not cube.stale and time.monotonic() - cube.loaded_at < self.ttl:
+            return cube
+        lock = self._locks.setdefault(plan_id, asyncio.Lock())
+        async with lock:
+            cube = self._cubes.get(plan_id)
+            if cube is None or cube.stale or time.monotonic() - cube.loaded_at >= self.ttl:
+                cube = await self._load(plan_id)
+                self._cubes.pop(plan_id, None)
+                self._cubes[plan_id] = cube
+                while len(self._cubes) > self.max_plans:
+                    self._cubes.pop(next(iter(self._cubes)))
+        return cube
+
+    async def _load(self, plan_id: str) -> PlanningCube:
+        rows = await self.db.planning_data.find(
+            {"plan_id": plan_id},
+            {"_id": 0, "department_id": 1, "product_id": 1, "planned": 1, "actual": 1}
+        ).to_list(length=None)
+        cube = PlanningCube(plan_id, capacity=max(1024, len(rows)))
+        product_ids = list({row["product_id"] for row in rows})
+        async for product in self.db.products.find(
+            {"id": {"$in": product_ids}},
+            {"_id": 0, "id": 1, "brand_id": 1, "category_id": 1}
+        ):
+            cube.add_product(product["id"], product.get("brand_id"), product.get("category_id"))
+        for row in rows:
+            if not cube.has_product(row["product_id"]):
+                cube.add_product(row["product_id"], None, None)
+            cube.add(row["department_id"], row["product_id"], row.get("planned") or 0.0, row.get("actual") or 0.0)
+        return cube
+
+    def _loaded(self, plan_id: str, product_id: str) -> Optional[PlanningCube]:
+        cube = self._cubes.get(plan_id)
+        if cube is not None and not cube.has_product(product_id):
+            # Unknown product attributes: rebuild on next query rather than guess
+            cube.stale = True
+            return None
+        return cube
+
+    def apply_delta(self, plan_id: str, department_id: str, product_id: str, planned: float = 0.0, actual: float = 0.0):
+        cube = self._loaded(plan_id, product_id)
+        if cube is not None:
+            cube.add(department_id, product_id, planned, actual)
+
+    def apply_set(self, plan_id: str, department_id: str, product_id: str, planned: Optional[float] = None, actual: Optional[float] = None):
+        cube = self._loaded(plan_id, product_id)
+        if cube is not None:
+            cube.set(department_id, product_id, planned, actual)
+
+    def invalidate(self, plan_id: Optional[str] = None):
+        if plan_id is None:
+            self._cubes.clear()
+        else:
+            self._cubes.pop(plan_id, None)
+
+    def stats(self) -> List[dict]:
+        return [
+            {
+                "plan_id": plan_id,
+                "cells": cube.size,
+                "products": len(cube.products),
+                "departments": len(cube.departments),
+                "memory_bytes": cube.memory_bytes(),
+                "age_seconds": round(time.monotonic() - cube.loaded_at, 1),
+                "stale": cube.stale,
+            }
+            for plan_id, cube in self._cubes.items()
+        ]
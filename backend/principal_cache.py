@@ -0,0 +1,67 @@
+"""Bounded TTL + LRU cache of authenticated principals, keyed by token.
+
+Each worker has its own cache. A user change made on one worker reaches the others through a
+shared version counter (see sync), so a stale role or department outlives the change by at most
+the counter's refresh interval, not the cache TTL.
+"""
+import time
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+class PrincipalCache:
+    def __init__(self, maxsize: int = 10000, ttl: float = 60):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.version: Optional[int] = None
+
+    def sync(self, version: int):
+        """Drop every entry when the shared version has moved, i.e. some worker changed a user"""
+        if self.version is not None and version != self.version:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+        self.version = version
+
+    def get(self, token: str):
+        entry = self._entries.get(token)
+        if entry is not None:
+            user, expires_at = entry
+            # Never outlive the token itself, even inside the cache TTL
+            if expires_at is None or expires_at > time.time():
+                self.hits += 1
+                return user
+            self._entries.pop(token, None)
+        self.misses += 1
+        return None
+
+    def put(self, token: str, user: Any, expires_at: Optional[float] = None):
+        self._entries[token] = (user, expires_at)
+
+    def invalidate_token(self, token: str):
+        if self._entries.pop(token, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: str):
+        """Drop every cached token for a user, e.g. after a role, department or is_active change"""
+        stale = [token for token, (user, _) in list(self._entries.items()) if user.id == user_id]
+        for token in stale:
+            self.invalidate_token(token)
+
+    def clear(self):
+        self._entries.clear()
+        self.version = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self._entries.maxsize,
+            "ttl": self._entries.ttl,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
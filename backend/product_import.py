@@ -0,0 +1,289 @@
+"""Streaming product catalog import from CSV or XLSX uploads, upserted on ean_code"""
+import asyncio
+import csv
+import io
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Alternative header spellings accepted in uploaded files
+COLUMN_ALIASES = {
+    "ean": "ean_code",
+    "brand": "brand_id",
+    "category": "category_id",
+    "subcategory": "subcategory_id",
+    "price": "mrp",
+}
+REQUIRED_COLUMNS = ("name", "ean_code", "brand_id", "category_id", "subcategory_id", "mrp")
+
+class ImportFormatError(ValueError):
+    """The upload cannot be read as a product sheet at all"""
+
+def _column(header) -> str:
+    name = str(header or "").strip().lower().replace(" ", "_").replace("-", "_")
+    return COLUMN_ALIASES.get(name, name)
+
+def _check_columns(columns: List[str]):
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ImportFormatError(f"Missing columns: {', '.join(missing)}")
+
+def _csv_rows(fileobj) -> Iterator[Tuple[int, dict]]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        columns = [_column(header) for header in next(reader, [])]
+        _check_columns(columns)
+        for values in reader:
+            if any(value.strip() for value in values):
+                yield reader.line_num, dict(zip(columns, values))
+    except UnicodeDecodeError as e:
+        raise ImportFormatError(f"CSV is not UTF-8: {e}")
+    finally:
+        # Leave the upload itself open for its owner to close
+        text.detach()
+
+def _xlsx_rows(fileobj) -> Iterator[Tuple[int, dict]]:
+    # Imported on first use: openpyxl is optional and slow to import
+    try:
+        import openpyxl
+    except ImportError:  # pragma: no cover - openpyxl is optional
+        raise ImportFormatError("XLSX import requires openpyxl")
+    try:
+        workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f"Unreadable XLSX file: {e}")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = [_column(header) for header in next(rows, ())]
+        _check_columns(columns)
+        for row_number, values in enumerate(rows, start=2):
+            if any(value is not None and str(value).strip() for value in values):
+                yield row_number, dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+def iter_rows(fileobj, filename: str) -> Iterator[Tuple[int, dict]]:
+    """Yield (sheet row number, raw values by column) without loading the whole file"""
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        return _csv_rows(fileobj)
+    if extension in ("xlsx", "xlsm"):
+        return _xlsx_rows(fileobj)
+    raise ImportFormatError("Unsupported file type, expected .csv or .xlsx")
+
+def _key(value) -> str:
+    return str(value).strip().lower()
+
+class CatalogLookup:
+    """Brand, category and subcategory references by id, code or name, loaded once per import"""
+
+    def __init__(self, brands: List[dict], categories: List[dict], subcategories: List[dict]):
+        self.brands: Dict[str, str] = {}
+        for brand in brands:
+            for value in (brand.get("name"), brand.get("short_name"), brand.get("brand_id"), brand["id"]):
+                if value:
+                    self.brands[_key(value)] = brand["id"]
+
+        self.categories: Dict[str, str] = {}
+        for category in categories:
+            for value in (category.get("name"), category.get("code"), category["id"]):
+                if value:
+                    self.categories[_key(value)] = category["id"]
+
+        # Subcategory codes are only unique within their category
+        self.subcategory_parent: Dict[str, str] = {}
+        self.subcategories: Dict[Tuple[str, str], str] = {}
+        for subcategory in subcategories:
+            self.subcategory_parent[subcategory["id"]] = subcategory.get("category_id")
+            for value in (subcategory.get("name"), subcategory.get("code"), subcategory["id"]):
+                if value:
+                    self.subcategories[(subcategory.get("category_id"), _key(value))] = subcategory["id"]
+
+    @classmethod
+    async def load(cls, db) -> "CatalogLookup":
+        projection = {"_id": 0, "id": 1, "name": 1, "code": 1, "short_name": 1, "brand_id": 1, "category_id": 1}
+        return cls(
+            await db.brands.find({}, projection).to_list(length=None),
+            await db.categories.find({}, projection).to_list(length=None),
+            await db.subcategories.find({}, projection).to_list(length=None),
+        )
+
+    def resolve(self, row: dict) -> dict:
+        """Replace brand/category/subcategory references with ids; raises ValueError for unknown ones"""
+        brand_id = self.brands.get(_key(row["brand_id"]))
+        if brand_id is None:
+            raise ValueError(f"Unknown brand '{row['brand_id']}'")
+        category_id = self.categories.get(_key(row["category_id"]))
+        if category_id is None:
+            raise ValueError(f"Unknown category '{row['category_id']}'")
+        subcategory_id = self.subcategories.get((category_id, _key(row["subcategory_id"])))
+        if subcategory_id is None:
+            if str(row["subcategory_id"]).strip() in self.subcategory_parent:
+                raise ValueError(f"Subcategory '{row['subcategory_id']}' does not belong to category '{row['category_id']}'")
+            raise ValueError(f"Unknown subcategory '{row['subcategory_id']}'")
+        return {**row, "brand_id": brand_id, "category_id": category_id, "subcategory_id": subcategory_id}
+
+def _clean(raw: dict) -> dict:
+    row = {}
+    for column in REQUIRED_COLUMNS:
+        value = raw.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            raise ValueError(f"{column}: value is required")
+        row[column] = value
+    # Spreadsheets turn numeric EANs into numbers
+    if isinstance(row["ean_code"], float) and row["ean_code"].is_integer():
+        row["ean_code"] = int(row["ean_code"])
+    row["ean_code"] = str(row["ean_code"])
+    return row
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+class ProductImporter:
+    """Validates rows against `model` and upserts them on ean_code in batches of `batch_size`.
+
+    Within a batch a repeated ean_code keeps the last row; across batches the later upsert wins.
+    `on_write` is awaited with each batch's products once they are written, and `on_reclassify` with
+    (before, after) pairs for existing products whose brand or category the batch changed.
+    """
+
+    def __init__(self, db, model, user_id: str, batch_size: int = 1000, max_errors: int = 1000,
+                 on_write: Optional[Callable[[List[dict]], Awaitable]] = None,
+                 on_reclassify: Optional[Callable[[List[Tuple[dict, dict]]], Awaitable]] = None):
+        self.db = db
+        self.on_write = on_write
+        self.on_reclassify = on_reclassify
+        self.model = model
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.stats = {
+            "rows": 0,
+            "inserted": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "failed": 0,
+            "duplicates": 0,
+            "batches": 0,
+        }
+        self.errors: List[dict] = []
+        self.started = time.perf_counter()
+
+    def _error(self, row_number: int, ean_code: Optional[str], message: str):
+        self.stats["failed"] += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "ean_code": ean_code, "error": message})
+
+    async def _flush(self, pending: Dict[str, Tuple[int, dict]]):
+        if not pending:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        batch = list(pending.values())
+        previous = {}
+        if self.on_reclassify is not None:
+            previous = {
+                product["ean_code"]: product
+                async for product in self.db.products.find(
+                    {"ean_code": {"$in": [product["ean_code"] for _, product in batch]}},
+                    {"_id": 0, "id": 1, "ean_code": 1, "brand_id": 1, "category_id": 1}
+                )
+            }
+        operations = [
+            UpdateOne(
+                {"ean_code": product["ean_code"]},
+                {
+                    "$set": product,
+                    "$setOnInsert": {"id": str(uuid.uuid4()), "status": "Active", "created_by": self.user_id, "created_at": now},
+                },
+                upsert=True
+            )
+            for _, product in batch
+        ]
+        try:
+            result = (await self.db.products.bulk_write(operations, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+            for error in result.get("writeErrors", []):
+                row_number, product = batch[error["index"]]
+                self._error(row_number, product["ean_code"], error.get("errmsg", "Write failed"))
+        self.stats["inserted"] += result.get("nUpserted", 0)
+        self.stats["updated"] += result.get("nModified", 0)
+        self.stats["unchanged"] += result.get("nMatched", 0) - result.get("nModified", 0)
+        self.stats["batches"] += 1
+        if self.on_write is not None:
+            await self.on_write([product for _, product in batch])
+        failed = {batch[error["index"]][1]["ean_code"] for error in result.get("writeErrors", [])}
+        changes = []
+        for _, product in batch:
+            before = previous.get(product["ean_code"])
+            if before is None or product["ean_code"] in failed:
+                continue
+            if (before.get("brand_id"), before.get("category_id")) != (product.get("brand_id"), product.get("category_id")):
+                changes.append((before, {**product, "id": before["id"]}))
+        if changes:
+            await self.on_reclassify(changes)
+        pending.clear()
+
+    def progress(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            **self.stats,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.stats["rows"] / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    def _read_batch(self, rows: Iterator[Tuple[int, dict]], lookup: CatalogLookup) -> Tuple[Dict[str, Tuple[int, dict]], bool]:
+        """Parse and validate rows until a batch is full; returns it and whether the sheet is exhausted"""
+        pending: Dict[str, Tuple[int, dict]] = {}
+        for row_number, raw in rows:
+            self.stats["rows"] += 1
+            ean_code = raw.get("ean_code")
+            try:
+                row = _clean(raw)
+                ean_code = row["ean_code"]
+                product = self.model(**lookup.resolve(row)).dict()
+            except ValidationError as e:
+                self._error(row_number, ean_code, _validation_message(e))
+                continue
+            except ValueError as e:
+                self._error(row_number, ean_code, str(e))
+                continue
+
+            if product["ean_code"] in pending:
+                self.stats["duplicates"] += 1
+                del pending[product["ean_code"]]
+            pending[product["ean_code"]] = (row_number, product)
+            if len(pending) >= self.batch_size:
+                return pending, False
+        return pending, True
+
+    async def run(self, rows: Iterator[Tuple[int, dict]]) -> AsyncIterator[dict]:
+        """Import every row, yielding a progress snapshot after each written batch"""
+        lookup = await CatalogLookup.load(self.db)
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            # Reading the sheet and validating rows is CPU-bound: each batch is prepared on an executor
+            # thread so only the bulk writes run on the event loop
+            pending, done = await loop.run_in_executor(None, self._read_batch, rows, lookup)
+            if pending:
+                await self._flush(pending)
+                yield self.progress()
+
+    def report(self) -> dict:
+        return {
+            **self.progress(),
+            "errors": self.errors,
+            "errors_truncated": self.stats["failed"] > len(self.errors),
+        }
@@ -0,0 +1,410 @@
+"""In-memory typeahead index over product names and EAN codes"""
+import asyncio
+import bisect
+import gc
+import logging
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import planning_cube
+from planning_cube import Dimension, HAS_NUMPY
+
+# Imported with the first index, see planning_cube.load_numpy
+np = None
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"[0-9a-z]+")
+# Product fields kept per entry, stored as a tuple in this order
+FIELDS = ("id", "name", "ean_code", "brand_id", "category_id", "subcategory_id", "mrp", "status")
+PROJECTION = {"_id": 0, **{field: 1 for field in FIELDS}}
+_NAME, _EAN = 1, 2
+# Filterable fields, as (record position, FIELDS name)
+_FILTERS = ((3, "brand_id"), (4, "category_id"), (5, "subcategory_id"))
+# Entries freed per step when an index is released
+_RELEASE_CHUNK = 10000
+
+def tokenize(text) -> List[str]:
+    return list(dict.fromkeys(TOKEN.findall(str(text or "").lower())))
+
+def trigrams(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+def _record(product: dict) -> tuple:
+    values = [product.get(field) for field in FIELDS]
+    values[_EAN] = str(values[_EAN] or "")
+    for i in (3, 4, 5, 7):
+        # Shared by many products; interning keeps one copy
+        if isinstance(values[i], str):
+            values[i] = sys.intern(values[i])
+    return tuple(values)
+
+class _Postings:
+    """Name token -> slots, with a cached int32 array per token for mask building"""
+
+    def __init__(self):
+        self.lists: Dict[str, List[int]] = {}
+        self.arrays: Dict[str, "np.ndarray"] = {}
+
+    def add(self, token: str, slot: int) -> bool:
+        """Returns True when the token is new"""
+        self.arrays.pop(token, None)
+        slots = self.lists.get(token)
+        if slots is None:
+            self.lists[token] = [slot]
+            return True
+        slots.append(slot)
+        return False
+
+    def discard(self, token: str, slot: int) -> bool:
+        """Returns True when the token has no products left"""
+        self.arrays.pop(token, None)
+        slots = self.lists.get(token)
+        if slots is None:
+            return False
+        slots.remove(slot)
+        if not slots:
+            del self.lists[token]
+            return True
+        return False
+
+    def array(self, token: str) -> "np.ndarray":
+        array = self.arrays.get(token)
+        if array is None:
+            slots = self.lists.get(token, ())
+            array = self.arrays[token] = np.fromiter(slots, dtype=np.int32, count=len(slots))
+        return array
+
+class ProductSearchIndex:
+    """Prefix search on ean_code and token prefix/trigram search on name.
+
+    Each product gets a slot; a query word selects the vocabulary tokens it is a prefix of (or, from
+    three characters, a substring of, via trigrams over the vocabulary) and the slots of those tokens
+    become a boolean mask. Masks are intersected across words with NumPy. Slots are assigned in
+    name order when the index is built, so mask order doubles as result order; products written
+    afterwards rank after them until the next rebuild.
+    """
+
+    def __init__(self):
+        global np
+        np = planning_cube.load_numpy()
+        self._reset()
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _reset(self, capacity: int = 1024):
+        self._slots: Dict[str, int] = {}
+        self._records: List[Optional[tuple]] = []
+        self._tokens: List[Tuple[str, ...]] = []
+        self._eans: List[Tuple[str, int]] = []
+        self._vocabulary: List[str] = []
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._postings = _Postings()
+        # Slots by the first token of the name, for "name starts with" ranking
+        self._first = _Postings()
+        self._dimensions = [Dimension() for _ in _FILTERS]
+        self._codes = np.full((len(_FILTERS), capacity), -1, dtype=np.int32)
+
+    # Building
+
+    def build(self, products: Iterable[dict]):
+        """Replace the whole index; sorts once instead of inserting one by one"""
+        unique = {product["id"]: product for product in products}
+        ordered = sorted(unique.values(), key=lambda product: str(product.get("name") or "").lower())
+        self._reset(capacity=max(1024, len(ordered)))
+        for product in ordered:
+            slot = self._new_slot(product["id"])
+            self._fill(slot, _record(product))
+            for token in self._tokens[slot]:
+                self._postings.lists.setdefault(token, []).append(slot)
+            if self._tokens[slot]:
+                self._first.lists.setdefault(self._tokens[slot][0], []).append(slot)
+        # NumPy sorts the fixed-width codes without holding the GIL, unlike a sort of (ean, slot) tuples
+        eans = [record[_EAN] for record in self._records]
+        self._eans = [(eans[slot], int(slot)) for slot in np.argsort(np.array(eans), kind="stable")] if eans else []
+        self._vocabulary = sorted(self._postings.lists)
+        for token in self._vocabulary:
+            for gram in trigrams(token):
+                self._trigrams.setdefault(gram, set()).add(token)
+        self.loaded_at = time.monotonic()
+
+    def _new_slot(self, product_id: str) -> int:
+        slot = self._slots[product_id] = len(self._records)
+        self._records.append(None)
+        self._tokens.append(())
+        if slot >= self._codes.shape[1]:
+            codes = np.full((len(_FILTERS), self._codes.shape[1] * 2), -1, dtype=np.int32)
+            codes[:, :self._codes.shape[1]] = self._codes
+            self._codes = codes
+        return slot
+
+    def _fill(self, slot: int, record: tuple):
+        self._records[slot] = record
+        self._tokens[slot] = tuple(tokenize(record[_NAME]))
+        for row, ((position, _), dimension) in enumerate(zip(_FILTERS, self._dimensions)):
+            self._codes[row, slot] = dimension.code(record[position])
+
+    def _add_token(self, token: str, slot: int):
+        if self._postings.add(token, slot):
+            bisect.insort(self._vocabulary, token)
+            for gram in trigrams(token):
+                self._trigrams.setdefault(gram, set()).add(token)
+
+    def _discard_token(self, token: str, slot: int):
+        if self._postings.discard(token, slot):
+            del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+            for gram in trigrams(token):
+                tokens = self._trigrams.get(gram)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._trigrams[gram]
+
+    def _remove_ean(self, slot: int):
+        ean = self._records[slot][_EAN]
+        i = bisect.bisect_left(self._eans, (ean, slot))
+        if i < len(self._eans) and self._eans[i] == (ean, slot):
+            del self._eans[i]
+
+    def upsert(self, product: dict):
+        """Add or refresh one product; only name tokens that changed touch the postings"""
+        slot = self._slots.get(product["id"])
+        if slot is None:
+            slot = self._new_slot(product["id"])
+            previous = ()
+        else:
+            previous = self._tokens[slot]
+            self._remove_ean(slot)
+        self._fill(slot, _record(product))
+        bisect.insort(self._eans, (self._records[slot][_EAN], slot))
+
+        tokens = self._tokens[slot]
+        for token in previous:
+            if token not in tokens:
+                self._discard_token(token, slot)
+        for token in tokens:
+            if token not in previous:
+                self._add_token(token, slot)
+        old_first, new_first = previous[:1], tokens[:1]
+        if old_first != new_first:
+            if old_first:
+                self._first.discard(old_first[0], slot)
+            if new_first:
+                self._first.add(new_first[0], slot)
+
+    def remove(self, product_id: str):
+        slot = self._slots.pop(product_id, None)
+        if slot is None:
+            return
+        tokens = self._tokens[slot]
+        for token in tokens:
+            self._discard_token(token, slot)
+        if tokens:
+            self._first.discard(tokens[0], slot)
+        self._remove_ean(slot)
+        self._codes[:, slot] = -1
+        self._records[slot] = None
+        self._tokens[slot] = ()
+
+    def release(self):
+        """Empty the index a piece at a time, so a worker thread freeing it lets the loop run between
+        pieces instead of holding the GIL for one long deallocation"""
+        containers = [self._slots, self._records, self._tokens, self._eans, self._vocabulary, self._trigrams]
+        for postings in (self._postings, self._first):
+            containers += [postings.lists, postings.arrays]
+        for container in containers:
+            if isinstance(container, list):
+                while container:
+                    del container[-_RELEASE_CHUNK:]
+            else:
+                while container:
+                    container.popitem()
+
+    # Searching
+
+    def _matching_tokens(self, word: str) -> Tuple[List[str], List[str]]:
+        """Vocabulary tokens starting with, and (for 3+ characters) containing, the query word"""
+        lo = bisect.bisect_left(self._vocabulary, word)
+        hi = bisect.bisect_left(self._vocabulary, word + "~")
+        prefix = self._vocabulary[lo:hi]
+        infix = []
+        if len(word) >= 3:
+            grams = sorted((self._trigrams.get(gram, set()) for gram in trigrams(word)), key=len)
+            if grams[0]:
+                infix = [token for token in grams[0].intersection(*grams[1:]) if word in token and not token.startswith(word)]
+        return prefix, infix
+
+    def _mask(self, postings: _Postings, tokens: List[str]) -> "np.ndarray":
+        mask = np.zeros(len(self._records), dtype=bool)
+        for token in tokens:
+            mask[postings.array(token)] = True
+        return mask
+
+    def _filter_mask(self, filters: Dict[str, Optional[str]]) -> Optional["np.ndarray"]:
+        mask = None
+        for row, ((_, field), dimension) in enumerate(zip(_FILTERS, self._dimensions)):
+            value = filters.get(field)
+            if value is None:
+                continue
+            code = dimension.codes.get(value, -2)
+            selected = self._codes[row, :len(self._records)] == code
+            mask = selected if mask is None else mask & selected
+        return mask
+
+    def search(self, q: str, limit: int = 20, **filters) -> List[dict]:
+        """Up to `limit` products: EAN prefix matches, then names whose first word, then any word, starts
+        with the first query word, then names matching some query word only by substring.
+
+        `filters` takes brand_id, category_id and subcategory_id.
+        """
+        query = q.strip().lower()
+        words = tokenize(query)
+        if not words:
+            return []
+        filter_mask = self._filter_mask(filters)
+        results: List[int] = []
+
+        ean_prefix = re.sub(r"\s+", "", query)
+        if ean_prefix.isdigit():
+            i = bisect.bisect_left(self._eans, (ean_prefix,))
+            while i < len(self._eans) and len(results) < limit and self._eans[i][0].startswith(ean_prefix):
+                slot = self._eans[i][1]
+                if filter_mask is None or filter_mask[slot]:
+                    results.append(slot)
+                i += 1
+
+        def take(mask):
+            if filter_mask is not None:
+                mask &= filter_mask
+            for slot in np.flatnonzero(mask):
+                if len(results) >= limit:
+                    return
+                if slot not in results:
+                    results.append(int(slot))
+
+        if len(results) < limit:
+            matched = [self._matching_tokens(word) for word in words]
+            first_word = self._mask(self._first, matched[0][0])
+            other_words = [self._mask(self._postings, prefix) for prefix, _ in matched[1:]]
+            starts_with = first_word.copy()
+            for mask in other_words:
+                starts_with &= mask
+            take(starts_with)
+            # Typeahead usually stops here; broad first words make the next masks the expensive part
+            if len(results) < limit:
+                all_prefix = self._mask(self._postings, matched[0][0])
+                for mask in other_words:
+                    all_prefix &= mask
+                take(all_prefix & ~first_word)
+            if len(results) < limit and any(infix for _, infix in matched):
+                anywhere = self._mask(self._postings, matched[0][0] + matched[0][1])
+                for prefix, infix in matched[1:]:
+                    anywhere &= self._mask(self._postings, prefix + infix)
+                take(anywhere & ~all_prefix)
+
+        return [dict(zip(FIELDS, self._records[slot])) for slot in results]
+
+    def stats(self) -> dict:
+        return {
+            "products": len(self),
+            "tokens": len(self._vocabulary),
+            "trigrams": len(self._trigrams),
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at is not None else None,
+        }
+
+def _build(products: List[dict]) -> ProductSearchIndex:
+    index = ProductSearchIndex()
+    # A build allocates millions of objects; with the collector on, the full passes it triggers hold
+    # the GIL for most of a second each and stall the event loop even though this runs on a thread
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        index.build(products)
+        # Free the fetched documents here rather than on the loop
+        products.clear()
+        # Move the new index out of the collector's reach before it is switched back on; otherwise
+        # the next young collection, and every full one after it, walks the whole index
+        gc.freeze()
+    finally:
+        if enabled:
+            gc.enable()
+    return index
+
+class ProductSearch:
+    """The current ProductSearchIndex, rebuilt in the background.
+
+    A rebuild constructs a complete new index on a worker thread and installs it with one reference
+    assignment on the loop, so searches see either the old index or the new one and the loop never
+    runs any part of the build. Writes seen while it builds are replayed onto it first.
+    """
+
+    def __init__(self):
+        self.index: Optional[ProductSearchIndex] = None
+        self._replay: Optional[List[Tuple[str, Optional[dict]]]] = None
+
+    @property
+    def available(self) -> bool:
+        return HAS_NUMPY
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    def upsert(self, product: dict):
+        if self._replay is not None:
+            self._replay.append((product["id"], dict(product)))
+        if self.index is not None:
+            self.index.upsert(product)
+
+    def remove(self, product_id: str):
+        if self._replay is not None:
+            self._replay.append((product_id, None))
+        if self.index is not None:
+            self.index.remove(product_id)
+
+    def search(self, q: str, limit: int = 20, **filters) -> List[dict]:
+        return self.index.search(q, limit, **filters) if self.index is not None else []
+
+    def stats(self) -> dict:
+        if self.index is None:
+            return {"products": 0, "tokens": 0, "trigrams": 0, "age_seconds": None}
+        return self.index.stats()
+
+    async def load(self, db, batch_size: int = 5000):
+        """Rebuild from the products collection without stalling the event loop"""
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        self._replay = []
+        try:
+            products = await db.products.find({}, PROJECTION).batch_size(batch_size).to_list(length=None)
+            fresh = await loop.run_in_executor(None, _build, products)
+            for product_id, product in self._replay:
+                if product is None:
+                    fresh.remove(product_id)
+                else:
+                    fresh.upsert(product)
+            stale, self.index = self.index, fresh
+        finally:
+            self._replay = None
+        if stale is not None:
+            await loop.run_in_executor(None, stale.release)
+        logger.info("Product search index loaded %d products in %.2fs", len(fresh), time.perf_counter() - started)
+
+    async def follow(self, db, interval: float):
+        """Load now, then reload every `interval` seconds to pick up writes made by other workers"""
+        if not self.available:
+            return
+        while True:
+            try:
+                await self.load(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Product search index load failed: %s", e)
+            if interval <= 0:
+                return
+            await asyncio.sleep(interval)
@@ -0,0 +1,76 @@
+"""Versioned, pre-serialized snapshots of rarely changing reference collections"""
+import hashlib
+import time
+from typing import Dict, Optional, Tuple
+
+from cachetools import LRUCache
+from pymongo import ReturnDocument
+
+REFERENCE_COLLECTIONS = ("departments", "brands", "categories", "subcategories", "products")
+
+class ReferenceDataCache:
+    """Per-collection version counters (shared through Mongo) and the serialized responses built for each version.
+
+    Versions live in the `ref_versions` collection so every worker agrees on them; each worker
+    re-reads a counter at most once per `version_ttl` seconds and sees its own bumps immediately.
+    """
+
+    def __init__(self, db, version_ttl: float = 1.0, max_snapshots: int = 256):
+        self.db = db
+        self.version_ttl = version_ttl
+        self.max_snapshots = max_snapshots
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        self._snapshots: Dict[str, LRUCache] = {}
+
+    async def version(self, name: str) -> int:
+        cached = self._versions.get(name)
+        if cached and time.monotonic() - cached[1] < self.version_ttl:
+            return cached[0]
+        doc = await self.db.ref_versions.find_one({"_id": name})
+        return self._set_version(name, doc["version"] if doc else 0)
+
+    async def bump(self, name: str) -> int:
+        """Record a write to a reference collection; call after every create/update/delete"""
+        doc = await self.db.ref_versions.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return self._set_version(name, doc["version"])
+
+    def _set_version(self, name: str, version: int) -> int:
+        previous = self._versions.get(name)
+        if previous is None or previous[0] != version:
+            # Snapshots of older versions can never be served again
+            self._snapshots.pop(name, None)
+        self._versions[name] = (version, time.monotonic())
+        return version
+
+    @staticmethod
+    def etag(name: str, version, key: str) -> str:
+        # Stable across workers and restarts, unlike hash()
+        digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+        return f'"{name}-v{version}-{digest}"'
+
+    def get(self, name: str, version, key: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        snapshots = self._snapshots.get(name)
+        return snapshots.get((version, key)) if snapshots is not None else None
+
+    def put(self, name, version, key: str, body: bytes, headers: Dict[str, str]):
+        snapshots = self._snapshots.get(name)
+        if snapshots is None or any(cached_version != version for cached_version, _ in snapshots.keys()):
+            # Also covers joined responses, whose composite version is never passed to _set_version
+            snapshots = self._snapshots[name] = LRUCache(maxsize=self.max_snapshots)
+        snapshots[(version, key)] = (body, headers)
+
+    def stats(self) -> Dict[str, dict]:
+        # Snapshots of joined responses (e.g. the catalog tree) are listed without a version of their own
+        names = REFERENCE_COLLECTIONS + tuple(name for name in self._snapshots if name not in REFERENCE_COLLECTIONS)
+        return {
+            name: {
+                "version": self._versions.get(name, (None, 0))[0],
+                "snapshots": len(self._snapshots.get(name, {})),
+            }
+            for name in names
+        }
@@ -0,0 +1,182 @@
+"""Background report jobs: results stored per (spec, data version) and computed by a bounded worker pool"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import date, datetime, timezone
+from typing import Awaitable, Callable, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "report_jobs"
+PERIODS = ("monthly", "quarterly", "yearly")
+
+class ReportQueueFull(Exception):
+    """Every worker is busy and the queue is at capacity"""
+
+def period_range(period: str, timeframe: str) -> Tuple[str, str]:
+    """[start, next start) as ISO dates for "2025-01" (monthly), "Q1-2025" (quarterly) or "2025" (yearly).
+
+    Raises ValueError for a malformed timeframe.
+    """
+    if period == "monthly":
+        try:
+            start = datetime.strptime(timeframe, "%Y-%m").date()
+        except ValueError:
+            raise ValueError(f"Expected a month like 2025-01, got {timeframe!r}")
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    elif period == "quarterly":
+        quarter, _, year = timeframe.upper().partition("-")
+        if quarter not in ("Q1", "Q2", "Q3", "Q4") or not year.isdigit():
+            raise ValueError(f"Expected a quarter like Q1-2025, got {timeframe!r}")
+        month = (int(quarter[1]) - 1) * 3 + 1
+        start = date(int(year), month, 1)
+        end = date(start.year + (month + 3) // 13, (month + 2) % 12 + 1, 1)
+    elif period == "yearly":
+        if not timeframe.isdigit():
+            raise ValueError(f"Expected a year like 2025, got {timeframe!r}")
+        start = date(int(timeframe), 1, 1)
+        end = date(start.year + 1, 1, 1)
+    else:
+        raise ValueError(f"Unknown period {period!r}, expected one of: {', '.join(PERIODS)}")
+    return start.isoformat(), end.isoformat()
+
+def _digest(value) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+class ReportJobs:
+    """Runs report computations off the request path.
+
+    A job's id is the hash of its spec plus the data version it was computed against, so a repeat
+    request for unchanged data finds the finished job (and its result) with one point read, and
+    concurrent requests for the same report share one computation. Jobs live in Mongo, so every
+    worker process serves every other's results; a queued or running job whose owner disappeared
+    is picked up again once it is older than `stale_after` seconds.
+    """
+
+    def __init__(self, db, compute: Callable[[dict], Awaitable[dict]], workers: int = 2, queue_size: int = 100, stale_after: float = 600):
+        self.db = db
+        self.compute = compute
+        self.workers = workers
+        self.queue_size = queue_size
+        self.stale_after = stale_after
+        self.completed = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._queue = None
+
+    def _stale(self, job: dict) -> bool:
+        if job["status"] not in ("queued", "running"):
+            return False
+        updated = job.get("updated_at")
+        if isinstance(updated, datetime) and updated.tzinfo is None:
+            updated = updated.replace(tzinfo=timezone.utc)
+        return updated is None or (datetime.now(timezone.utc) - updated).total_seconds() > self.stale_after
+
+    async def submit(self, spec: dict, data_version: str, user_id: Optional[str] = None) -> dict:
+        """The job for `spec` at `data_version`, creating and queueing it unless it already exists.
+
+        Finished jobs come back with their result; failed or abandoned ones are queued again.
+        """
+        job_id = f"{_digest(spec)}-{_digest(data_version)}"
+        job = await self.db[COLLECTION].find_one({"_id": job_id})
+        if job is not None and job["status"] != "failed" and not self._stale(job):
+            return job
+
+        if self._queue is None:
+            raise ReportQueueFull("Report workers are not running")
+        if self._queue.full():
+            raise ReportQueueFull(f"{self.queue_size} reports already queued")
+
+        now = datetime.now(timezone.utc)
+        if job is None:
+            job = {
+                "_id": job_id,
+                "spec": spec,
+                "data_version": data_version,
+                "status": "queued",
+                "result": None,
+                "error": None,
+                "requested_by": user_id,
+                "created_at": now,
+                "updated_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "duration_ms": None,
+            }
+            try:
+                await self.db[COLLECTION].insert_one(job)
+            except DuplicateKeyError:
+                # Another request (or worker process) queued the same report first
+                return await self.db[COLLECTION].find_one({"_id": job_id})
+        else:
+            # Retry; the status/updated_at guard lets only one of several concurrent retries through
+            job = await self.db[COLLECTION].find_one_and_update(
+                {"_id": job_id, "status": job["status"], "updated_at": job["updated_at"]},
+                {"$set": {"status": "queued", "error": None, "updated_at": now, "requested_by": user_id}},
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                return await self.db[COLLECTION].find_one({"_id": job_id})
+
+        self._queue.put_nowait((job_id, spec))
+        return job
+
+    async def get(self, job_id: str, with_result: bool = True) -> Optional[dict]:
+        return await self.db[COLLECTION].find_one({"_id": job_id}, None if with_result else {"result": 0})
+
+    async def _work(self):
+        while True:
+            job_id, spec = await self._queue.get()
+            try:
+                await self._run(job_id, spec)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Losing a status write leaves the job to be retried once stale; keep the worker alive
+                logger.error("Report job %s could not be recorded: %s", job_id, e)
+
+    async def _run(self, job_id: str, spec: dict):
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        await self.db[COLLECTION].update_one(
+            {"_id": job_id},
+            {"$set": {"status": "running", "started_at": now, "updated_at": now}}
+        )
+        try:
+            result = await self.compute(spec)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Report job %s failed", job_id)
+            self.failed += 1
+            update = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+        else:
+            self.completed += 1
+            update = {"status": "done", "result": result}
+        finished = datetime.now(timezone.utc)
+        update.update(finished_at=finished, updated_at=finished, duration_ms=round((time.perf_counter() - started) * 1000, 1))
+        await self.db[COLLECTION].update_one({"_id": job_id}, {"$set": update})
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
@@ -1,5 +1,11 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, Response
+import time
+# Taken before the framework imports so the startup report covers them
+SERVER_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, status, Request, Response, UploadFile, File
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -7,34 +13,181 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import uuid
-import aiohttp
+import re
+import json
+from functools import lru_cache
+from contextlib import asynccontextmanager
+import base64
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from indexes import ensure_indexes, audit_indexes
+from migrations import run_migrations, DuplicatePlanningCells
+from principal_cache import PrincipalCache
+from reference_data import ReferenceDataCache
+from notification_bus import NotificationBus
+from planning_cube import PlanningCubeRegistry, CUBE_LEVELS
+from plan_totals import TOTAL_LEVELS, apply_deltas, plan_versions, reclassify_products, total_id, verify_totals
+from product_import import ProductImporter, ImportFormatError, iter_rows
+from product_search import ProductSearch, PROJECTION as PRODUCT_SEARCH_PROJECTION
+from catalog_tree import CatalogTree, CATALOG_SOURCES, MAX_DEPTH as CATALOG_MAX_DEPTH
+from slow_queries import SlowQueryLog, summarize as summarize_slow_queries
+from metrics import MetricsMiddleware, MongoCommandListener, registry as metrics_registry, timed
+from auth_client import SessionDataClient, CircuitBreaker, InvalidSessionError, AuthServiceUnavailable
+from startup_timing import StartupTimer
+from mongo_settings import client_options, read_preference, describe_topology
+from report_jobs import ReportJobs, ReportQueueFull, period_range
+from columnar import accepts_columnar, encode_table, pack as pack_columnar, MEDIA_TYPE as COLUMNAR_MEDIA_TYPE
+
+startup_timer = StartupTimer(SERVER_IMPORT_STARTED)
+startup_timer.mark("imports")
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Readiness above this logs the startup breakdown as a warning
+STARTUP_TARGET_MS = float(os.environ.get("STARTUP_TARGET_MS", "300"))
+
+# Prometheus metrics at /metrics: per-route latency via middleware, per-command Mongo timings via a listener
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+# Commands slower than SLOW_QUERY_MS are logged, with an explain plan, to the capped slow_queries collection (0 = off)
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG_BYTES = int(os.environ.get("SLOW_QUERY_LOG_MB", "16")) * 1024 * 1024
+slow_query_log = SlowQueryLog(
+    SLOW_QUERY_MS,
+    explain=os.environ.get("SLOW_QUERY_EXPLAIN", "true").lower() == "true",
+    explain_interval=float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+)
+
+command_listeners = []
+if METRICS_ENABLED:
+    command_listeners.append(MongoCommandListener())
+if SLOW_QUERY_MS > 0:
+    command_listeners.append(slow_query_log)
+
+# MongoDB connection; pool sizes and timeouts come from MONGO_MAX_POOL_SIZE, MONGO_WAIT_QUEUE_TIMEOUT_MS, ... (see mongo_settings)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+MONGO_CLIENT_OPTIONS = client_options(os.environ)
+client = AsyncIOMotorClient(mongo_url, event_listeners=command_listeners, **MONGO_CLIENT_OPTIONS)
 db = client[os.environ['DB_NAME']]
 
+# Reporting reads (planning grids, rollups, totals, notification lists) may be served by secondaries
+# at most REPORT_MAX_STALENESS seconds behind; writes and read-your-own-write lookups always use db
+REPORT_READ_PREFERENCE = read_preference(
+    os.environ.get("REPORT_READ_PREFERENCE", "primary"),
+    float(os.environ.get("REPORT_MAX_STALENESS", "90"))
+)
+report_db = client.get_database(os.environ['DB_NAME'], read_preference=REPORT_READ_PREFERENCE)
+
+# Serialized departments/brands/categories/subcategories responses, keyed by collection version
+reference_cache = ReferenceDataCache(db, version_ttl=float(os.environ.get("REFERENCE_VERSION_TTL", "1")))
+
 # Security
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Page size of list endpoints when the request sets no limit, and the largest limit accepted
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+# Column types for the MessagePack form of planning grids, rollups and cube groups
+PLANNING_DATA_COLUMNS = {
+    "id": "uuid", "plan_id": "dictionary", "department_id": "dictionary", "product_id": "dictionary",
+    "planned": "float64", "actual": "float64", "status": "dictionary", "version": "int32",
+    "created_at": "timestamp", "updated_at": "timestamp",
+}
+ROLLUP_COLUMNS = {
+    "key": "dictionary", "name": "string", "department_id": "dictionary", "planned": "float64",
+    "actual": "float64", "variance": "float64", "completion": "float64", "rows": "int32",
+}
+CUBE_GROUP_COLUMNS = {"key": "dictionary", "planned": "float64", "actual": "float64", "variance": "float64", "completion": "float64"}
+
+# Largest planning grid batch accepted by PUT /planning-data/bulk, and how many of its cell writes run at once
+MAX_BULK_CHANGES = 5000
+BULK_WRITE_CONCURRENCY = int(os.environ.get("BULK_WRITE_CONCURRENCY", "16"))
+
+# Rows per bulk_write in POST /products/import
+PRODUCT_IMPORT_BATCH_SIZE = int(os.environ.get("PRODUCT_IMPORT_BATCH_SIZE", "1000"))
+
+# Reports are computed by REPORT_WORKERS background tasks per process; at most REPORT_QUEUE_SIZE wait
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", "2"))
+REPORT_QUEUE_SIZE = int(os.environ.get("REPORT_QUEUE_SIZE", "100"))
+# Queued/running jobs not updated for this long (their worker died) are run again on the next request
+REPORT_STALE_SECONDS = float(os.environ.get("REPORT_STALE_SECONDS", "600"))
+# Reference collections whose names and product mapping appear in reports
+REPORT_SOURCES = ("departments", "brands", "categories", "subcategories", "products")
+
+# Hashes with a different cost are re-hashed on the next successful login
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+# bcrypt releases the GIL, so a small thread pool keeps it off the event loop
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
 security = HTTPBearer()
 
-# Create the main app without a prefix
-app = FastAPI(title="Admin Dashboard API", version="1.0.0")
+# Token -> UserResponse, so authenticated requests skip the user lookup. User changes are
+# broadcast through the "principals" reference version, so other workers drop their entries
+# within REFERENCE_VERSION_TTL seconds rather than PRINCIPAL_CACHE_TTL
+principal_cache = PrincipalCache(
+    maxsize=int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("PRINCIPAL_CACHE_TTL", "60"))
+)
+
+# Emergent OAuth session exchange, shared across requests
+auth_client = SessionDataClient(
+    url=os.environ.get("AUTH_SESSION_URL", "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data"),
+    connect_timeout=float(os.environ.get("AUTH_CONNECT_TIMEOUT", "3")),
+    read_timeout=float(os.environ.get("AUTH_READ_TIMEOUT", "10")),
+    total_timeout=float(os.environ.get("AUTH_TOTAL_TIMEOUT", "15")),
+    max_retries=int(os.environ.get("AUTH_MAX_RETRIES", "2")),
+    breaker=CircuitBreaker(
+        threshold=int(os.environ.get("AUTH_BREAKER_THRESHOLD", "5")),
+        reset_after=float(os.environ.get("AUTH_BREAKER_RESET", "30"))
+    )
+)
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+# Per-plan NumPy cubes for repeated slicing; disabled when numpy is missing or PLANNING_CUBE=false
+planning_cubes = PlanningCubeRegistry(
+    db,
+    ttl=float(os.environ.get("PLANNING_CUBE_TTL", "60")),
+    max_plans=int(os.environ.get("PLANNING_CUBE_MAX_PLANS", "16"))
+)
+PLANNING_CUBE_ENABLED = planning_cubes.available and os.environ.get("PLANNING_CUBE", "true").lower() == "true"
+
+# Typeahead index for GET /products/search, kept current by this worker's writes and
+# reloaded every PRODUCT_SEARCH_REFRESH seconds for everyone else's (0 = load once)
+product_search = ProductSearch()
+PRODUCT_SEARCH_REFRESH = float(os.environ.get("PRODUCT_SEARCH_REFRESH", "300"))
+
+# Live notification fan-out; with a change stream every worker publishes inserts from Mongo instead
+notification_bus = NotificationBus(queue_size=int(os.environ.get("NOTIFICATION_QUEUE_SIZE", "100")))
+NOTIFICATION_CHANGE_STREAM = os.environ.get("NOTIFICATION_CHANGE_STREAM", "false").lower() == "true"
+NOTIFICATION_HEARTBEAT_SECONDS = 15
+# Lifetime of the single-purpose tickets EventSource clients put in the stream URL instead of their token
+STREAM_TICKET_SECONDS = int(os.environ.get("STREAM_TICKET_SECONDS", "60"))
+STREAM_TICKET_SCOPE = "notification-stream"
+
+startup_timer.mark("clients")
+
+# One /api router per subsystem; create_app() mounts them
+auth_router = APIRouter(prefix="/api", tags=["auth"])
+master_data_router = APIRouter(prefix="/api", tags=["master data"])
+planning_router = APIRouter(prefix="/api", tags=["planning"])
+notifications_router = APIRouter(prefix="/api", tags=["notifications"])
+reports_router = APIRouter(prefix="/api", tags=["reports"])
+admin_router = APIRouter(prefix="/api", tags=["admin"])
 
 # Authentication Models
 class Token(BaseModel):
@@ -65,6 +218,13 @@ class User(BaseModel):
     is_active: bool = True
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class UserUpdate(BaseModel):
+    name: Optional[str] = None
+    role: Optional[str] = None
+    department_id: Optional[str] = None
+    avatar: Optional[str] = None
+    is_active: Optional[bool] = None
+
 class UserResponse(BaseModel):
     id: str
     name: str
@@ -81,6 +241,7 @@ class Department(BaseModel):
     code: str
     description: str
     status: str = "Active"
+    version: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     created_by: str
 
@@ -99,6 +260,7 @@ class Brand(BaseModel):
     article_type: str  # User's API field
     merchandise_code: str  # User's API field
     status: str = "Active"
+    version: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     created_by: str
 
@@ -160,6 +322,34 @@ class ProductCreate(BaseModel):
     brand_id: str
     mrp: float
 
+class ProductSearchHit(BaseModel):
+    id: str
+    name: str
+    ean_code: str
+    brand_id: Optional[str] = None
+    category_id: Optional[str] = None
+    subcategory_id: Optional[str] = None
+    mrp: Optional[float] = None
+    status: Optional[str] = None
+
+class ProductImportError(BaseModel):
+    row: int
+    ean_code: Optional[str] = None
+    error: str
+
+class ProductImportResult(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    unchanged: int
+    failed: int
+    duplicates: int
+    batches: int
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: List[ProductImportError]
+    errors_truncated: bool
+
 # Plan Management Models
 class Plan(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -201,6 +391,7 @@ class PlanningData(BaseModel):
     planned: float
     actual: float = 0.0
     status: str = "pending"
+    version: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -215,6 +406,79 @@ class PlanningDataUpdate(BaseModel):
     actual: Optional[float] = None
     status: Optional[str] = None
 
+class PlanningDataChange(BaseModel):
+    plan_id: str
+    department_id: str
+    product_id: str
+    planned: Optional[float] = None
+    actual: Optional[float] = None
+    status: Optional[str] = None
+
+class PlanningDataBulkUpdate(BaseModel):
+    changes: List[PlanningDataChange]
+
+class PlanningDataBulkResult(BaseModel):
+    index: int
+    plan_id: str
+    department_id: str
+    product_id: str
+    result: str  # inserted | updated | error
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class PlanningDataBulkResponse(BaseModel):
+    inserted_count: int
+    updated_count: int
+    error_count: int
+    results: List[PlanningDataBulkResult]
+
+class PlanTotal(BaseModel):
+    plan_id: str
+    level: str
+    department_id: Optional[str] = None
+    brand_id: Optional[str] = None
+    category_id: Optional[str] = None
+    planned: float = 0.0
+    actual: float = 0.0
+    variance: float = 0.0
+    rows: int = 0
+
+class PlanningRollupRow(BaseModel):
+    key: Optional[str] = None
+    name: Optional[str] = None
+    department_id: Optional[str] = None
+    planned: float = 0.0
+    actual: float = 0.0
+    variance: float = 0.0
+    completion: float = 0.0
+    rows: int = 0
+
+class PlanningRollup(BaseModel):
+    plan_id: str
+    department_id: Optional[str] = None
+    level: str
+    rows: List[PlanningRollupRow]
+    totals: PlanningRollupRow
+
+# Report Models
+class ReportRequest(BaseModel):
+    report_type: str = "brand"
+    period: str = "monthly"
+    timeframe: str
+    department_id: Optional[str] = None
+
+class ReportJob(BaseModel):
+    id: str
+    status: str
+    spec: Dict[str, Any]
+    data_version: str
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+
 # Notification Models
 class Notification(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -258,6 +522,17 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Verify on the bcrypt pool; returns a replacement hash when the stored cost is outdated"""
+    loop = asyncio.get_running_loop()
+    with timed("bcrypt_verify"):
+        return await loop.run_in_executor(password_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def hash_password(password) -> str:
+    loop = asyncio.get_running_loop()
+    with timed("bcrypt_hash"):
+        return await loop.run_in_executor(password_executor, get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -278,14 +553,31 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def to_timestamp(value) -> Optional[float]:
+    """Epoch seconds for a stored datetime; Mongo returns naive UTC datetimes"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return None
+
+async def cached_principal(token: str) -> Optional[UserResponse]:
+    principal_cache.sync(await reference_cache.version("principals"))
+    return principal_cache.get(token)
+
 async def get_user_from_session_token(session_token: str):
     """Get user from session token"""
+    cache_key = f"session:{session_token}"
+    cached_user = await cached_principal(cache_key)
+    if cached_user:
+        return cached_user
+    
     try:
         # Find active session
         session = await db.sessions.find_one({
             "session_token": session_token,
             "is_active": True,
-            "expires_at": {"$gt": datetime.now(timezone.utc).isoformat()}
+            "expires_at": {"$gt": datetime.now(timezone.utc)}
         })
         
         if not session:
@@ -295,8 +587,10 @@ async def get_user_from_session_token(session_token: str):
         user = await db.users.find_one({"id": session["user_id"]})
         if not user:
             return None
-            
-        return UserResponse(**user)
+        
+        user = UserResponse(**user)
+        principal_cache.put(cache_key, user, to_timestamp(session.get("expires_at")))
+        return user
     except Exception as e:
         print(f"Session validation error: {e}")
         return None
@@ -320,11 +614,16 @@ async def get_current_user(request: Request, credentials: Optional[HTTPAuthoriza
     if not credentials:
         raise credentials_exception
         
+    token = credentials.credentials
+    cached_user = await cached_principal(token)
+    if cached_user:
+        return cached_user
+    
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        # Scoped tokens (stream tickets) are only good for their own endpoint
+        if email is None or payload.get("scope"):
             raise credentials_exception
         token_data = TokenData(email=email)
     except JWTError:
@@ -333,7 +632,208 @@ async def get_current_user(request: Request, credentials: Optional[HTTPAuthoriza
     user = await db.users.find_one({"email": token_data.email})
     if user is None:
         raise credentials_exception
-    return UserResponse(**user)
+    
+    user = UserResponse(**user)
+    principal_cache.put(token, user, payload.get("exp"))
+    return user
+
+# Rollup level -> (group key on the per-product stage, collection holding the names)
+ROLLUP_LEVELS = {
+    "department": ("$_id.department_id", "departments"),
+    "brand": ("$product.brand_id", "brands"),
+    "category": ("$product.category_id", "categories"),
+    "subcategory": ("$product.subcategory_id", "subcategories"),
+    "product": ("$_id.product_id", "products"),
+}
+
+def build_rollup_pipeline(query: dict, level: str, by_department: bool = False, count_products: bool = False):
+    """Build the aggregation that rolls planning_data up to a hierarchy level"""
+    key_expr, ref_collection = ROLLUP_LEVELS[level]
+    pipeline = [
+        {"$match": query},
+        # Collapse to one row per product/department before joining
+        {"$group": {
+            "_id": {"product_id": "$product_id", "department_id": "$department_id"},
+            "planned": {"$sum": "$planned"},
+            "actual": {"$sum": "$actual"},
+            "rows": {"$sum": 1}
+        }},
+    ]
+    if level in ("brand", "category", "subcategory"):
+        pipeline += [
+            {"$lookup": {"from": "products", "localField": "_id.product_id", "foreignField": "id", "as": "product"}},
+            {"$unwind": {"path": "$product", "preserveNullAndEmptyArrays": True}},
+        ]
+    pipeline += [
+        {"$group": {
+            "_id": {"key": key_expr, "department_id": "$_id.department_id" if by_department else None},
+            "planned": {"$sum": "$planned"},
+            "actual": {"$sum": "$actual"},
+            "rows": {"$sum": "$rows"},
+            **({"products": {"$addToSet": "$_id.product_id"}} if count_products else {})
+        }},
+        {"$lookup": {"from": ref_collection, "localField": "_id.key", "foreignField": "id", "as": "ref"}},
+        {"$project": {
+            "_id": 0,
+            "key": "$_id.key",
+            "department_id": "$_id.department_id",
+            "name": {"$arrayElemAt": ["$ref.name", 0]},
+            "planned": 1,
+            "actual": 1,
+            "rows": 1,
+            **({"products": {"$size": "$products"}} if count_products else {}),
+            "variance": {"$subtract": ["$actual", "$planned"]},
+            "completion": {"$cond": [
+                {"$gt": ["$planned", 0]},
+                {"$multiply": [{"$divide": ["$actual", "$planned"]}, 100]},
+                0
+            ]}
+        }},
+        {"$sort": {"department_id": 1, "key": 1}}
+    ]
+    return pipeline
+
+def encode_cursor(oid: ObjectId) -> str:
+    """Encode the last seen _id as an opaque cursor"""
+    return base64.urlsafe_b64encode(oid.binary).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (InvalidId, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def search_filter(search: Optional[str], fields: List[str]) -> dict:
+    """Case-insensitive substring match on any of the given fields"""
+    if not search:
+        return {}
+    pattern = {"$regex": re.escape(search), "$options": "i"}
+    return {"$or": [{field: pattern} for field in fields]}
+
+async def paginate(collection, query: dict, response: Response, cursor: Optional[str] = None, limit: Optional[int] = None, descending: bool = False, projection: Optional[dict] = None):
+    """Keyset pagination on _id; sets X-Next-Cursor when more documents remain.
+
+    Every request is bounded: DEFAULT_PAGE_LIMIT documents unless `limit` asks for more, never over MAX_PAGE_LIMIT.
+    Clients that need the whole list follow X-Next-Cursor.
+    """
+    limit = max(1, min(limit or DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT))
+    if cursor:
+        after_cursor = {"_id": {"$lt" if descending else "$gt": decode_cursor(cursor)}}
+        query = {"$and": [query, after_cursor]} if query else after_cursor
+    
+    docs = await collection.find(query, projection).sort("_id", -1 if descending else 1).limit(limit + 1).to_list(length=limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1]["_id"])
+    return docs
+
+@lru_cache(maxsize=None)
+def model_projection(model) -> Dict[str, int]:
+    """Fetch only the model's fields (plus _id for paging) instead of stripping documents in Python"""
+    return {"_id": 1, **{name: 1 for name in model.model_fields}}
+
+@lru_cache(maxsize=None)
+def model_defaults(model):
+    return tuple((name, field) for name, field in model.model_fields.items() if not field.is_required())
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def fill_defaults(model, docs: List[dict]) -> List[dict]:
+    """Drop _id and add model defaults for fields older documents lack, in place"""
+    defaults = model_defaults(model)
+    for doc in docs:
+        doc.pop("_id", None)
+        for name, field in defaults:
+            if name not in doc:
+                doc[name] = field.get_default(call_default_factory=True)
+    return docs
+
+def page_headers(response: Optional[Response]) -> Dict[str, str]:
+    if response is None:
+        return {}
+    return {name: response.headers[name] for name in ("X-Next-Cursor", "Vary") if name in response.headers}
+
+def wants_columnar(request: Request, response: Response) -> bool:
+    """Content negotiation for grid endpoints; marks the response (JSON or not) as varying on Accept for shared caches"""
+    response.headers["Vary"] = "Accept"
+    return accepts_columnar(request.headers.get("accept"))
+
+def trusted_response(model, docs: List[dict], response: Optional[Response] = None) -> Response:
+    """Encode rows from our own collections straight to JSON, skipping model construction and response validation.
+
+    Only use for documents written by this API and fetched with model_projection(model).
+    """
+    body = json.dumps(fill_defaults(model, docs), default=json_default, separators=(",", ":")).encode()
+    return Response(content=body, media_type="application/json", headers=page_headers(response))
+
+def columnar_response(payload: dict, response: Optional[Response] = None) -> Response:
+    """MessagePack body for clients that asked for it with Accept: application/x-msgpack (see columnar.py)"""
+    return Response(content=pack_columnar(payload), media_type=COLUMNAR_MEDIA_TYPE, headers={"Vary": "Accept", **page_headers(response)})
+
+async def reference_response(request: Request, name: str, load, sources: Optional[Tuple[str, ...]] = None, key: Optional[str] = None) -> Response:
+    """Serve a reference-data GET from the snapshot for the current version, honoring If-None-Match.
+
+    Responses joined from several collections pass them as `sources`; the snapshot is then keyed by all their versions.
+    `key` identifies the view (default: the query string); `load` returns the items, or their JSON body as bytes.
+    """
+    version = await reference_version(sources) if sources else await reference_cache.version(name)
+    if key is None:
+        key = str(sorted(request.query_params.multi_items()))
+    etag = reference_cache.etag(name, version, key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    
+    snapshot = reference_cache.get(name, version, key)
+    if snapshot is None:
+        page = Response()
+        items = await load(page)
+        body = items if isinstance(items, bytes) else json.dumps(jsonable_encoder(items)).encode()
+        extra = {"X-Next-Cursor": page.headers["X-Next-Cursor"]} if "X-Next-Cursor" in page.headers else {}
+        snapshot = (body, extra)
+        reference_cache.put(name, version, key, body, extra)
+    
+    body, extra = snapshot
+    return Response(content=body, media_type="application/json", headers={**headers, **extra})
+
+async def reference_version(sources: Tuple[str, ...]) -> str:
+    return ".".join([str(await reference_cache.version(source)) for source in sources])
+
+def parse_if_match(request: Request) -> Optional[int]:
+    """Version from an If-Match header ("3", W/"3" or 3); None when absent or *"""
+    header = request.headers.get("if-match")
+    if header is None or header.strip() == "*":
+        return None
+    try:
+        return int(header.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+
+def version_filter(version: Optional[int]) -> dict:
+    if version is None:
+        return {}
+    if version == 0:
+        # Documents written before versioning count as version 0
+        return {"version": {"$in": [0, None]}}
+    return {"version": version}
+
+async def raise_update_failure(collection, doc_id: str, not_found: str):
+    """A conditional update matched nothing: report a missing document or a version conflict"""
+    current = await collection.find_one({"id": doc_id}, {"_id": 0, "version": 1})
+    if current is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    raise HTTPException(
+        status_code=409,
+        detail=f"Version conflict: current version is {current.get('version', 0)}",
+        headers={"ETag": f'"{current.get("version", 0)}"'}
+    )
 
 def serialize_doc(doc):
     """Convert MongoDB document to JSON serializable format"""
@@ -354,7 +854,7 @@ def serialize_doc(doc):
     return doc
 
 # Google OAuth Session Routes
-@api_router.post("/auth/process-session")
+@auth_router.post("/auth/process-session")
 async def process_google_session(request: Request, response: Response):
     """Process Google OAuth session ID and create user session"""
     try:
@@ -364,16 +864,13 @@ async def process_google_session(request: Request, response: Response):
             raise HTTPException(status_code=400, detail="Session ID required")
         
         # Call Emergent auth service to get user data
-        async with aiohttp.ClientSession() as session:
-            headers = {"X-Session-ID": session_id}
-            async with session.get(
-                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-                headers=headers
-            ) as resp:
-                if resp.status != 200:
-                    raise HTTPException(status_code=400, detail="Invalid session ID")
-                
-                auth_data = await resp.json()
+        try:
+            auth_data = await auth_client.fetch_session_data(session_id)
+        except InvalidSessionError:
+            raise HTTPException(status_code=400, detail="Invalid session ID")
+        except AuthServiceUnavailable as e:
+            print(f"Auth service unavailable: {e}")
+            raise HTTPException(status_code=503, detail="Authentication service unavailable")
         
         # Check if user exists, create if not
         existing_user = await db.users.find_one({"email": auth_data["email"]})
@@ -402,7 +899,7 @@ async def process_google_session(request: Request, response: Response):
             "id": str(uuid.uuid4()),
             "user_id": user.id,
             "session_token": auth_data["session_token"],
-            "expires_at": session_expires.isoformat(),
+            "expires_at": session_expires,  # BSON date so the TTL index can expire it
             "created_at": datetime.now(timezone.utc).isoformat(),
             "is_active": True
         }
@@ -425,11 +922,13 @@ async def process_google_session(request: Request, response: Response):
             "message": "Authentication successful"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Google auth error: {e}")
         raise HTTPException(status_code=500, detail="Authentication failed")
 
-@api_router.post("/auth/logout")
+@auth_router.post("/auth/logout")
 async def logout(request: Request, response: Response, current_user: UserResponse = Depends(get_current_user)):
     """Logout user and cleanup session"""
     try:
@@ -437,11 +936,14 @@ async def logout(request: Request, response: Response, current_user: UserRespons
         session_token = request.cookies.get("session_token")
         
         if session_token:
+            principal_cache.invalidate_token(f"session:{session_token}")
+            
             # Deactivate session in database
             await db.sessions.update_one(
                 {"session_token": session_token},
                 {"$set": {"is_active": False}}
             )
+            await reference_cache.bump("principals")
         
         # Clear cookie
         response.delete_cookie(
@@ -458,7 +960,7 @@ async def logout(request: Request, response: Response, current_user: UserRespons
         print(f"Logout error: {e}")
         return {"success": True, "message": "Logged out successfully"}
 
-@api_router.get("/auth/session-check")
+@auth_router.get("/auth/session-check")
 async def check_session(request: Request):
     """Check if user has valid session"""
     try:
@@ -479,22 +981,27 @@ async def check_session(request: Request):
         print(f"Session check error: {e}")
         return {"authenticated": False}
 # Traditional Authentication Routes
-@api_router.post("/auth/login", response_model=Token)
+@auth_router.post("/auth/login", response_model=Token)
 async def login(user_credentials: UserLogin):
     user = await db.users.find_one({"email": user_credentials.email})
-    if not user or not verify_password(user_credentials.password, user["hashed_password"]):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_update_password(user_credentials.password, user["hashed_password"])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        await db.users.update_one({"id": user["id"]}, {"$set": {"hashed_password": new_hash}})
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user["email"]}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@api_router.post("/auth/register", response_model=UserResponse)
+@auth_router.post("/auth/register", response_model=UserResponse)
 async def register(user: UserCreate, current_user: UserResponse = Depends(get_current_user)):
     # Only SuperAdmin and Admin can create users
     if current_user.role not in ["SuperAdmin", "Admin"]:
@@ -504,7 +1011,7 @@ async def register(user: UserCreate, current_user: UserResponse = Depends(get_cu
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     user_dict = user.dict()
     user_dict["hashed_password"] = hashed_password
     user_dict["id"] = str(uuid.uuid4())
@@ -515,20 +1022,24 @@ async def register(user: UserCreate, current_user: UserResponse = Depends(get_cu
     await db.users.insert_one(user_dict)
     return UserResponse(**user_dict)
 
-@api_router.get("/auth/me", response_model=UserResponse)
+@auth_router.get("/auth/me", response_model=UserResponse)
 async def read_users_me(current_user: UserResponse = Depends(get_current_user)):
     return current_user
 
 # User Management Routes
-@api_router.get("/users", response_model=List[UserResponse])
-async def get_users(current_user: UserResponse = Depends(get_current_user)):
+@auth_router.get("/users", response_model=List[UserResponse])
+async def get_users(response: Response, search: Optional[str] = None, role: Optional[str] = None, cursor: Optional[str] = None, limit: Optional[int] = None, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role not in ["SuperAdmin", "Admin"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    users = await db.users.find().to_list(length=None)
+    query = search_filter(search, ["name", "email"])
+    if role:
+        query["role"] = role
+    
+    users = await paginate(db.users, query, response, cursor, limit)
     return [UserResponse(**serialize_doc(user)) for user in users]
 
-@api_router.get("/users/{user_id}", response_model=UserResponse)
+@auth_router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(user_id: str, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role not in ["SuperAdmin", "Admin"] and current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -538,13 +1049,39 @@ async def get_user(user_id: str, current_user: UserResponse = Depends(get_curren
         raise HTTPException(status_code=404, detail="User not found")
     return UserResponse(**serialize_doc(user))
 
+@auth_router.put("/users/{user_id}", response_model=UserResponse)
+async def update_user(user_id: str, user_update: UserUpdate, current_user: UserResponse = Depends(get_current_user)):
+    if current_user.role not in ["SuperAdmin", "Admin"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    update_dict = {k: v for k, v in user_update.dict().items() if v is not None}
+    if not update_dict:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    
+    result = await db.users.update_one({"id": user_id}, {"$set": update_dict})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Role, department and is_active are baked into cached principals and notification targeting
+    principal_cache.invalidate_user(user_id)
+    await reference_cache.bump("principals")
+    
+    updated_user = UserResponse(**serialize_doc(await db.users.find_one({"id": user_id})))
+    if await db.notification_counters.find_one({"_id": user_id}, {"_id": 1}):
+        # Retarget the counter and recount what the new role/department sees, keeping the read watermark
+        await get_notification_counter(updated_user, refresh=True)
+    return updated_user
+
 # Department Management Routes
-@api_router.get("/departments", response_model=List[Department])
-async def get_departments(current_user: UserResponse = Depends(get_current_user)):
-    departments = await db.departments.find().to_list(length=None)
-    return [Department(**serialize_doc(dept)) for dept in departments]
+@master_data_router.get("/departments", response_model=List[Department])
+async def get_departments(request: Request, current_user: UserResponse = Depends(get_current_user)):
+    async def load(response: Response):
+        departments = await db.departments.find().to_list(length=None)
+        return [Department(**serialize_doc(dept)) for dept in departments]
+    
+    return await reference_response(request, "departments", load)
 
-@api_router.post("/departments", response_model=Department)
+@master_data_router.post("/departments", response_model=Department)
 async def create_department(department: DepartmentCreate, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role != "SuperAdmin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -553,26 +1090,31 @@ async def create_department(department: DepartmentCreate, current_user: UserResp
     dept_dict["id"] = str(uuid.uuid4())
     dept_dict["created_by"] = current_user.id
     dept_dict["created_at"] = datetime.now(timezone.utc).isoformat()
+    dept_dict["version"] = 0
     
     await db.departments.insert_one(dept_dict)
+    await reference_cache.bump("departments")
     return Department(**dept_dict)
 
-@api_router.put("/departments/{department_id}", response_model=Department)
-async def update_department(department_id: str, department: DepartmentCreate, current_user: UserResponse = Depends(get_current_user)):
+@master_data_router.put("/departments/{department_id}", response_model=Department)
+async def update_department(department_id: str, department: DepartmentCreate, request: Request, response: Response, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role != "SuperAdmin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    existing_dept = await db.departments.find_one({"id": department_id})
-    if not existing_dept:
-        raise HTTPException(status_code=404, detail="Department not found")
-    
-    update_data = department.dict()
-    await db.departments.update_one({"id": department_id}, {"$set": update_data})
+    updated_dept = await db.departments.find_one_and_update(
+        {"id": department_id, **version_filter(parse_if_match(request))},
+        {"$set": department.dict(), "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_dept:
+        await raise_update_failure(db.departments, department_id, "Department not found")
+    await reference_cache.bump("departments")
     
-    updated_dept = await db.departments.find_one({"id": department_id})
+    response.headers["ETag"] = f'"{updated_dept["version"]}"'
     return Department(**serialize_doc(updated_dept))
 
-@api_router.delete("/departments/{department_id}")
+@master_data_router.delete("/departments/{department_id}")
 async def delete_department(department_id: str, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role != "SuperAdmin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -580,15 +1122,23 @@ async def delete_department(department_id: str, current_user: UserResponse = Dep
     result = await db.departments.delete_one({"id": department_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Department not found")
+    await reference_cache.bump("departments")
     return {"message": "Department deleted successfully"}
 
 # Brand Management Routes
-@api_router.get("/brands", response_model=List[Brand])
-async def get_brands(current_user: UserResponse = Depends(get_current_user)):
-    brands = await db.brands.find().to_list(length=None)
-    return [Brand(**serialize_doc(brand)) for brand in brands]
+@master_data_router.get("/brands", response_model=List[Brand])
+async def get_brands(request: Request, search: Optional[str] = None, status_filter: Optional[str] = Query(None, alias="status"), cursor: Optional[str] = None, limit: Optional[int] = None, current_user: UserResponse = Depends(get_current_user)):
+    async def load(response: Response):
+        query = search_filter(search, ["name", "short_name"])
+        if status_filter:
+            query["status"] = status_filter
+        
+        brands = await paginate(db.brands, query, response, cursor, limit)
+        return [Brand(**serialize_doc(brand)) for brand in brands]
+    
+    return await reference_response(request, "brands", load)
 
-@api_router.post("/brands", response_model=Brand)
+@master_data_router.post("/brands", response_model=Brand)
 async def create_brand(brand: BrandCreate, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role != "SuperAdmin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -599,26 +1149,31 @@ async def create_brand(brand: BrandCreate, current_user: UserResponse = Depends(
     brand_dict["brand_id"] = brand_id  # Set brand_id same as id for API compatibility
     brand_dict["created_by"] = current_user.id
     brand_dict["created_at"] = datetime.now(timezone.utc).isoformat()
+    brand_dict["version"] = 0
     
     await db.brands.insert_one(brand_dict)
+    await reference_cache.bump("brands")
     return Brand(**brand_dict)
 
-@api_router.put("/brands/{brand_id}", response_model=Brand)
-async def update_brand(brand_id: str, brand: BrandCreate, current_user: UserResponse = Depends(get_current_user)):
+@master_data_router.put("/brands/{brand_id}", response_model=Brand)
+async def update_brand(brand_id: str, brand: BrandCreate, request: Request, response: Response, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role != "SuperAdmin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    existing_brand = await db.brands.find_one({"id": brand_id})
-    if not existing_brand:
-        raise HTTPException(status_code=404, detail="Brand not found")
-    
-    update_data = brand.dict()
-    await db.brands.update_one({"id": brand_id}, {"$set": update_data})
+    updated_brand = await db.brands.find_one_and_update(
+        {"id": brand_id, **version_filter(parse_if_match(request))},
+        {"$set": brand.dict(), "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_brand:
+        await raise_update_failure(db.brands, brand_id, "Brand not found")
+    await reference_cache.bump("brands")
     
-    updated_brand = await db.brands.find_one({"id": brand_id})
+    response.headers["ETag"] = f'"{updated_brand["version"]}"'
     return Brand(**serialize_doc(updated_brand))
 
-@api_router.delete("/brands/{brand_id}")
+@master_data_router.delete("/brands/{brand_id}")
 async def delete_brand(brand_id: str, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role != "SuperAdmin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -626,15 +1181,19 @@ async def delete_brand(brand_id: str, current_user: UserResponse = Depends(get_c
     result = await db.brands.delete_one({"id": brand_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Brand not found")
+    await reference_cache.bump("brands")
     return {"message": "Brand deleted successfully"}
 
 # Category Management Routes
-@api_router.get("/categories", response_model=List[Category])
-async def get_categories(current_user: UserResponse = Depends(get_current_user)):
-    categories = await db.categories.find().to_list(length=None)
-    return [Category(**serialize_doc(cat)) for cat in categories]
+@master_data_router.get("/categories", response_model=List[Category])
+async def get_categories(request: Request, current_user: UserResponse = Depends(get_current_user)):
+    async def load(response: Response):
+        categories = await db.categories.find().to_list(length=None)
+        return [Category(**serialize_doc(cat)) for cat in categories]
+    
+    return await reference_response(request, "categories", load)
 
-@api_router.post("/categories", response_model=Category)
+@master_data_router.post("/categories", response_model=Category)
 async def create_category(category: CategoryCreate, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role != "SuperAdmin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -645,15 +1204,19 @@ async def create_category(category: CategoryCreate, current_user: UserResponse =
     cat_dict["created_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.categories.insert_one(cat_dict)
+    await reference_cache.bump("categories")
     return Category(**cat_dict)
 
 # Subcategory Management Routes
-@api_router.get("/subcategories", response_model=List[Subcategory])
-async def get_subcategories(current_user: UserResponse = Depends(get_current_user)):
-    subcategories = await db.subcategories.find().to_list(length=None)
-    return [Subcategory(**serialize_doc(subcat)) for subcat in subcategories]
+@master_data_router.get("/subcategories", response_model=List[Subcategory])
+async def get_subcategories(request: Request, current_user: UserResponse = Depends(get_current_user)):
+    async def load(response: Response):
+        subcategories = await db.subcategories.find().to_list(length=None)
+        return [Subcategory(**serialize_doc(subcat)) for subcat in subcategories]
+    
+    return await reference_response(request, "subcategories", load)
 
-@api_router.post("/subcategories", response_model=Subcategory)
+@master_data_router.post("/subcategories", response_model=Subcategory)
 async def create_subcategory(subcategory: SubcategoryCreate, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role != "SuperAdmin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -664,15 +1227,24 @@ async def create_subcategory(subcategory: SubcategoryCreate, current_user: UserR
     subcat_dict["created_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.subcategories.insert_one(subcat_dict)
+    await reference_cache.bump("subcategories")
     return Subcategory(**subcat_dict)
 
 # Product Management Routes
-@api_router.get("/products", response_model=List[Product])
-async def get_products(current_user: UserResponse = Depends(get_current_user)):
-    products = await db.products.find().to_list(length=None)
-    return [Product(**serialize_doc(prod)) for prod in products]
+@master_data_router.get("/products", response_model=List[Product])
+async def get_products(response: Response, search: Optional[str] = None, brand_id: Optional[str] = None, category_id: Optional[str] = None, subcategory_id: Optional[str] = None, cursor: Optional[str] = None, limit: Optional[int] = None, current_user: UserResponse = Depends(get_current_user)):
+    query = search_filter(search, ["name", "ean_code"])
+    if brand_id:
+        query["brand_id"] = brand_id
+    if category_id:
+        query["category_id"] = category_id
+    if subcategory_id:
+        query["subcategory_id"] = subcategory_id
+    
+    products = await paginate(db.products, query, response, cursor, limit, projection=model_projection(Product))
+    return trusted_response(Product, products, response)
 
-@api_router.post("/products", response_model=Product)
+@master_data_router.post("/products", response_model=Product)
 async def create_product(product: ProductCreate, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role not in ["SuperAdmin", "Admin"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -682,16 +1254,118 @@ async def create_product(product: ProductCreate, current_user: UserResponse = De
     prod_dict["created_by"] = current_user.id
     prod_dict["created_at"] = datetime.now(timezone.utc).isoformat()
     
-    await db.products.insert_one(prod_dict)
+    try:
+        await db.products.insert_one(prod_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A product with this EAN code already exists")
+    product_search.upsert(prod_dict)
+    await reference_cache.bump("products")
     return Product(**prod_dict)
 
+@master_data_router.get("/products/search", response_model=List[ProductSearchHit])
+async def search_products(q: str, limit: int = 20, brand_id: Optional[str] = None, category_id: Optional[str] = None, subcategory_id: Optional[str] = None, current_user: UserResponse = Depends(get_current_user)):
+    """Typeahead: EAN prefix matches first, then products whose name tokens start with (or contain) every query word"""
+    limit = max(1, min(limit, 100))
+    if product_search.ready:
+        return product_search.search(q, limit, brand_id=brand_id, category_id=category_id, subcategory_id=subcategory_id)
+    
+    # Index still loading: fall back to a regex scan
+    query = search_filter(q.strip(), ["name", "ean_code"])
+    for field, value in (("brand_id", brand_id), ("category_id", category_id), ("subcategory_id", subcategory_id)):
+        if value:
+            query[field] = value
+    return await db.products.find(query, PRODUCT_SEARCH_PROJECTION).limit(limit).to_list(length=limit)
+
+async def index_imported_products(products: List[dict]):
+    async for product in db.products.find({"ean_code": {"$in": [p["ean_code"] for p in products]}}, PRODUCT_SEARCH_PROJECTION):
+        product_search.upsert(product)
+
+@master_data_router.post("/products/import", response_model=ProductImportResult)
+async def import_products(file: UploadFile = File(...), current_user: UserResponse = Depends(get_current_user)):
+    """Upsert products from a CSV or XLSX sheet on ean_code; brand, category and subcategory may be ids, codes or names"""
+    if current_user.role not in ["SuperAdmin", "Admin"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    importer = ProductImporter(
+        db, ProductCreate, current_user.id, batch_size=PRODUCT_IMPORT_BATCH_SIZE,
+        on_write=index_imported_products, on_reclassify=lambda changes: reclassify_products(db, changes)
+    )
+    try:
+        async for progress in importer.run(iter_rows(file.file, file.filename)):
+            logger.info("Product import %s: %d rows, %d failed, %.0f rows/s", file.filename, progress["rows"], progress["failed"], progress["rows_per_second"])
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if importer.stats["updated"]:
+        # Brand/category changes move products between cube slices
+        planning_cubes.invalidate()
+    if importer.stats["inserted"] or importer.stats["updated"]:
+        await reference_cache.bump("products")
+    return importer.report()
+
+# Catalog Tree
+# The joined tree for the latest source versions, shared by every depth/node view of it
+catalog_tree_cache: Dict[str, CatalogTree] = {}
+catalog_tree_lock = asyncio.Lock()
+
+def render_catalog_tree(tree: Optional[CatalogTree], sources: Optional[tuple], depth: int, node: Optional[str]) -> Tuple[CatalogTree, Optional[bytes]]:
+    """Build the tree from `sources` when no tree is given, then encode one view of it (None for an unknown node).
+
+    Both are CPU-bound for a large catalog and run together on an executor thread; the nodes are plain
+    dicts, so jsonable_encoder is skipped.
+    """
+    if tree is None:
+        tree = CatalogTree(*sources)
+    try:
+        view = tree.render(depth, node)
+    except KeyError:
+        return tree, None
+    return tree, json.dumps(view, default=json_default, separators=(",", ":")).encode()
+
+async def catalog_tree_body(version: str, depth: int, node: Optional[str]) -> Optional[bytes]:
+    loop = asyncio.get_running_loop()
+    tree = catalog_tree_cache.get(version)
+    if tree is None:
+        async with catalog_tree_lock:
+            tree = catalog_tree_cache.get(version)
+            if tree is None:
+                sources = await CatalogTree.fetch(db)
+                tree, body = await loop.run_in_executor(None, render_catalog_tree, None, sources, depth, node)
+                catalog_tree_cache.clear()
+                catalog_tree_cache[version] = tree
+                return body
+    return (await loop.run_in_executor(None, render_catalog_tree, tree, None, depth, node))[1]
+
+@master_data_router.get("/catalog/tree")
+async def get_catalog_tree(request: Request, depth: int = 1, node: Optional[str] = None, current_user: UserResponse = Depends(get_current_user)):
+    """Categories -> subcategories -> products (with brand), `depth` levels deep (default: categories only).
+
+    Collapsed nodes have "children": null and carry counts; pass node=category:<id> or
+    node=subcategory:<id> to expand one of them. Products and subcategories without a parent
+    are under category:unassigned.
+    """
+    depth = max(1, min(depth, CATALOG_MAX_DEPTH))
+    
+    async def load(response: Response):
+        body = await catalog_tree_body(await reference_version(CATALOG_SOURCES), depth, node)
+        if body is None:
+            raise HTTPException(status_code=404, detail="Catalog node not found")
+        return body
+    
+    # Keyed by the normalized view only, so extra query parameters cannot multiply snapshots
+    return await reference_response(request, "catalog", load, sources=CATALOG_SOURCES, key=f"depth={depth}&node={node or ''}")
+
 # Plan Management Routes
-@api_router.get("/plans", response_model=List[Plan])
-async def get_plans(current_user: UserResponse = Depends(get_current_user)):
-    plans = await db.plans.find().to_list(length=None)
+@planning_router.get("/plans", response_model=List[Plan])
+async def get_plans(response: Response, search: Optional[str] = None, status_filter: Optional[str] = Query(None, alias="status"), cursor: Optional[str] = None, limit: Optional[int] = None, current_user: UserResponse = Depends(get_current_user)):
+    query = search_filter(search, ["name"])
+    if status_filter:
+        query["status"] = status_filter
+    
+    plans = await paginate(db.plans, query, response, cursor, limit)
     return [Plan(**serialize_doc(plan)) for plan in plans]
 
-@api_router.post("/plans", response_model=Plan)
+@planning_router.post("/plans", response_model=Plan)
 async def create_plan(plan: PlanCreate, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role not in ["SuperAdmin", "Admin"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -705,22 +1379,136 @@ async def create_plan(plan: PlanCreate, current_user: UserResponse = Depends(get
     return Plan(**plan_dict)
 
 # Planning Data Routes
-@api_router.get("/planning-data", response_model=List[PlanningData])
-async def get_planning_data(plan_id: Optional[str] = None, department_id: Optional[str] = None, current_user: UserResponse = Depends(get_current_user)):
+@planning_router.get("/planning-data", response_model=List[PlanningData])
+async def get_planning_data(request: Request, response: Response, plan_id: Optional[str] = None, department_id: Optional[str] = None, product_id: Optional[str] = None, cursor: Optional[str] = None, limit: Optional[int] = None, current_user: UserResponse = Depends(get_current_user)):
     query = {}
     if plan_id:
         query["plan_id"] = plan_id
     if department_id:
         query["department_id"] = department_id
+    if product_id:
+        query["product_id"] = product_id
+    
+    # Role-based filtering
+    if current_user.role in ["Creator", "Approver", "User"] and current_user.department_id:
+        query["department_id"] = current_user.department_id
+    
+    planning_data = await paginate(report_db.planning_data, query, response, cursor, limit, projection=model_projection(PlanningData))
+    if wants_columnar(request, response):
+        return columnar_response(encode_table(fill_defaults(PlanningData, planning_data), PLANNING_DATA_COLUMNS), response)
+    return trusted_response(PlanningData, planning_data, response)
+
+@planning_router.get("/planning-data/rollup", response_model=PlanningRollup)
+async def get_planning_rollup(request: Request, response: Response, plan_id: str, department_id: Optional[str] = None, level: str = "brand", by_department: bool = False, current_user: UserResponse = Depends(get_current_user)):
+    """Planned/actual/variance totals per hierarchy level; omit department_id for the consolidated view"""
+    if level not in ROLLUP_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Invalid level, expected one of: {', '.join(ROLLUP_LEVELS)}")
+    
+    query = {"plan_id": plan_id}
+    if department_id:
+        query["department_id"] = department_id
     
     # Role-based filtering
     if current_user.role in ["Creator", "Approver", "User"] and current_user.department_id:
         query["department_id"] = current_user.department_id
     
-    planning_data = await db.planning_data.find(query).to_list(length=None)
-    return [PlanningData(**serialize_doc(data)) for data in planning_data]
+    pipeline = build_rollup_pipeline(query, level, by_department)
+    rows = await report_db.planning_data.aggregate(pipeline).to_list(length=None)
+    
+    planned = sum(row["planned"] for row in rows)
+    actual = sum(row["actual"] for row in rows)
+    totals = PlanningRollupRow(
+        department_id=query.get("department_id"),
+        planned=planned,
+        actual=actual,
+        variance=actual - planned,
+        completion=(actual / planned * 100) if planned > 0 else 0.0,
+        rows=sum(row["rows"] for row in rows)
+    )
+    if wants_columnar(request, response):
+        return columnar_response({
+            "plan_id": plan_id,
+            "department_id": query.get("department_id"),
+            "level": level,
+            "rows": encode_table(rows, ROLLUP_COLUMNS),
+            "totals": totals.model_dump(),
+        })
+    return PlanningRollup(
+        plan_id=plan_id,
+        department_id=query.get("department_id"),
+        level=level,
+        rows=[PlanningRollupRow(**row) for row in rows],
+        totals=totals
+    )
 
-@api_router.post("/planning-data", response_model=PlanningData)
+@planning_router.get("/plan-totals/{plan_id}", response_model=PlanTotal)
+async def get_plan_total(plan_id: str, level: str = "plan", department_id: Optional[str] = None, brand_id: Optional[str] = None, category_id: Optional[str] = None, current_user: UserResponse = Depends(get_current_user)):
+    """Point read of a maintained total, e.g. level=department_brand&department_id=..&brand_id=.."""
+    if level not in TOTAL_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Invalid level, expected one of: {', '.join(TOTAL_LEVELS)}")
+    
+    # Role-based filtering
+    if current_user.role in ["Creator", "Approver", "User"] and current_user.department_id:
+        if "department_id" not in TOTAL_LEVELS[level] or department_id != current_user.department_id:
+            raise HTTPException(status_code=403, detail="Access denied to this department")
+    
+    cell = {"department_id": department_id, "brand_id": brand_id, "category_id": category_id}
+    total = await report_db.plan_totals.find_one({"_id": total_id(level, plan_id, cell)}) or {}
+    planned = total.get("planned", 0.0)
+    actual = total.get("actual", 0.0)
+    return PlanTotal(
+        plan_id=plan_id,
+        level=level,
+        **{dimension: cell[dimension] for dimension in TOTAL_LEVELS[level]},
+        planned=planned,
+        actual=actual,
+        variance=actual - planned,
+        rows=total.get("rows", 0)
+    )
+
+@planning_router.get("/planning-cube/stats")
+async def get_planning_cube_stats(current_user: UserResponse = Depends(get_current_user)):
+    """Loaded cubes with their per-plan memory use"""
+    if current_user.role not in ["SuperAdmin", "Admin"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return {"enabled": PLANNING_CUBE_ENABLED, "plans": planning_cubes.stats()}
+
+@planning_router.get("/planning-cube/{plan_id}")
+async def query_planning_cube(
+    request: Request,
+    response: Response,
+    plan_id: str,
+    group_by: Optional[str] = None,
+    department_id: Optional[List[str]] = Query(None),
+    product_id: Optional[List[str]] = Query(None),
+    brand_id: Optional[List[str]] = Query(None),
+    category_id: Optional[List[str]] = Query(None),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Slice, total and variance queries against the in-memory cube for a plan"""
+    if not PLANNING_CUBE_ENABLED:
+        raise HTTPException(status_code=503, detail="Planning cube is disabled")
+    if group_by and group_by not in CUBE_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Invalid group_by, expected one of: {', '.join(CUBE_LEVELS)}")
+    
+    # Role-based filtering
+    if current_user.role in ["Creator", "Approver", "User"] and current_user.department_id:
+        department_id = [current_user.department_id]
+    
+    cube = await planning_cubes.get(plan_id)
+    result = cube.query(
+        group_by=group_by,
+        department_ids=department_id,
+        product_ids=product_id,
+        brand_ids=brand_id,
+        category_ids=category_id
+    )
+    if wants_columnar(request, response) and "groups" in result:
+        return columnar_response({**result, "groups": encode_table(result["groups"], CUBE_GROUP_COLUMNS)})
+    return result
+
+@planning_router.post("/planning-data", response_model=PlanningData)
 async def create_planning_data(planning_data: PlanningDataCreate, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role not in ["SuperAdmin", "Admin", "Creator"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -733,45 +1521,295 @@ async def create_planning_data(planning_data: PlanningDataCreate, current_user:
     data_dict["id"] = str(uuid.uuid4())
     data_dict["created_at"] = datetime.now(timezone.utc).isoformat()
     data_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    data_dict["version"] = 0
     
-    await db.planning_data.insert_one(data_dict)
+    try:
+        await db.planning_data.insert_one(data_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Planning data already exists for this plan, department and product")
+    await apply_deltas(db, [{**planning_data.dict(), "rows": 1}])
+    planning_cubes.apply_delta(data_dict["plan_id"], data_dict["department_id"], data_dict["product_id"], planned=data_dict["planned"])
     return PlanningData(**data_dict)
 
-@api_router.put("/planning-data/{data_id}", response_model=PlanningData)
-async def update_planning_data(data_id: str, update_data: PlanningDataUpdate, current_user: UserResponse = Depends(get_current_user)):
-    existing_data = await db.planning_data.find_one({"id": data_id})
-    if not existing_data:
-        raise HTTPException(status_code=404, detail="Planning data not found")
+# True inside an upsert pipeline when the update is inserting the cell (stored cells always have an id)
+NEW_CELL = {"$eq": [{"$ifNull": ["$id", None]}, None]}
+
+@planning_router.put("/planning-data/bulk", response_model=PlanningDataBulkResponse)
+async def bulk_upsert_planning_data(bulk: PlanningDataBulkUpdate, current_user: UserResponse = Depends(get_current_user)):
+    """Apply a batch of planning grid edits, keyed by (plan, department, product).
+
+    Each cell is upserted with find_one_and_update, whose pre-image gives the exact plan_totals delta
+    of that write even while other requests edit the same cells; up to BULK_WRITE_CONCURRENCY run at once.
+    """
+    if current_user.role not in ["SuperAdmin", "Admin", "Creator"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if len(bulk.changes) > MAX_BULK_CHANGES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_CHANGES} changes per request")
     
-    # Check permissions
-    if current_user.role == "Creator" and current_user.department_id != existing_data["department_id"]:
-        raise HTTPException(status_code=403, detail="Access denied")
+    now = datetime.now(timezone.utc).isoformat()
+    results = []
+    writes = []  # (result index, filter, update)
+    seen = set()
     
+    for index, change in enumerate(bulk.changes):
+        row = PlanningDataBulkResult(
+            index=index,
+            plan_id=change.plan_id,
+            department_id=change.department_id,
+            product_id=change.product_id,
+            result="error"
+        )
+        results.append(row)
+        
+        key = (change.plan_id, change.department_id, change.product_id)
+        update_dict = {k: v for k, v in change.dict(include={"planned", "actual", "status"}).items() if v is not None}
+        if current_user.role == "Creator" and current_user.department_id != change.department_id:
+            row.error = "Access denied to this department"
+            continue
+        if not update_dict:
+            row.error = "Nothing to update"
+            continue
+        if key in seen:
+            row.error = "Duplicate change in batch"
+            continue
+        seen.add(key)
+        
+        update_dict["updated_at"] = now
+        insert_defaults = {"id": str(uuid.uuid4()), "created_at": now}
+        for field, default in (("planned", 0.0), ("actual", 0.0), ("status", "pending")):
+            if field not in update_dict:
+                insert_defaults[field] = default
+        
+        # A pipeline update, so an inserted cell starts at version 0 like create_planning_data while an
+        # existing one counts one more write ($setOnInsert and $inc cannot express that together)
+        fields = {field: {"$literal": value} for field, value in update_dict.items()}
+        for field, default in insert_defaults.items():
+            fields[field] = {"$cond": [NEW_CELL, {"$literal": default}, f"${field}"]}
+        fields["version"] = {"$cond": [NEW_CELL, 0, {"$add": [{"$ifNull": ["$version", 0]}, 1]}]}
+        
+        row.id = insert_defaults["id"]
+        writes.append((
+            index,
+            {"plan_id": change.plan_id, "department_id": change.department_id, "product_id": change.product_id},
+            [{"$set": fields}]
+        ))
+    
+    slots = asyncio.Semaphore(BULK_WRITE_CONCURRENCY)
+    
+    async def write(query: dict, update: list) -> Optional[dict]:
+        """The cell's values before this write; None when the write inserted it"""
+        async with slots:
+            for attempt in range(2):
+                try:
+                    return await db.planning_data.find_one_and_update(
+                        query, update, projection={"_id": 0, "planned": 1, "actual": 1},
+                        upsert=True, return_document=ReturnDocument.BEFORE
+                    )
+                except DuplicateKeyError:
+                    # Another request inserted the cell first; the retry updates it
+                    if attempt:
+                        raise
+    
+    previous_values = await asyncio.gather(*(write(query, update) for _, query, update in writes), return_exceptions=True)
+    
+    deltas = []
+    for (index, _, _), previous in zip(writes, previous_values):
+        row = results[index]
+        if isinstance(previous, Exception):
+            # Reported on its row; the other cells' writes and totals deltas still apply
+            row.error = str(previous) if isinstance(previous, OperationFailure) else "Write failed"
+            row.id = None
+            if not isinstance(previous, OperationFailure):
+                logger.error("Bulk planning write failed: %s", previous)
+            continue
+        if previous is None:
+            row.result = "inserted"
+            previous = {}
+        else:
+            # Existing row: the generated id was never written
+            row.result = "updated"
+            row.id = None
+        change = bulk.changes[index]
+        deltas.append({
+            "plan_id": change.plan_id,
+            "department_id": change.department_id,
+            "product_id": change.product_id,
+            "planned": change.planned - (previous.get("planned") or 0.0) if change.planned is not None else 0.0,
+            "actual": change.actual - (previous.get("actual") or 0.0) if change.actual is not None else 0.0,
+            "rows": 1 if row.result == "inserted" else 0
+        })
+        planning_cubes.apply_set(change.plan_id, change.department_id, change.product_id, change.planned, change.actual)
+    await apply_deltas(db, deltas)
+    
+    inserted_count = sum(1 for row in results if row.result == "inserted")
+    updated_count = sum(1 for row in results if row.result == "updated")
+    return PlanningDataBulkResponse(
+        inserted_count=inserted_count,
+        updated_count=updated_count,
+        error_count=len(results) - inserted_count - updated_count,
+        results=results
+    )
+
+@planning_router.put("/planning-data/{data_id}", response_model=PlanningData)
+async def update_planning_data(data_id: str, update_data: PlanningDataUpdate, request: Request, response: Response, current_user: UserResponse = Depends(get_current_user)):
     update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
     update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
     
-    await db.planning_data.update_one({"id": data_id}, {"$set": update_dict})
+    query = {"id": data_id, **version_filter(parse_if_match(request))}
+    # Check permissions
+    if current_user.role == "Creator":
+        query["department_id"] = current_user.department_id
     
-    updated_data = await db.planning_data.find_one({"id": data_id})
+    # The previous values feed the plan_totals and cube deltas
+    existing_data = await db.planning_data.find_one_and_update(
+        query,
+        {"$set": update_dict, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not existing_data:
+        if current_user.role == "Creator":
+            current = await db.planning_data.find_one({"id": data_id}, {"_id": 0, "department_id": 1})
+            if current and current["department_id"] != current_user.department_id:
+                raise HTTPException(status_code=403, detail="Access denied")
+        await raise_update_failure(db.planning_data, data_id, "Planning data not found")
+    
+    # Stored values may be null
+    planned, actual = existing_data.get("planned") or 0.0, existing_data.get("actual") or 0.0
+    delta = {
+        "plan_id": existing_data["plan_id"],
+        "department_id": existing_data["department_id"],
+        "product_id": existing_data["product_id"],
+        "planned": update_dict.get("planned", planned) - planned,
+        "actual": update_dict.get("actual", actual) - actual
+    }
+    await apply_deltas(db, [delta])
+    planning_cubes.apply_delta(**delta)
+    
+    updated_data = {**existing_data, **update_dict, "version": existing_data.get("version", 0) + 1}
+    response.headers["ETag"] = f'"{updated_data["version"]}"'
     return PlanningData(**serialize_doc(updated_data))
 
 # Notification Routes
-@api_router.get("/notifications", response_model=List[Notification])
-async def get_notifications(current_user: UserResponse = Depends(get_current_user)):
-    query = {}
-    if current_user.role not in ["SuperAdmin", "Admin"]:
-        query = {
-            "$or": [
-                {"user_id": current_user.id},
-                {"department_id": current_user.department_id},
-                {"user_id": None, "department_id": None}
-            ]
+def notification_visibility(user: UserResponse) -> dict:
+    """Notifications a user may see: their own, their department's, and broadcasts; admins see all"""
+    if user.role in ["SuperAdmin", "Admin"]:
+        return {}
+    branches = [{"user_id": user.id}, {"user_id": None, "department_id": None}]
+    if user.department_id:
+        branches.insert(1, {"department_id": user.department_id})
+    return {"$or": branches}
+
+async def get_notification_counter(user: UserResponse, refresh: bool = False) -> dict:
+    """Per-user unread counter and read watermark, computed from scratch only on first use or refresh.
+
+    Everything with _id <= read_before is read; later notifications are read when listed in notification_reads.
+    """
+    counter = await db.notification_counters.find_one({"_id": user.id})
+    if counter is None or refresh:
+        read_before = counter.get("read_before") if counter else None
+        unread_query = notification_visibility(user)
+        reads_query = {"user_id": user.id}
+        if read_before:
+            unread_query = {"$and": [unread_query, {"_id": {"$gt": read_before}}]}
+            reads_query["notification_oid"] = {"$gt": read_before}
+        unread = await db.notifications.count_documents(unread_query) - await db.notification_reads.count_documents(reads_query)
+        counter = {
+            "_id": user.id,
+            "department_id": user.department_id,
+            "admin": user.role in ["SuperAdmin", "Admin"],
+            "unread": max(0, unread),
+            "read_before": read_before
         }
+        await db.notification_counters.replace_one({"_id": user.id}, counter, upsert=True)
+    return counter
+
+@notifications_router.get("/notifications", response_model=List[Notification])
+async def get_notifications(response: Response, read: Optional[bool] = None, type_filter: Optional[str] = Query(None, alias="type"), cursor: Optional[str] = None, limit: Optional[int] = None, current_user: UserResponse = Depends(get_current_user)):
+    conditions = [notification_visibility(current_user)]
+    if type_filter:
+        conditions.append({"type": type_filter})
+    
+    counter = await db.notification_counters.find_one({"_id": current_user.id}) or {}
+    read_before = counter.get("read_before")
+    if read is not None:
+        reads_query = {"user_id": current_user.id}
+        if read_before:
+            reads_query["notification_oid"] = {"$gt": read_before}
+        read_ids = await db.notification_reads.distinct("notification_id", reads_query)
+        if read:
+            read_branches = [{"id": {"$in": read_ids}}, {"read": True}]
+            if read_before:
+                read_branches.append({"_id": {"$lte": read_before}})
+            conditions.append({"$or": read_branches})
+        else:
+            conditions.append({"id": {"$nin": read_ids}, "read": {"$ne": True}})
+            if read_before:
+                conditions.append({"_id": {"$gt": read_before}})
     
-    notifications = await db.notifications.find(query).sort("created_at", -1).to_list(length=None)
+    query = {"$and": [c for c in conditions if c]} if any(conditions) else {}
+    
+    # Newest first; _id order follows insertion order. The page may come from a secondary, but the
+    # read state above and below stays on the primary so a just-marked notification shows as read
+    notifications = await paginate(report_db.notifications, query, response, cursor, limit, descending=True)
+    
+    page_reads = set(await db.notification_reads.distinct(
+        "notification_id",
+        {"user_id": current_user.id, "notification_id": {"$in": [notif["id"] for notif in notifications]}}
+    )) if notifications else set()
+    for notif in notifications:
+        notif["read"] = bool(notif.get("read")) or notif["id"] in page_reads or bool(read_before and notif["_id"] <= read_before)
     return [Notification(**serialize_doc(notif)) for notif in notifications]
 
-@api_router.post("/notifications", response_model=Notification)
+@notifications_router.get("/notifications/unread-count")
+async def get_unread_notification_count(refresh: bool = False, current_user: UserResponse = Depends(get_current_user)):
+    """O(1) read of the maintained counter; refresh=true recomputes it"""
+    counter = await get_notification_counter(current_user, refresh)
+    return {"count": counter["unread"]}
+
+@notifications_router.put("/notifications/mark-all-read")
+async def mark_all_notifications_read(current_user: UserResponse = Depends(get_current_user)):
+    counter = await get_notification_counter(current_user)
+    visibility = notification_visibility(current_user)
+    newest = await db.notifications.find_one(visibility, {"_id": 1}, sort=[("_id", -1)])
+    if newest is None or (counter.get("read_before") and newest["_id"] <= counter["read_before"]):
+        return {"count": 0}
+    
+    # Moving the watermark to the newest notification seen marks everything up to it as read without
+    # touching the notifications; anything created since stays unread and is recounted below
+    await db.notification_counters.update_one(
+        {"_id": current_user.id},
+        {"$set": {"read_before": newest["_id"]}}
+    )
+    await db.notification_reads.delete_many({"user_id": current_user.id, "notification_oid": {"$lte": newest["_id"]}})
+    await get_notification_counter(current_user, refresh=True)
+    return {"count": counter["unread"]}
+
+@notifications_router.put("/notifications/{notification_id}/read", response_model=Notification)
+async def mark_notification_read(notification_id: str, current_user: UserResponse = Depends(get_current_user)):
+    visibility = notification_visibility(current_user)
+    notif = await db.notifications.find_one({"$and": [visibility, {"id": notification_id}]} if visibility else {"id": notification_id})
+    if not notif:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    
+    counter = await get_notification_counter(current_user)
+    read_before = counter.get("read_before")
+    if not (read_before and notif["_id"] <= read_before):
+        result = await db.notification_reads.update_one(
+            {"user_id": current_user.id, "notification_id": notification_id},
+            {"$setOnInsert": {"notification_oid": notif["_id"], "read_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True
+        )
+        if result.upserted_id is not None:
+            await db.notification_counters.update_one(
+                {"_id": current_user.id, "unread": {"$gt": 0}},
+                {"$inc": {"unread": -1}}
+            )
+    
+    notif["read"] = True
+    return Notification(**serialize_doc(notif))
+
+@notifications_router.post("/notifications", response_model=Notification)
 async def create_notification(notification: NotificationCreate, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role not in ["SuperAdmin", "Admin"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -781,28 +1819,320 @@ async def create_notification(notification: NotificationCreate, current_user: Us
     notif_dict["created_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.notifications.insert_one(notif_dict)
-    return Notification(**notif_dict)
+    
+    # One update_many bumps the unread counter of every recipient that already has one
+    recipients = [{"admin": True}]
+    if notif_dict.get("user_id"):
+        recipients.append({"_id": notif_dict["user_id"]})
+    if notif_dict.get("department_id"):
+        recipients.append({"department_id": notif_dict["department_id"]})
+    if len(recipients) == 1:
+        recipients = [{}]
+    await db.notification_counters.update_many({"$or": recipients}, {"$inc": {"unread": 1}})
+    
+    created = Notification(**notif_dict)
+    if not NOTIFICATION_CHANGE_STREAM:
+        notification_bus.publish(jsonable_encoder(created))
+    return created
+
+@notifications_router.post("/notifications/stream-ticket")
+async def create_stream_ticket(current_user: UserResponse = Depends(get_current_user)):
+    """Short-lived ticket for GET /notifications/stream?ticket=..., so the access token never appears in a URL"""
+    ticket = create_access_token({"sub": current_user.id, "scope": STREAM_TICKET_SCOPE}, timedelta(seconds=STREAM_TICKET_SECONDS))
+    return {"ticket": ticket, "expires_in": STREAM_TICKET_SECONDS}
+
+async def get_stream_user(request: Request, ticket: Optional[str] = None):
+    """EventSource cannot send headers, so the stream also accepts a ?ticket= from POST /notifications/stream-ticket
+    next to cookies and Bearer auth"""
+    if not ticket:
+        authorization = request.headers.get("authorization", "")
+        token = authorization[7:] if authorization.lower().startswith("bearer ") else None
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token) if token else None
+        return await get_current_user(request, credentials)
+    
+    try:
+        payload = jwt.decode(ticket, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = {}
+    user = await db.users.find_one({"id": payload.get("sub")}) if payload.get("scope") == STREAM_TICKET_SCOPE else None
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired stream ticket")
+    return UserResponse(**user)
+
+@notifications_router.get("/notifications/stream")
+async def stream_notifications(request: Request, current_user: UserResponse = Depends(get_stream_user)):
+    """Server-Sent Events feed of notifications created after the connection opens"""
+    subscription = notification_bus.subscribe(
+        current_user.id,
+        current_user.department_id,
+        see_all=current_user.role in ["SuperAdmin", "Admin"]
+    )
+    
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    notification = await asyncio.wait_for(subscription.queue.get(), timeout=NOTIFICATION_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {notification['id']}\nevent: notification\ndata: {json.dumps(notification)}\n\n"
+        finally:
+            notification_bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Report Routes
+REPORT_TYPES = ("brand", "category", "subcategory", "department")
+
+async def report_plan_ids(spec: dict) -> List[str]:
+    """Plans whose start/end dates overlap the report period"""
+    start, end = period_range(spec["period"], spec["timeframe"])
+    plans = await db.plans.find({"start_date": {"$lt": end}, "end_date": {"$gte": start}}, {"_id": 0, "id": 1}).to_list(length=None)
+    return sorted(plan["id"] for plan in plans)
+
+async def report_data_version(spec: dict) -> str:
+    """Changes whenever planning data in the report's plans, or the names and mappings it joins, change"""
+    plan_ids = await report_plan_ids(spec)
+    writes = await plan_versions(db, plan_ids)
+    return json.dumps({
+        "plans": {plan_id: writes.get(plan_id, 0) for plan_id in plan_ids},
+        "reference": await reference_version(REPORT_SOURCES),
+    }, sort_keys=True)
+
+async def compute_report(spec: dict) -> dict:
+    plan_ids = await report_plan_ids(spec)
+    query = {"plan_id": {"$in": plan_ids}}
+    if spec.get("department_id"):
+        query["department_id"] = spec["department_id"]
+    
+    # Read from the primary: the result is stored under the data version read there at submission
+    pipeline = build_rollup_pipeline(query, spec["report_type"], count_products=True)
+    rows = await db.planning_data.aggregate(pipeline).to_list(length=None)
+    planned = sum(row["planned"] for row in rows)
+    actual = sum(row["actual"] for row in rows)
+    return {
+        "plan_ids": plan_ids,
+        "rows": rows,
+        "totals": {
+            "planned": planned,
+            "actual": actual,
+            "variance": actual - planned,
+            "completion": (actual / planned * 100) if planned > 0 else 0.0,
+            "rows": sum(row["rows"] for row in rows),
+        },
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+report_jobs = ReportJobs(db, compute_report, workers=REPORT_WORKERS, queue_size=REPORT_QUEUE_SIZE, stale_after=REPORT_STALE_SECONDS)
+
+def report_job_response(job: dict) -> ReportJob:
+    return ReportJob(id=job["_id"], **{key: value for key, value in job.items() if key != "_id"})
+
+@reports_router.post("/reports", response_model=ReportJob)
+async def submit_report(report: ReportRequest, response: Response, current_user: UserResponse = Depends(get_current_user)):
+    """Queue a report (202), or return the finished one (200) if the data has not changed since it was computed"""
+    if report.report_type not in REPORT_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid report_type, expected one of: {', '.join(REPORT_TYPES)}")
+    try:
+        period_range(report.period, report.timeframe)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    spec = report.dict()
+    # Role-based filtering
+    if current_user.role in ["Creator", "Approver", "User"] and current_user.department_id:
+        spec["department_id"] = current_user.department_id
+    
+    try:
+        job = await report_jobs.submit(spec, await report_data_version(spec), current_user.id)
+    except ReportQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Report queue is full, try again shortly: {e}")
+    if job["status"] != "done":
+        response.status_code = 202
+    return report_job_response(job)
+
+@reports_router.get("/reports/jobs/{job_id}", response_model=ReportJob)
+async def get_report_job(job_id: str, include_result: bool = True, current_user: UserResponse = Depends(get_current_user)):
+    """Poll a report job; the result is included once status is "done" """
+    job = await report_jobs.get(job_id, include_result)
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    
+    # Role-based filtering
+    if current_user.role in ["Creator", "Approver", "User"] and current_user.department_id:
+        if job["spec"].get("department_id") != current_user.department_id:
+            raise HTTPException(status_code=403, detail="Access denied to this department")
+    
+    return report_job_response(job)
+
+# Admin Routes
+@admin_router.get("/admin/indexes")
+async def get_index_report(current_user: UserResponse = Depends(get_current_user)):
+    """Missing, unused and redundant indexes per collection, from $indexStats"""
+    if current_user.role != "SuperAdmin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return await audit_indexes(db)
+
+@admin_router.post("/admin/plan-totals/verify")
+async def verify_plan_totals(plan_id: Optional[str] = None, repair: bool = False, current_user: UserResponse = Depends(get_current_user)):
+    """Recompute plan_totals from planning_data and report (optionally repair) drift"""
+    if current_user.role != "SuperAdmin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return await verify_totals(db, plan_id, repair)
+
+@admin_router.get("/admin/principal-cache")
+async def get_principal_cache_stats(current_user: UserResponse = Depends(get_current_user)):
+    """Hit/miss counters for the token -> user cache"""
+    if current_user.role != "SuperAdmin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return principal_cache.stats()
+
+@admin_router.get("/admin/auth-client")
+async def get_auth_client_stats(current_user: UserResponse = Depends(get_current_user)):
+    """Timeouts and circuit breaker state of the OAuth session-data client"""
+    if current_user.role != "SuperAdmin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return auth_client.stats()
+
+@admin_router.get("/admin/slow-queries")
+async def get_slow_queries(since_minutes: float = 60, limit: int = 50, current_user: UserResponse = Depends(get_current_user)):
+    """Commands over SLOW_QUERY_MS grouped by redacted query shape, worst total time first"""
+    if current_user.role != "SuperAdmin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    groups = await summarize_slow_queries(report_db, since_minutes, max(1, min(limit, 500)))
+    return {**slow_query_log.stats(), "groups": jsonable_encoder(groups)}
+
+@admin_router.get("/admin/report-jobs")
+async def get_report_job_stats(current_user: UserResponse = Depends(get_current_user)):
+    """Report workers, queue depth and completed/failed counts for this process"""
+    if current_user.role != "SuperAdmin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return report_jobs.stats()
+
+@admin_router.get("/admin/product-search")
+async def get_product_search_stats(current_user: UserResponse = Depends(get_current_user)):
+    """Size and age of the product typeahead index"""
+    if current_user.role != "SuperAdmin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return product_search.stats()
+
+@admin_router.get("/admin/mongo")
+async def get_mongo_settings(current_user: UserResponse = Depends(get_current_user)):
+    """Client pool options, the reporting read preference and the servers the driver currently sees"""
+    if current_user.role != "SuperAdmin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return {
+        "client_options": MONGO_CLIENT_OPTIONS,
+        "report_read_preference": REPORT_READ_PREFERENCE.document,
+        "topology": describe_topology(client),
+    }
+
+@admin_router.get("/admin/startup")
+async def get_startup_report(current_user: UserResponse = Depends(get_current_user)):
+    """Per-phase timings from this worker's first server import to readiness"""
+    if current_user.role != "SuperAdmin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return {**startup_timer.report(), "target_ms": STARTUP_TARGET_MS}
 
 # Health check
-@api_router.get("/health")
+@admin_router.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
 
 # Legacy status check endpoints
-@api_router.get("/")
+@admin_router.get("/")
 async def root():
     return {"message": "Admin Dashboard API", "version": "1.0.0"}
 
-# Include the router in the main app
-app.include_router(api_router)
+async def warm_up_mongo():
+    """Open the first pooled connection now rather than on the first request"""
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        logger.error(f"MongoDB warm-up failed: {e}")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def create_indexes():
+    try:
+        await run_migrations(db)
+        await ensure_indexes(db)
+    except DuplicatePlanningCells:
+        # Serving without the cell index would let writes add more duplicates; merge them first
+        raise
+    except Exception as e:
+        logger.error(f"Index bootstrap failed: {e}")
+
+async def prepare_slow_query_log():
+    try:
+        await slow_query_log.ensure_collection(db, SLOW_QUERY_LOG_BYTES)
+    except Exception as e:
+        logger.error(f"Slow query log setup failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_timer.run("mongo warm-up", warm_up_mongo())
+    setup = [startup_timer.run("indexes", create_indexes())]
+    if SLOW_QUERY_MS > 0:
+        setup.append(startup_timer.run("slow query log", prepare_slow_query_log()))
+    await asyncio.gather(*setup)
+    
+    tasks = []
+    if SLOW_QUERY_MS > 0:
+        tasks.append(asyncio.create_task(slow_query_log.run(db)))
+    if NOTIFICATION_CHANGE_STREAM:
+        tasks.append(asyncio.create_task(
+            notification_bus.follow_change_stream(db.notifications, lambda doc: jsonable_encoder(Notification(**serialize_doc(doc))))
+        ))
+    # Loads in the background; searches fall back to Mongo until it is ready
+    tasks.append(asyncio.create_task(product_search.follow(db, PRODUCT_SEARCH_REFRESH)))
+    report_jobs.start()
+    startup_timer.ready(STARTUP_TARGET_MS)
+    
+    yield
+    
+    for task in tasks:
+        task.cancel()
+    report_jobs.stop()
+    client.close()
+    password_executor.shutdown(wait=False)
+    await auth_client.close()
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Admin Dashboard API", version="1.0.0", lifespan=lifespan)
+    for router in (auth_router, master_data_router, planning_router, notifications_router, reports_router, admin_router):
+        app.include_router(router)
+    
+    if METRICS_ENABLED:
+        @app.get("/metrics", include_in_schema=False)
+        async def get_metrics():
+            """Prometheus text exposition for this worker"""
+            return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4")
+        
+        app.add_middleware(MetricsMiddleware)
+    
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
+    )
+    return app
 
 # Configure logging
 logging.basicConfig(
@@ -811,6 +2141,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+startup_timer.mark("routes")
+app = create_app()
+startup_timer.mark("app")
@@ -0,0 +1,274 @@
+"""Slow MongoDB command log: redacted query shapes, explain plans, and a capped collection to keep them in"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "slow_queries"
+# Driver housekeeping that is never interesting, plus our own explain calls
+IGNORED_COMMANDS = {"hello", "isMaster", "ismaster", "ping", "saslStart", "saslContinue", "endSessions", "killCursors", "explain", "buildInfo"}
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# Structural command fields kept as is; every other value is user data and only its shape is kept
+STRUCTURAL_FIELDS = {"collection", "sort", "projection", "limit", "hint", "key"}
+# Write batches: one entry per distinct statement shape, so batch size does not change the shape
+BATCH_FIELDS = {"documents", "updates", "deletes"}
+# Session/cluster fields that explain rejects or that say nothing about the query
+DRIVER_FIELDS = {"lsid", "txnNumber", "$clusterTime", "$db", "$readPreference", "readConcern", "writeConcern", "cursor"}
+
+def redact(value):
+    """Keep field names and operators, replace every value with "?" (value lists collapse to one "?")"""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $and/$or clauses and pipeline stages are structure; anything else is a value list
+        if value and all(isinstance(item, dict) for item in value):
+            return [redact(item) for item in value]
+        return "?"
+    return "?"
+
+def command_shape(command_name: str, command: dict) -> dict:
+    shape = {}
+    for key, value in command.items():
+        if key == command_name or key in DRIVER_FIELDS:
+            continue
+        if key in STRUCTURAL_FIELDS:
+            shape[key] = value
+        elif key in BATCH_FIELDS and isinstance(value, (list, tuple)):
+            statements = {json.dumps(redact(item), sort_keys=True): redact(item) for item in value}
+            shape[key] = [statements[statement] for statement in sorted(statements)]
+        else:
+            shape[key] = redact(value)
+    return shape
+
+# Explain plan fields that carry the query's literal values
+PLAN_VALUE_FIELDS = {"filter", "indexBounds", "parsedQuery"}
+
+def redact_plan(plan):
+    """An explain plan with the literal values in its filters and index bounds replaced by "?" """
+    if isinstance(plan, dict):
+        return {key: redact(value) if key in PLAN_VALUE_FIELDS else redact_plan(value) for key, value in plan.items()}
+    if isinstance(plan, list):
+        return [redact_plan(item) for item in plan]
+    return plan
+
+def _find_stats(explain) -> Optional[dict]:
+    """The first executionStats in an explain result; aggregate explains nest it per stage"""
+    if isinstance(explain, dict):
+        if "executionStats" in explain:
+            return explain
+        values = explain.values()
+    elif isinstance(explain, list):
+        values = explain
+    else:
+        return None
+    for value in values:
+        found = _find_stats(value)
+        if found is not None:
+            return found
+    return None
+
+def plan_summary(plan: Optional[dict]) -> Optional[str]:
+    """e.g. "FETCH <- IXSCAN plan_department_product" """
+    stages = []
+    while isinstance(plan, dict):
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage += f" {plan['indexName']}"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0] or plan.get("queryPlan")
+    return " <- ".join(stages) if stages else None
+
+class SlowQueryLog(monitoring.CommandListener):
+    """Command listener that records commands slower than `threshold_ms`.
+
+    Listener callbacks run on driver threads, so they only hand slow commands to the event loop;
+    `run` then captures an explain (at most once per shape every `explain_interval` seconds, since
+    executionStats re-runs the query) and writes the entry to a capped collection.
+    """
+
+    def __init__(self, threshold_ms: float, explain: bool = True, explain_interval: float = 300, queue_size: int = 1000):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._commands: Dict[tuple, dict] = {}
+        self._explained: Dict[str, float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    # Driver threads
+
+    def _key(self, event) -> tuple:
+        return event.request_id, event.connection_id
+
+    def started(self, event):
+        if self._queue is None or event.command_name in IGNORED_COMMANDS:
+            return
+        if event.command.get(event.command_name) == COLLECTION:
+            return
+        self._commands[self._key(event)] = event.command
+
+    def succeeded(self, event):
+        self._finished(event, None)
+
+    def failed(self, event):
+        self._finished(event, event.failure)
+
+    def _finished(self, event, failure):
+        command = self._commands.pop(self._key(event), None)
+        if command is None or event.duration_micros < self.threshold_ms * 1000 or self._queue is None:
+            return
+        item = (event.database_name, event.command_name, command, event.duration_micros / 1000, failure, getattr(event, "reply", None))
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue, item)
+        except RuntimeError:
+            pass  # loop closed during shutdown
+
+    def _enqueue(self, item):
+        if self._queue is None or self._queue.full():
+            self.dropped += 1
+            return
+        self._queue.put_nowait(item)
+
+    # Event loop
+
+    async def ensure_collection(self, db, size_bytes: int):
+        try:
+            await db.create_collection(COLLECTION, capped=True, size=size_bytes)
+        except CollectionInvalid:
+            pass  # already exists
+
+    async def run(self, db):
+        """Consume slow commands until cancelled, logging them to `db` whichever database they ran against"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        try:
+            while True:
+                item = await self._queue.get()
+                try:
+                    await self._record(db, *item)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Could not record slow query: %s", e)
+        finally:
+            self._queue = None
+
+    async def _record(self, db, database: str, command_name: str, command: dict, duration_ms: float, failure, reply):
+        collection = command.get("collection") if command_name == "getMore" else command.get(command_name)
+        shape = command_shape(command_name, command)
+        shape_json = json.dumps(shape, sort_keys=True, default=str)
+        shape_id = hashlib.sha1(f"{database}.{collection}.{command_name}:{shape_json}".encode()).hexdigest()[:16]
+        entry = {
+            "shape_id": shape_id,
+            "database": database,
+            "collection": collection if isinstance(collection, str) else None,
+            "command": command_name,
+            # Stored as text: shapes hold $-operators and dotted paths that are awkward as field names
+            "shape": shape_json,
+            "duration_ms": round(duration_ms, 2),
+            "failed": failure is not None,
+            "at": datetime.now(timezone.utc),
+            "docs_returned": _returned(reply),
+            "docs_examined": None,
+            "keys_examined": None,
+            "plan_summary": None,
+            "plan": None,
+        }
+        if self.explain and command_name in EXPLAINABLE_COMMANDS and self._explain_due(shape_id):
+            await self._explain(db.client[database], command_name, command, entry)
+        logger.warning("Slow query %.0fms %s.%s %s %s", duration_ms, database, entry["collection"], command_name, shape_json)
+        await db[COLLECTION].insert_one(entry)
+
+    def _explain_due(self, shape_id: str) -> bool:
+        now = time.monotonic()
+        if now - self._explained.get(shape_id, -self.explain_interval) < self.explain_interval:
+            return False
+        self._explained[shape_id] = now
+        if len(self._explained) > 10000:
+            self._explained.clear()
+        return True
+
+    async def _explain(self, db, command_name: str, command: dict, entry: dict):
+        explained = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+        if command_name == "aggregate":
+            explained["cursor"] = {}
+        try:
+            result = await db.command({"explain": explained, "verbosity": "executionStats"})
+        except Exception as e:
+            # Never lose the entry over a failed explain (unsupported command, permissions, ...)
+            entry["plan_summary"] = f"explain failed: {e}"
+            return
+        stats = _find_stats(result) or {}
+        execution = stats.get("executionStats", {})
+        winning = stats.get("queryPlanner", {}).get("winningPlan")
+        entry["docs_examined"] = execution.get("totalDocsExamined")
+        entry["keys_examined"] = execution.get("totalKeysExamined")
+        if execution.get("nReturned") is not None:
+            entry["docs_returned"] = execution["nReturned"]
+        entry["plan_summary"] = plan_summary(winning)
+        entry["plan"] = json.dumps(redact_plan(winning), default=str) if winning is not None else None
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "dropped": self.dropped,
+        }
+
+def _returned(reply) -> Optional[int]:
+    if not isinstance(reply, dict):
+        return None
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        if isinstance(batch, list):
+            return len(batch)
+    if isinstance(reply.get("n"), int):
+        return reply["n"]
+    return None
+
+async def summarize(db, since_minutes: float = 60, limit: int = 50) -> List[dict]:
+    """Slow commands grouped by shape, worst total time first"""
+    since = datetime.now(timezone.utc) - timedelta(minutes=since_minutes)
+    pipeline = [
+        {"$match": {"at": {"$gte": since}}},
+        {"$sort": {"at": 1}},
+        {"$group": {
+            "_id": "$shape_id",
+            "database": {"$last": "$database"},
+            "collection": {"$last": "$collection"},
+            "command": {"$last": "$command"},
+            "shape": {"$last": "$shape"},
+            "count": {"$sum": 1},
+            "failed": {"$sum": {"$cond": ["$failed", 1, 0]}},
+            "total_ms": {"$sum": "$duration_ms"},
+            "avg_ms": {"$avg": "$duration_ms"},
+            "max_ms": {"$max": "$duration_ms"},
+            "last_seen": {"$last": "$at"},
+            "docs_examined": {"$max": "$docs_examined"},
+            "docs_returned": {"$max": "$docs_returned"},
+            "plans": {"$addToSet": "$plan_summary"},
+        }},
+        {"$sort": {"total_ms": -1}},
+        {"$limit": limit},
+    ]
+    groups = []
+    async for group in db[COLLECTION].aggregate(pipeline):
+        group["shape_id"] = group.pop("_id")
+        group["shape"] = json.loads(group["shape"])
+        # Shapes explained under more than one plan show up with each of them
+        group["plans"] = sorted(plan for plan in group["plans"] if plan)
+        for key in ("total_ms", "avg_ms", "max_ms"):
+            group[key] = round(group[key], 2)
+        groups.append(group)
+    return groups
@@ -0,0 +1,45 @@
+"""Per-phase timings from the first server import to readiness"""
+import logging
+import time
+from typing import Awaitable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class StartupTimer:
+    """Phases are either marked sequentially (`mark` closes the phase since the previous mark) or
+    timed individually with `run`, which lets concurrent phases overlap."""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.phases: List[Tuple[str, float]] = []
+        self.ready_ms: Optional[float] = None
+        self._last = started
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.phases.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    async def run(self, name: str, awaitable: Awaitable):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            now = time.perf_counter()
+            self.phases.append((name, (now - started) * 1000))
+            self._last = max(self._last, now)
+
+    def ready(self, target_ms: float):
+        """Record readiness and log the breakdown, warning when it took longer than `target_ms`"""
+        self.ready_ms = (time.perf_counter() - self.started) * 1000
+        breakdown = ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.phases)
+        if self.ready_ms > target_ms:
+            logger.warning("Ready in %.0fms (target %.0fms): %s", self.ready_ms, target_ms, breakdown)
+        else:
+            logger.info("Ready in %.0fms: %s", self.ready_ms, breakdown)
+
+    def report(self) -> dict:
+        return {
+            "ready_ms": round(self.ready_ms, 1) if self.ready_ms is not None else None,
+            "phases": [{"phase": name, "ms": round(ms, 1)} for name, ms in self.phases],
+        }
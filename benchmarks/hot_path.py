@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Request Hot Path Micro-Benchmarks
+Times the fixed per-request primitives in server.py in isolation, on documents shaped like the
+ones Mongo returns:
+
+  serialize_doc               planning_data documents, per batch size
+  PlanningData/Product/Notification(**doc)
+                              model construction from serialized documents, per batch size
+  trusted_response            planning_data documents, per batch size
+  jwt.decode                  the decode done by get_current_user on a principal-cache miss
+  create_access_token
+  pwd_context.verify          at the configured bcrypt cost
+
+Each case is calibrated to run for at least --min-time per sample; the reported ops/sec is the
+median of --repeat samples, with the spread (max-min over median) so noisy runs are visible.
+Batched cases report rows/sec. Save a run with --save and compare later runs with --baseline;
+the script exits non-zero when a case is slower than the baseline by more than --tolerance.
+
+Usage:
+    python benchmarks/hot_path.py --save benchmarks/hot_path_baseline.json
+    python benchmarks/hot_path.py --baseline benchmarks/hot_path_baseline.json --tolerance 0.1
+"""
+
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+# Same document shapes (and server import setup) as the trusted-read benchmark
+from trusted_reads import planning_doc, product_doc, server
+
+def notification_doc(i):
+    return {
+        "_id": ObjectId(),
+        "id": str(uuid.uuid4()),
+        "title": f"Plan {i} submitted",
+        "message": "A department submitted its planning data for approval and is waiting for review.",
+        "type": "info",
+        "priority": "medium",
+        "department_id": str(uuid.uuid4()),
+        "user_id": None,
+        "read": bool(i % 2),
+        "created_at": datetime.now(timezone.utc),
+    }
+
+def sample(fn, min_time: float) -> float:
+    """Seconds per call, looping `fn` until at least `min_time` has passed"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / loops
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed * 1.2))
+
+def measure(fn, ops_per_call: int, repeat: int, min_time: float) -> dict:
+    fn()  # warm up caches and lazy imports
+    gc.collect()
+    gc.disable()
+    try:
+        rates = [ops_per_call / sample(fn, min_time) for _ in range(repeat)]
+    finally:
+        gc.enable()
+    median = statistics.median(rates)
+    return {"ops_per_sec": round(median, 1), "spread": round((max(rates) - min(rates)) / median, 3)}
+
+def batched_cases(batch: int):
+    planning = [planning_doc(i) for i in range(batch)]
+    planning_serialized = [server.serialize_doc(doc) for doc in planning]
+    products = [server.serialize_doc(product_doc(i)) for i in range(batch)]
+    notifications = [server.serialize_doc(notification_doc(i)) for i in range(batch)]
+    projection = server.model_projection(server.PlanningData)
+    projected = [{key: doc[key] for key in projection if key in doc} for doc in planning_serialized]
+    return {
+        "serialize_doc": lambda: [server.serialize_doc(doc) for doc in planning],
+        "PlanningData(**doc)": lambda: [server.PlanningData(**doc) for doc in planning_serialized],
+        "Product(**doc)": lambda: [server.Product(**doc) for doc in products],
+        "Notification(**doc)": lambda: [server.Notification(**doc) for doc in notifications],
+        # trusted_response fills defaults in place, which is idempotent on an already-filled batch
+        "trusted_response(PlanningData)": lambda: server.trusted_response(server.PlanningData, projected),
+    }
+
+def single_cases():
+    token = server.create_access_token({"sub": "superadmin@demo.com"}, timedelta(minutes=30))
+    hashed = server.pwd_context.hash("super123")
+    return {
+        "jwt.decode": lambda: server.jwt.decode(token, server.SECRET_KEY, algorithms=[server.ALGORITHM]),
+        "create_access_token": lambda: server.create_access_token({"sub": "superadmin@demo.com"}, timedelta(minutes=30)),
+        "pwd_context.verify": lambda: server.pwd_context.verify("super123", hashed),
+    }
+
+def compare(results, baseline, tolerance):
+    previous = {(r["case"], r["batch"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["case"], result["batch"]))
+        if before is None:
+            continue
+        result["vs_baseline"] = round(result["ops_per_sec"] / before["ops_per_sec"], 3)
+        if result["vs_baseline"] < 1 - tolerance:
+            regressions.append({"case": result["case"], "batch": result["batch"], "baseline": before["ops_per_sec"], "current": result["ops_per_sec"]})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 100, 1000, 10000, 100000])
+    parser.add_argument("--cases", nargs="*", help="Only run cases whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per sample")
+    parser.add_argument("--save", help="Write the results to this file for later --baseline runs")
+    parser.add_argument("--baseline", help="Earlier --save output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    def selected(name):
+        return not args.cases or any(part in name for part in args.cases)
+
+    results = []
+    for name, fn in single_cases().items():
+        if selected(name):
+            results.append({"case": name, "batch": 1, **measure(fn, 1, args.repeat, args.min_time)})
+    for batch in args.batches:
+        for name, fn in batched_cases(batch).items():
+            if selected(name):
+                results.append({"case": name, "batch": batch, **measure(fn, batch, args.repeat, args.min_time)})
+
+    report = {
+        "at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "bcrypt_rounds": server.BCRYPT_ROUNDS,
+        "results": results,
+    }
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(results, json.load(f), args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.save:
+        with open(args.save, "w") as f:
+            f.write(output + "\n")
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Load Test Suite
+Replays the scenarios from backend_test.py (login, master-data CRUD, planning-data reads and writes,
+notifications) as a weighted request mix from concurrent async workers, and reports throughput and
+p50/p95/p99 per endpoint as JSON.
+
+With --spawn it starts its own uvicorn against a throwaway database on a local mongod, seeds a
+SuperAdmin, and drops the database afterwards, so runs are repeatable between releases. Pass
+--baseline with an earlier report to fail (exit 1) when an endpoint's p95 or throughput regresses
+by more than --tolerance.
+
+Usage:
+    python benchmarks/load_test.py --spawn --mongo-url mongodb://localhost:27017 \\
+        --concurrency 32 --duration 30 --output load-report.json
+    python benchmarks/load_test.py --base-url http://localhost:8001/api \\
+        --email superadmin@demo.com --password super123 --baseline load-report.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Scenario -> relative weight in the request mix
+DEFAULT_MIX = {
+    "POST /auth/login": 2,
+    "GET /auth/me": 5,
+    "GET /departments": 4,
+    "POST /departments": 1,
+    "PUT /departments/{id}": 2,
+    "GET /brands": 4,
+    "POST /brands": 1,
+    "GET /categories": 3,
+    "GET /subcategories": 3,
+    "GET /products": 6,
+    "POST /products": 2,
+    "GET /products/search": 5,
+    "GET /catalog/tree": 2,
+    "GET /plans": 3,
+    "GET /planning-data": 15,
+    "GET /planning-data/rollup": 5,
+    "POST /planning-data": 4,
+    "PUT /planning-data/{id}": 10,
+    "GET /notifications": 8,
+    "GET /notifications/unread-count": 5,
+    "POST /notifications": 2,
+}
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+class LoadSuite:
+    """Shared fixtures (tokens and ids created during setup) plus one method per scenario"""
+
+    def __init__(self, client: httpx.AsyncClient, email: str, password: str, seed_products: int):
+        self.client = client
+        self.email = email
+        self.password = password
+        self.seed_products = seed_products
+        self.headers = {}
+        self.department_ids = []
+        self.brand_ids = []
+        self.product_ids = []
+        self.product_names = []
+        self.planning_ids = []
+        self.plan_id = None
+        self.category_id = None
+        self.subcategory_id = None
+
+    async def _create(self, path: str, body: dict) -> dict:
+        response = await self.client.post(path, json=body, headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def setup(self):
+        response = await self.client.post("/auth/login", json={"email": self.email, "password": self.password})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        tag = uuid.uuid4().hex[:6]
+        for i in range(3):
+            department = await self._create("/departments", {"name": f"Load Dept {tag}-{i}", "code": f"LD{tag}{i}", "description": "load test"})
+            self.department_ids.append(department["id"])
+        brand = await self._create("/brands", {
+            "name": f"Load Brand {tag}", "description": "load test", "short_name": f"LB{tag}",
+            "sap_division_code": "00", "article_type": "FG", "merchandise_code": "M1",
+        })
+        self.brand_ids.append(brand["id"])
+        self.category_id = (await self._create("/categories", {"name": f"Load Category {tag}", "code": f"LC{tag}", "description": "load test"}))["id"]
+        self.subcategory_id = (await self._create("/subcategories", {
+            "name": f"Load Subcategory {tag}", "code": f"LS{tag}", "category_id": self.category_id, "description": "load test",
+        }))["id"]
+        for i in range(self.seed_products):
+            product = await self._create("/products", self._product_body(f"Load {random.choice(['Biscuit', 'Chocolate', 'Tea', 'Soap'])} {tag} {i}"))
+            self.product_ids.append(product["id"])
+            self.product_names.append(product["name"])
+        self.plan_id = (await self._create("/plans", {
+            "name": f"Load Plan {tag}", "start_date": "2025-01-01", "end_date": "2025-12-31", "description": "load test",
+        }))["id"]
+        for product_id in self.product_ids:
+            for department_id in self.department_ids:
+                row = await self._create("/planning-data", {
+                    "plan_id": self.plan_id, "department_id": department_id, "product_id": product_id, "planned": 100.0,
+                })
+                self.planning_ids.append(row["id"])
+
+    def _product_body(self, name: str) -> dict:
+        return {
+            "name": name, "ean_code": str(uuid.uuid4().int)[:13], "category_id": self.category_id,
+            "subcategory_id": self.subcategory_id, "brand_id": random.choice(self.brand_ids), "mrp": 99.0,
+        }
+
+    async def run(self, scenario: str, rng: random.Random) -> httpx.Response:
+        c, h = self.client, self.headers
+        if scenario == "POST /auth/login":
+            return await c.post("/auth/login", json={"email": self.email, "password": self.password})
+        if scenario == "GET /auth/me":
+            return await c.get("/auth/me", headers=h)
+        if scenario == "GET /departments":
+            return await c.get("/departments", headers=h)
+        if scenario == "POST /departments":
+            code = uuid.uuid4().hex[:8]
+            return await c.post("/departments", json={"name": f"Load Dept {code}", "code": code, "description": "load test"}, headers=h)
+        if scenario == "PUT /departments/{id}":
+            code = uuid.uuid4().hex[:8]
+            return await c.put(f"/departments/{rng.choice(self.department_ids)}", json={"name": f"Load Dept {code}", "code": code, "description": "updated"}, headers=h)
+        if scenario == "GET /brands":
+            return await c.get("/brands", headers=h)
+        if scenario == "POST /brands":
+            code = uuid.uuid4().hex[:8]
+            return await c.post("/brands", json={
+                "name": f"Load Brand {code}", "description": "load test", "short_name": code,
+                "sap_division_code": "00", "article_type": "FG", "merchandise_code": "M1",
+            }, headers=h)
+        if scenario == "GET /categories":
+            return await c.get("/categories", headers=h)
+        if scenario == "GET /subcategories":
+            return await c.get("/subcategories", headers=h)
+        if scenario == "GET /products":
+            return await c.get("/products", params={"limit": 100}, headers=h)
+        if scenario == "POST /products":
+            return await c.post("/products", json=self._product_body(f"Load Extra {uuid.uuid4().hex[:6]}"), headers=h)
+        if scenario == "GET /products/search":
+            name = rng.choice(self.product_names)
+            return await c.get("/products/search", params={"q": name[:rng.randint(2, len(name))]}, headers=h)
+        if scenario == "GET /catalog/tree":
+            return await c.get("/catalog/tree", params={"depth": 2}, headers=h)
+        if scenario == "GET /plans":
+            return await c.get("/plans", headers=h)
+        if scenario == "GET /planning-data":
+            return await c.get("/planning-data", params={"plan_id": self.plan_id, "department_id": rng.choice(self.department_ids)}, headers=h)
+        if scenario == "GET /planning-data/rollup":
+            return await c.get("/planning-data/rollup", params={"plan_id": self.plan_id, "level": rng.choice(["brand", "category"])}, headers=h)
+        if scenario == "POST /planning-data":
+            return await c.post("/planning-data", json={
+                "plan_id": self.plan_id, "department_id": rng.choice(self.department_ids),
+                "product_id": rng.choice(self.product_ids), "planned": float(rng.randint(1, 500)),
+            }, headers=h)
+        if scenario == "PUT /planning-data/{id}":
+            return await c.put(f"/planning-data/{rng.choice(self.planning_ids)}", json={"actual": float(rng.randint(1, 500))}, headers=h)
+        if scenario == "GET /notifications":
+            return await c.get("/notifications", headers=h)
+        if scenario == "GET /notifications/unread-count":
+            return await c.get("/notifications/unread-count", headers=h)
+        if scenario == "POST /notifications":
+            return await c.post("/notifications", json={
+                "title": "Load test", "message": "load test notification", "department_id": rng.choice(self.department_ids),
+            }, headers=h)
+        raise ValueError(f"Unknown scenario {scenario}")
+
+async def worker(suite, mix, deadline, seed, samples, errors):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            response = await suite.run(scenario, rng)
+            ok = response.status_code < 400
+            status = response.status_code
+        except httpx.HTTPError as e:
+            ok, status = False, type(e).__name__
+        elapsed = (time.perf_counter() - start) * 1000
+        if ok:
+            samples.setdefault(scenario, []).append(elapsed)
+        else:
+            errors.setdefault(scenario, {}).setdefault(str(status), 0)
+            errors[scenario][str(status)] += 1
+
+async def run(args, base_url):
+    mix = {name: weight for name, weight in DEFAULT_MIX.items() if not args.scenarios or name in args.scenarios}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        suite = LoadSuite(client, args.email, args.password, args.seed_products)
+        await suite.setup()
+
+        if args.warmup > 0:
+            await asyncio.gather(*[worker(suite, mix, time.perf_counter() + args.warmup, args.seed + i, {}, {}) for i in range(args.concurrency)])
+
+        samples, errors = {}, {}
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[worker(suite, mix, deadline, args.seed + 1000 + i, samples, errors) for i in range(args.concurrency)])
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name in mix:
+        latencies = samples.get(name, [])
+        endpoints[name] = {
+            "count": len(latencies),
+            "errors": errors.get(name, {}),
+            "rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": round(max(latencies), 2) if latencies else None,
+        }
+    total = sum(endpoint["count"] for endpoint in endpoints.values())
+    return {
+        "at": datetime.now(timezone.utc).isoformat(),
+        "base_url": base_url,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "seed": args.seed,
+        "total_requests": total,
+        "total_errors": sum(sum(e.values()) for e in errors.values()),
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+def compare(report, baseline, tolerance):
+    """Endpoints whose p95 grew or whose throughput dropped by more than `tolerance` (a fraction)"""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous or not previous.get("count") or not current["count"]:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append({"endpoint": name, "metric": "p95_ms", "baseline": previous["p95_ms"], "current": current["p95_ms"]})
+        if previous["rps"] and current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append({"endpoint": name, "metric": "rps", "baseline": previous["rps"], "current": current["rps"]})
+    return regressions
+
+def spawn_server(args):
+    """uvicorn on a throwaway database, with a seeded SuperAdmin; returns (process, base_url, db_name)"""
+    from passlib.context import CryptContext
+    from pymongo import MongoClient
+
+    db_name = f"loadtest_{uuid.uuid4().hex[:8]}"
+    MongoClient(args.mongo_url)[db_name].users.insert_one({
+        "id": str(uuid.uuid4()),
+        "name": "Load Test Admin",
+        "email": args.email,
+        "hashed_password": CryptContext(schemes=["bcrypt"]).hash(args.password),
+        "role": "SuperAdmin",
+        "department_id": None,
+        "is_active": True,
+        "created_at": datetime.now(timezone.utc),
+    })
+    env = {**os.environ, "MONGO_URL": args.mongo_url, "DB_NAME": db_name}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}/api"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url, db_name
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become healthy")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001/api")
+    parser.add_argument("--email", default="superadmin@demo.com")
+    parser.add_argument("--password", default="super123")
+    parser.add_argument("--spawn", action="store_true", help="Start a local uvicorn on a throwaway database")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when spawning")
+    parser.add_argument("--keep-db", action="store_true", help="Do not drop the spawned database")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--seed-products", type=int, default=20, help="Products created during setup")
+    parser.add_argument("--scenarios", nargs="*", help=f"Subset of: {', '.join(DEFAULT_MIX)}")
+    parser.add_argument("--output", help="Also write the report to this file")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    process, db_name = None, None
+    base_url = args.base_url
+    if args.spawn:
+        process, base_url, db_name = spawn_server(args)
+    try:
+        report = asyncio.run(run(args, base_url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+            if not args.keep_db:
+                from pymongo import MongoClient
+                MongoClient(args.mongo_url).drop_database(db_name)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Login Throughput Benchmark
+Drives concurrent POST /auth/login calls against a running backend and measures
+logins/sec, plus the latency of an unrelated endpoint (/health) while logins run.
+
+Usage:
+    python benchmarks/login_throughput.py --email admin@demo.com --password admin123 \\
+        --base-url http://localhost:8001/api --concurrency 32 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+def summarize(latencies):
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": round(max(latencies), 2) if latencies else None,
+    }
+
+async def login_worker(client, args, deadline, latencies, failures):
+    credentials = {"email": args.email, "password": args.password}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post("/auth/login", json=credentials)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code == 200:
+            latencies.append(elapsed)
+        else:
+            failures.append(response.status_code)
+
+async def probe_worker(client, args, deadline, latencies):
+    """Hits a cheap endpoint at a fixed rate; its tail latency shows event-loop stalls"""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get(args.probe_path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(args.probe_interval)
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        # Baseline probe latency with no login load
+        baseline = []
+        await probe_worker(client, args, time.perf_counter() + min(3, args.duration), baseline)
+
+        login_latencies, failures, probe_latencies = [], [], []
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(
+            probe_worker(client, args, deadline, probe_latencies),
+            *[login_worker(client, args, deadline, login_latencies, failures) for _ in range(args.concurrency)]
+        )
+        elapsed = time.perf_counter() - started
+
+    return {
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "logins_per_sec": round(len(login_latencies) / elapsed, 2),
+        "login_failures": len(failures),
+        "login_latency": summarize(login_latencies),
+        "probe_path": args.probe_path,
+        "probe_latency_idle": summarize(baseline),
+        "probe_latency_under_load": summarize(probe_latencies),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001/api")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--probe-path", default="/health")
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
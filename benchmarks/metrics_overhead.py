@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Metrics Overhead Benchmark
+Times MetricsMiddleware around a minimal ASGI app (which sets scope["route"] the way FastAPI's
+router does) against the bare app, so the difference is the middleware's own cost rather than
+noise from a full framework request. Reports that cost as a share of the per-request budget at a
+given request rate (5k req/s on one worker = 200 us per request), and times the Mongo command
+listener callbacks. Exits non-zero when the overhead exceeds the target share.
+
+Usage:
+    python benchmarks/metrics_overhead.py --requests 20000 --rate 5000 --target-percent 2
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from metrics import MetricsMiddleware, MongoCommandListener  # noqa: E402
+
+class Route:
+    path = "/api/plans/{plan_id}"
+
+BODY = json.dumps({"id": "42", "name": "Plan", "status": "started"}).encode()
+
+async def endpoint(scope, receive, send):
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": BODY})
+
+async def drive(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/plans/42", "raw_path": b"/api/plans/42", "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests
+
+class Event:
+    command_name = "find"
+    command = {"find": "planning_data", "filter": {}}
+    request_id = 1
+    connection_id = ("localhost", 27017)
+    duration_micros = 850
+
+def listener_cost(iterations: int) -> float:
+    listener = MongoCommandListener()
+    event = Event()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        listener.started(event)
+        listener.succeeded(event)
+    return (time.perf_counter() - start) / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rate", type=float, default=5000, help="Requests per second per worker")
+    parser.add_argument("--target-percent", type=float, default=2.0)
+    args = parser.parse_args()
+
+    gc.disable()
+    plain, instrumented = endpoint, MetricsMiddleware(endpoint)
+    best_plain = best_instrumented = float("inf")
+    for _ in range(args.repeat):
+        # Interleave so drift (thermal, GC) hits both equally
+        best_plain = min(best_plain, asyncio.run(drive(plain, args.requests)))
+        best_instrumented = min(best_instrumented, asyncio.run(drive(instrumented, args.requests)))
+
+    overhead = max(0.0, best_instrumented - best_plain)
+    budget = 1.0 / args.rate
+    report = {
+        "plain_us_per_request": round(best_plain * 1e6, 2),
+        "instrumented_us_per_request": round(best_instrumented * 1e6, 2),
+        "middleware_overhead_us": round(overhead * 1e6, 2),
+        "mongo_listener_us_per_command": round(listener_cost(100000) * 1e6, 2),
+        "budget_us_at_rate": round(budget * 1e6, 1),
+        "overhead_percent_of_budget": round(overhead / budget * 100, 2),
+        "target_percent": args.target_percent,
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["overhead_percent_of_budget"] <= args.target_percent else 1)
+
+if __name__ == "__main__":
+    main()
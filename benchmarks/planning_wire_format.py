@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Planning Grid Wire Format Benchmark
+Compares the JSON body of GET /api/planning-data (trusted_response) with the columnar MessagePack
+body served for Accept: application/x-msgpack, on grids shaped like real plans (a few departments,
+many products, one plan). Reports bytes per row, the size ratio, and encode/decode time for both.
+Exits non-zero when the MessagePack body is not at least --target-ratio times smaller.
+
+Usage:
+    python benchmarks/planning_wire_format.py --rows 1000 10000 100000 --departments 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+import msgpack  # noqa: E402
+
+import server  # noqa: E402
+from columnar import decode_column, encode_table, pack  # noqa: E402
+
+def grid(rows: int, departments: int):
+    plan_id = str(uuid.uuid4())
+    department_ids = [str(uuid.uuid4()) for _ in range(departments)]
+    product_ids = [str(uuid.uuid4()) for _ in range(max(1, rows // departments))]
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "plan_id": plan_id,
+            "department_id": department_ids[i % departments],
+            "product_id": product_ids[i // departments % len(product_ids)],
+            "planned": float(i % 700),
+            "actual": float(i % 300),
+            "status": ("pending", "submitted", "approved")[i % 3],
+            "version": i % 4,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(rows)
+    ]
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--departments", type=int, default=5)
+    parser.add_argument("--target-ratio", type=float, default=5.0)
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        docs = grid(rows, args.departments)
+        json_body, json_encode_ms = timed(lambda: server.trusted_response(server.PlanningData, [dict(doc) for doc in docs]).body)
+        packed, packed_encode_ms = timed(lambda: pack(encode_table(docs, server.PLANNING_DATA_COLUMNS)))
+        _, json_decode_ms = timed(lambda: json.loads(json_body))
+        # Column-wise decode, as a typed-array client would: no per-row objects for the numeric columns
+        table, _ = timed(lambda: msgpack.unpackb(packed))
+        _, packed_decode_ms = timed(lambda: [decode_column(column) for name, column in table["columns"].items() if name in ("planned", "actual")])
+        results.append({
+            "rows": rows,
+            "json_bytes_per_row": round(len(json_body) / rows, 1),
+            "msgpack_bytes_per_row": round(len(packed) / rows, 1),
+            "ratio": round(len(json_body) / len(packed), 2),
+            "json_encode_ms": round(json_encode_ms, 1),
+            "msgpack_encode_ms": round(packed_encode_ms, 1),
+            "json_decode_ms": round(json_decode_ms, 1),
+            "msgpack_numeric_decode_ms": round(packed_decode_ms, 1),
+        })
+
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if all(result["ratio"] >= args.target_ratio for result in results) else 1)
+
+if __name__ == "__main__":
+    main()
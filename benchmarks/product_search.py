@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Product Typeahead Benchmark
+Builds the in-memory product search index over a synthetic catalog and measures per-query latency
+for the kinds of input a picker sends while the user types: EAN prefixes, name prefixes of one to
+three words, and infix fragments. Exits non-zero when p99 exceeds the target.
+
+No database or server is needed; this times ProductSearchIndex.search directly.
+
+Usage:
+    python benchmarks/product_search.py --products 500000 --queries 5000 --target-p99-ms 10
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from product_search import ProductSearchIndex  # noqa: E402
+
+BRANDS = ["Amul", "Britannia", "Cadbury", "Dabur", "Everest", "Fortune", "Godrej", "Haldiram", "Itc", "Kissan",
+          "Lipton", "Maggi", "Nestle", "Parle", "Patanjali", "Surf", "Tata", "Unibic", "Vim", "Wagh"]
+NOUNS = ["biscuit", "chocolate", "cookies", "noodles", "masala", "tea", "coffee", "butter", "cheese", "ghee",
+         "soap", "shampoo", "detergent", "atta", "rice", "oil", "juice", "ketchup", "jam", "namkeen",
+         "bhujia", "rusk", "cake", "wafer", "chips", "toothpaste", "handwash", "cream", "lotion", "honey"]
+ADJECTIVES = ["classic", "premium", "gold", "lite", "original", "spicy", "sweet", "salted", "herbal", "fresh",
+              "crunchy", "creamy", "organic", "family", "mini", "jumbo", "rich", "active", "pure", "royal"]
+SIZES = ["50g", "100g", "200g", "250g", "500g", "1kg", "100ml", "200ml", "500ml", "1l"]
+
+def catalog(n, seed):
+    rng = random.Random(seed)
+    brand_ids = {brand: str(uuid.UUID(int=rng.getrandbits(128))) for brand in BRANDS}
+    products = []
+    for i in range(n):
+        brand = rng.choice(BRANDS)
+        # A numeric variant suffix keeps most names distinct, like real SKU lists
+        name = f"{brand} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(SIZES)} v{rng.randint(1, 999)}"
+        products.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "name": name,
+            "ean_code": str(8900000000000 + rng.randrange(10 ** 9)),
+            "brand_id": brand_ids[brand],
+            "category_id": "c1",
+            "subcategory_id": "s1",
+            "mrp": 10.0 + i % 500,
+            "status": "Active",
+        })
+    return products
+
+def queries(products, n, seed):
+    rng = random.Random(seed + 1)
+    out = []
+    for _ in range(n):
+        product = rng.choice(products)
+        words = product["name"].lower().split()
+        kind = rng.randrange(5)
+        if kind == 0:
+            out.append(("ean_prefix", product["ean_code"][:rng.randint(4, 13)]))
+        elif kind == 1:
+            out.append(("one_word", words[0][:rng.randint(1, len(words[0]))]))
+        elif kind == 2:
+            out.append(("two_words", f"{words[0]} {words[2][:rng.randint(1, len(words[2]))]}"))
+        elif kind == 3:
+            out.append(("three_words", f"{words[0]} {words[1]} {words[2][:3]}"))
+        else:
+            noun = words[2]
+            start = rng.randrange(max(1, len(noun) - 3))
+            out.append(("infix", noun[start:start + 4]))
+    return out
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--target-p99-ms", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    products = catalog(args.products, args.seed)
+    index = ProductSearchIndex()
+    start = time.perf_counter()
+    index.build(products)
+    build_seconds = time.perf_counter() - start
+
+    # Incremental writes, as create_product and imports apply them
+    start = time.perf_counter()
+    for product in products[:1000]:
+        index.upsert({**product, "name": product["name"] + " refill"})
+    upsert_ms = (time.perf_counter() - start) * 1000 / 1000
+
+    workload = queries(products, args.queries, args.seed)
+    for _, q in workload[:200]:
+        index.search(q, args.limit)
+
+    timings = {}
+    for kind, q in workload:
+        start = time.perf_counter()
+        index.search(q, args.limit)
+        timings.setdefault(kind, []).append((time.perf_counter() - start) * 1000)
+
+    everything = sorted(t for values in timings.values() for t in values)
+    report = {
+        "products": args.products,
+        "build_seconds": round(build_seconds, 2),
+        "upsert_ms": round(upsert_ms, 3),
+        "index": index.stats(),
+        "queries": {
+            kind: {
+                "count": len(values),
+                "p50_ms": round(percentile(sorted(values), 0.50), 3),
+                "p99_ms": round(percentile(sorted(values), 0.99), 3),
+            }
+            for kind, values in sorted(timings.items())
+        },
+        "p50_ms": round(percentile(everything, 0.50), 3),
+        "p99_ms": round(percentile(everything, 0.99), 3),
+        "target_p99_ms": args.target_p99_ms,
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["p99_ms"] <= args.target_p99_ms else 1)
+
+if __name__ == "__main__":
+    main()
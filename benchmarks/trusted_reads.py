@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Trusted Read Path Benchmark
+Compares rows/sec for the response path of get_planning_data and get_products before and after
+the trusted-read fast path, on documents shaped like the ones Mongo returns.
+
+  validated: serialize_doc -> Model(**doc) -> FastAPI response_model validation -> JSON
+  trusted:   model_projection fetch -> trusted_response (defaults + json.dumps)
+
+No database is needed; the database round trip is identical for both paths.
+
+Usage:
+    python benchmarks/trusted_reads.py --rows 1000 10000 --repeat 5
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from bson import ObjectId  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import server  # noqa: E402
+
+def planning_doc(i):
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "_id": ObjectId(),
+        "id": str(uuid.uuid4()),
+        "plan_id": str(uuid.uuid4()),
+        "department_id": str(uuid.uuid4()),
+        "product_id": str(uuid.uuid4()),
+        "planned": float(i % 500),
+        "actual": float(i % 300),
+        "status": "pending",
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def product_doc(i):
+    return {
+        "_id": ObjectId(),
+        "id": str(uuid.uuid4()),
+        "name": f"Product {i}",
+        "ean_code": f"{8900000000000 + i}",
+        "category_id": str(uuid.uuid4()),
+        "subcategory_id": str(uuid.uuid4()),
+        "brand_id": str(uuid.uuid4()),
+        "mrp": 99.5 + i % 100,
+        "status": "Active",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_by": str(uuid.uuid4()),
+    }
+
+def validated_path(model, adapter, docs):
+    objects = [model(**server.serialize_doc(doc)) for doc in docs]
+    # What FastAPI does with the returned list when response_model is set
+    content = [obj.model_dump() for obj in objects]
+    validated = adapter.validate_python(content)
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+def trusted_path(model, adapter, docs):
+    return server.trusted_response(model, docs).body
+
+def measure(path, model, docs, repeat):
+    adapter = TypeAdapter(list[model])
+    best = float("inf")
+    for _ in range(repeat):
+        batch = copy.deepcopy(docs)  # both paths may mutate the driver's dicts
+        start = time.perf_counter()
+        path(model, adapter, batch)
+        best = min(best, time.perf_counter() - start)
+    return len(docs) / best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for label, model, factory in (("get_planning_data", server.PlanningData, planning_doc), ("get_products", server.Product, product_doc)):
+        for rows in args.rows:
+            docs = [factory(i) for i in range(rows)]
+            before = measure(validated_path, model, docs, args.repeat)
+            after = measure(trusted_path, model, docs, args.repeat)
+            results.append({
+                "endpoint": label,
+                "rows": rows,
+                "validated_rows_per_sec": round(before),
+                "trusted_rows_per_sec": round(after),
+                "speedup": round(after / before, 2),
+            })
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
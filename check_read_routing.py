@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Exercise the reporting read preference and pool settings against a replica set.
+
+Uses the same MONGO_* pool variables and REPORT_READ_PREFERENCE / REPORT_MAX_STALENESS as the
+server. Each round writes a probe document, reads it back from the primary (the read-your-own-write
+path) and through the reporting read preference, and records which server answered each read and
+whether the reporting read already saw the write. It then runs a burst of concurrent reporting
+reads to exercise the pool limits and wait-queue timeout.
+
+A local three-member replica set:
+    mkdir -p /tmp/rs0-0 /tmp/rs0-1 /tmp/rs0-2
+    mongod --replSet rs0 --port 27017 --dbpath /tmp/rs0-0 --fork --logpath /tmp/rs0-0.log
+    mongod --replSet rs0 --port 27018 --dbpath /tmp/rs0-1 --fork --logpath /tmp/rs0-1.log
+    mongod --replSet rs0 --port 27019 --dbpath /tmp/rs0-2 --fork --logpath /tmp/rs0-2.log
+    mongosh --port 27017 --eval 'rs.initiate({_id: "rs0", members: [
+        {_id: 0, host: "localhost:27017"}, {_id: 1, host: "localhost:27018"}, {_id: 2, host: "localhost:27019"}]})'
+
+Usage:
+    MONGO_URL="mongodb://localhost:27017/?replicaSet=rs0" DB_NAME=routing_check \\
+    REPORT_READ_PREFERENCE=secondaryPreferred MONGO_MAX_POOL_SIZE=10 MONGO_WAIT_QUEUE_TIMEOUT_MS=2000 \\
+        python check_read_routing.py [--rounds 50] [--concurrency 100]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from pathlib import Path
+from pymongo import monitoring
+
+ROOT_DIR = Path(__file__).parent / 'backend'
+load_dotenv(ROOT_DIR / '.env')
+sys.path.insert(0, str(ROOT_DIR))
+
+from mongo_settings import client_options, read_preference, describe_topology  # noqa: E402
+
+class ServedBy(monitoring.CommandListener):
+    """Remembers which server answered each find"""
+
+    def __init__(self):
+        self.servers = {}
+
+    def started(self, event):
+        if event.command_name == "find":
+            self.servers[event.request_id] = f"{event.connection_id[0]}:{event.connection_id[1]}"
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+served_by = ServedBy()
+
+# MongoDB connection, configured like the server's
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url, event_listeners=[served_by], **client_options(os.environ))
+db = client[os.environ['DB_NAME']]
+report_preference = read_preference(
+    os.environ.get("REPORT_READ_PREFERENCE", "primary"),
+    float(os.environ.get("REPORT_MAX_STALENESS", "90"))
+)
+report_db = client.get_database(os.environ['DB_NAME'], read_preference=report_preference)
+
+def last_server() -> str:
+    return served_by.servers[max(served_by.servers)]
+
+async def main(rounds, concurrency):
+    probes = db.read_routing_probe
+    try:
+        await client.admin.command("ping")
+        topology = describe_topology(client)
+        roles = {server["address"]: server["type"] for server in topology["servers"]}
+
+        primary_reads, report_reads = Counter(), Counter()
+        report_stale = 0
+        for _ in range(rounds):
+            probe_id = str(uuid.uuid4())
+            await probes.insert_one({"_id": probe_id, "at": time.time()})
+
+            if await probes.find_one({"_id": probe_id}) is None:
+                raise SystemExit("Primary read missed its own write")
+            primary_reads[roles.get(last_server(), last_server())] += 1
+
+            if await report_db.read_routing_probe.find_one({"_id": probe_id}) is None:
+                report_stale += 1
+            report_reads[roles.get(last_server(), last_server())] += 1
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *[report_db.read_routing_probe.find_one({}) for _ in range(concurrency)],
+            return_exceptions=True
+        )
+        burst_seconds = time.perf_counter() - started
+        errors = Counter(type(result).__name__ for result in results if isinstance(result, Exception))
+
+        print(json.dumps({
+            "topology": topology,
+            "client_options": client_options(os.environ),
+            "report_read_preference": report_preference.document,
+            "primary_reads_by_server_type": dict(primary_reads),
+            "report_reads_by_server_type": dict(report_reads),
+            "report_reads_missing_own_write": report_stale,
+            "burst": {"reads": concurrency, "seconds": round(burst_seconds, 3), "errors": dict(errors)},
+        }, indent=2))
+    finally:
+        await probes.drop()
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check where primary and reporting reads are served from")
+    parser.add_argument("--rounds", type=int, default=50, help="Write/read-back rounds")
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent reporting reads in the pool burst")
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds, args.concurrency))
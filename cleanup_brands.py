@@ -32,6 +32,10 @@ async def cleanup_brands():
         print(f"Deleting incomplete brand: {brand.get('name', 'Unknown')}")
         await db.brands.delete_one({"_id": brand["_id"]})
     
+    if incomplete_brands:
+        # Invalidate the API's cached brand snapshots
+        await db.ref_versions.update_one({"_id": "brands"}, {"$inc": {"version": 1}}, upsert=True)
+    
     print("Cleanup completed!")
 
 async def main():
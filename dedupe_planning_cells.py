@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Merge planning_data rows that share a (plan, department, product) cell, so the unique
+plan_department_product index can be built. The API refuses to start while such rows exist.
+
+Each cell keeps its most recently updated row; planned and actual of the other rows are added to it,
+so rollups and plan_totals show the same figures afterwards. Merged rows are copied to
+planning_data_merged. Without --apply only the report is printed.
+
+Usage:
+    python dedupe_planning_cells.py [--apply]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent / 'backend'
+load_dotenv(ROOT_DIR / '.env')
+sys.path.insert(0, str(ROOT_DIR))
+
+from migrations import ensure_unique_cells, merge_duplicate_cells  # noqa: E402
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url)
+db = client[os.environ['DB_NAME']]
+
+async def main(apply):
+    try:
+        report = await merge_duplicate_cells(db, apply)
+        print(f"{report['cells']} cells with {report['duplicate_rows']} duplicate rows")
+        for cell in report["details"]:
+            print(json.dumps(cell))
+        if apply:
+            print(f"Merged {report['merged']} rows")
+            await ensure_unique_cells(db)
+            print("Unique cell index created")
+        elif report["cells"]:
+            print("Dry run; re-run with --apply to merge")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge duplicate planning_data cells")
+    parser.add_argument("--apply", action="store_true", help="Merge the duplicates (default: report only)")
+    args = parser.parse_args()
+    asyncio.run(main(args.apply))
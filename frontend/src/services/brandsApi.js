@@ -1,6 +1,9 @@
 // Brands API service
 const BASE_URL = process.env.REACT_APP_BACKEND_URL + '/api' || 'https://your-api.com/api';
 
+// Largest page the list endpoints serve
+const PAGE_SIZE = 1000;
+
 // Helper function to get auth token
 const getAuthToken = () => {
   const user = localStorage.getItem('adminUser');
@@ -28,24 +31,37 @@ const getApiConfig = () => {
 };
 
 class BrandsApiService {
-  // GET: Fetch all brands
+  // GET: Fetch all brands, one page at a time
   async getBrands() {
     try {
-      const response = await fetch(`${BASE_URL}/brands`, {
-        method: 'GET',
-        ...getApiConfig()
-      });
+      const brands = [];
+      let cursor = null;
       
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      
-      const data = await response.json();
+      do {
+        const params = new URLSearchParams({ limit: PAGE_SIZE });
+        if (cursor) params.set('cursor', cursor);
+        
+        const response = await fetch(`${BASE_URL}/brands?${params}`, {
+          method: 'GET',
+          ...getApiConfig()
+        });
+        
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        
+        // Handle different response formats
+        // If API returns direct array: use data
+        // If API returns wrapped response: use data.data or data.brands
+        brands.push(...(Array.isArray(data) ? data : (data.data || data.brands || [])));
+        
+        // The API pages its lists; X-Next-Cursor is set while more brands remain
+        cursor = response.headers.get('X-Next-Cursor');
+      } while (cursor);
       
-      // Handle different response formats
-      // If API returns direct array: return data
-      // If API returns wrapped response: return data.data or data.brands
-      return Array.isArray(data) ? data : (data.data || data.brands || []);
+      return brands;
       
     } catch (error) {
       console.error('Error fetching brands:', error);
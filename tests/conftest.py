@@ -0,0 +1,55 @@
+"""Shared fixtures: the app on an in-memory mongomock database, and users with Bearer tokens"""
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+@pytest.fixture
+def db(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+
+    database = mongomock_motor.AsyncMongoMockClient()["test_database"]
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "report_db", database)
+    # Fresh version counters, so none carry over from another test's database
+    monkeypatch.setattr(server, "reference_cache", server.ReferenceDataCache(database, version_ttl=server.reference_cache.version_ttl))
+    for name in ("planning_cubes", "report_jobs"):
+        monkeypatch.setattr(getattr(server, name), "db", database)
+    server.principal_cache.clear()
+    return database
+
+@pytest.fixture
+def client(db):
+    import server
+    from fastapi.testclient import TestClient
+
+    return TestClient(server.create_app())
+
+@pytest.fixture
+def add_user(db):
+    """add_user(role, department_id=None) -> (user document, Authorization headers)"""
+    import server
+
+    def add(role, department_id=None):
+        user = {
+            "id": str(uuid.uuid4()),
+            "name": role,
+            "email": f"{uuid.uuid4().hex[:8]}@demo.com",
+            "hashed_password": "unused",
+            "role": role,
+            "department_id": department_id,
+            "is_active": True,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        asyncio.run(db.users.insert_one(dict(user)))
+        return user, {"Authorization": f"Bearer {server.create_access_token({'sub': user['email']})}"}
+    return add
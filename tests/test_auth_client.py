@@ -0,0 +1,51 @@
+"""Session-data exchange: retries share one total deadline"""
+import asyncio
+import time
+
+import pytest
+
+web = pytest.importorskip("aiohttp.web")
+
+from auth_client import AuthServiceUnavailable, SessionDataClient
+
+async def exchange(client: SessionDataClient, handler):
+    app = web.Application()
+    app.router.add_get("/session-data", handler)
+    runner = web.AppRunner(app, handler_cancellation=True)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    client.url = f"http://127.0.0.1:{port}/session-data"
+    try:
+        return await client.fetch_session_data("session-1")
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+def test_retries_stop_at_the_total_timeout():
+    calls = []
+
+    async def slow(request):
+        calls.append(request.headers["X-Session-ID"])
+        await asyncio.sleep(5)
+        return web.json_response({})
+
+    client = SessionDataClient("", read_timeout=0.4, total_timeout=0.6, max_retries=2)
+    started = time.monotonic()
+    with pytest.raises(AuthServiceUnavailable):
+        asyncio.run(exchange(client, slow))
+    # Three attempts at the read timeout alone would take 1.2s
+    assert time.monotonic() - started < 1.0
+    assert calls == ["session-1", "session-1"]
+    assert client.stats()["consecutive_failures"] == 1
+
+def test_retries_after_a_server_error():
+    responses = [web.Response(status=502), web.json_response({"email": "a@demo.com"})]
+
+    async def flaky(request):
+        return responses.pop(0)
+
+    client = SessionDataClient("", total_timeout=5)
+    assert asyncio.run(exchange(client, flaky)) == {"email": "a@demo.com"}
+    assert client.stats()["breaker_state"] == "closed"
@@ -0,0 +1,36 @@
+"""Catalog tree views, including products and subcategories whose parent is missing"""
+from catalog_tree import CatalogTree, UNASSIGNED
+
+def build():
+    return CatalogTree(
+        categories=[{"id": "cat-1", "name": "Snacks"}],
+        subcategories=[
+            {"id": "sub-1", "name": "Chips", "category_id": "cat-1"},
+            {"id": "sub-2", "name": "Soda", "category_id": "cat-gone"},
+        ],
+        brands=[{"id": "brand-1", "name": "Acme"}],
+        products=[
+            {"id": "p1", "name": "Salted", "subcategory_id": "sub-1", "brand_id": "brand-1"},
+            {"id": "p2", "name": "Cola", "subcategory_id": "sub-2"},
+            {"id": "p3", "name": "Lost", "subcategory_id": "sub-gone"},
+            {"id": "p4", "name": "Loose"},
+        ],
+    )
+
+def test_every_product_appears_in_the_tree():
+    tree = build()
+    roots = tree.render(depth=1)
+    assert [(root["id"], root["counts"]) for root in roots] == [
+        ("cat-1", {"subcategories": 1, "products": 1}),
+        (UNASSIGNED, {"subcategories": 2, "products": 3}),
+    ]
+    unassigned = tree.render(depth=2, node=f"category:{UNASSIGNED}")
+    assert [(sub["id"], [product["id"] for product in sub["children"]]) for sub in unassigned] == [
+        ("sub-2", ["p2"]),
+        (UNASSIGNED, ["p4", "p3"]),
+    ]
+
+def test_complete_catalog_has_no_unassigned_node():
+    tree = CatalogTree([{"id": "cat-1", "name": "Snacks"}], [{"id": "sub-1", "name": "Chips", "category_id": "cat-1"}], [], [])
+    assert [root["id"] for root in tree.render()] == ["cat-1"]
+    assert tree.render(node="category:cat-1")[0]["children"] == []
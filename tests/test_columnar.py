@@ -0,0 +1,70 @@
+"""Round trip of the columnar MessagePack encoding through the reference decoder"""
+import sys
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+msgpack = pytest.importorskip("msgpack")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from columnar import decode_table, encode_table, pack  # noqa: E402
+
+SCHEMA = {
+    "id": "uuid",
+    "department_id": "dictionary",
+    "status": "dictionary",
+    "planned": "float64",
+    "version": "int32",
+    "updated_at": "timestamp",
+    "name": "string",
+}
+
+def round_trip(rows, schema=SCHEMA):
+    return decode_table(msgpack.unpackb(pack(encode_table(rows, schema))))
+
+def test_round_trip_keeps_values_and_nulls():
+    departments = [str(uuid.uuid4()) for _ in range(3)]
+    updated_at = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "department_id": departments[i % 3],
+            "status": ("pending", "approved", None)[i % 3],
+            "planned": None if i == 4 else i * 1.5,
+            "version": i,
+            "updated_at": updated_at.isoformat() if i % 2 else updated_at,
+            "name": None if i == 2 else f"Row {i}",
+        }
+        for i in range(10)
+    ]
+
+    decoded = round_trip(rows)
+
+    assert len(decoded) == len(rows)
+    for row, back in zip(rows, decoded):
+        assert back["id"] == row["id"]
+        assert back["department_id"] == row["department_id"]
+        assert back["status"] == row["status"]
+        assert back["planned"] == row["planned"]
+        assert back["version"] == row["version"]
+        assert back["updated_at"] == updated_at.timestamp()
+        assert back["name"] == row["name"]
+
+def test_non_uuid_values_fall_back_to_strings():
+    rows = [{"id": "r1", "department_id": "d1"}, {"id": "r2", "department_id": None}]
+    table = encode_table(rows, {"id": "uuid", "department_id": "dictionary"})
+
+    assert table["columns"]["id"]["type"] == "string"
+    assert table["columns"]["department_id"]["values"]["type"] == "string"
+    assert round_trip(rows, {"id": "uuid", "department_id": "dictionary"}) == rows
+
+@pytest.mark.parametrize("distinct, width", [(10, 1), (200, 2), (40000, 4)])
+def test_dictionary_code_width_follows_cardinality(distinct, width):
+    rows = [{"key": f"k{i % distinct}"} for i in range(distinct * 2)]
+    column = encode_table(rows, {"key": "dictionary"})["columns"]["key"]
+
+    assert column["width"] == width
+    assert round_trip(rows, {"key": "dictionary"}) == rows
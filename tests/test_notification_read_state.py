@@ -0,0 +1,37 @@
+"""Notification read state: the mark-all-read watermark survives profile edits"""
+def unread(client, headers):
+    return client.get("/api/notifications/unread-count", headers=headers).json()["count"]
+
+def test_mark_all_read_survives_user_update(client, add_user):
+    _, admin = add_user("SuperAdmin")
+    user, headers = add_user("User", "dept-1")
+    for _ in range(3):
+        assert client.post("/api/notifications", json={"title": "Plan", "message": "Submitted", "department_id": "dept-1"}, headers=admin).status_code == 200
+
+    assert unread(client, headers) == 3
+    assert client.put("/api/notifications/mark-all-read", headers=headers).json() == {"count": 3}
+    assert unread(client, headers) == 0
+
+    # A profile edit must not bring the read notifications back
+    assert client.put(f"/api/users/{user['id']}", json={"name": "Renamed"}, headers=admin).status_code == 200
+    assert unread(client, headers) == 0
+    assert all(notification["read"] for notification in client.get("/api/notifications", headers=headers).json())
+
+    # Notifications after the watermark are still counted
+    client.post("/api/notifications", json={"title": "Plan", "message": "Approved", "department_id": "dept-1"}, headers=admin)
+    assert unread(client, headers) == 1
+    assert client.get("/api/notifications/unread-count?refresh=true", headers=headers).json()["count"] == 1
+
+def test_department_change_recounts_unread(client, add_user):
+    _, admin = add_user("SuperAdmin")
+    user, headers = add_user("User", "dept-1")
+    client.post("/api/notifications", json={"title": "Plan", "message": "Submitted", "department_id": "dept-2"}, headers=admin)
+    client.post("/api/notifications", json={"title": "Plan", "message": "Submitted", "department_id": "dept-1"}, headers=admin)
+    client.post("/api/notifications", json={"title": "Plan", "message": "Approved", "department_id": "dept-2"}, headers=admin)
+    assert unread(client, headers) == 1
+    client.put("/api/notifications/mark-all-read", headers=headers)
+
+    client.put(f"/api/users/{user['id']}", json={"department_id": "dept-2"}, headers=admin)
+    # The watermark is the newest dept-1 notification: dept-2's older one counts as read, its newer one does not
+    assert unread(client, headers) == 1
+    assert [n["read"] for n in client.get("/api/notifications", headers=headers).json()] == [False, True]
@@ -0,0 +1,54 @@
+"""Keyset pagination of list endpoints: default page size, limit cap and cursor round trips"""
+import asyncio
+
+import pytest
+
+import server
+
+@pytest.fixture
+def plans(db, monkeypatch):
+    monkeypatch.setattr(server, "DEFAULT_PAGE_LIMIT", 3)
+    monkeypatch.setattr(server, "MAX_PAGE_LIMIT", 5)
+    asyncio.run(db.plans.insert_many([
+        {"id": f"plan-{i}", "name": f"Plan {i}", "start_date": "2025-01-01", "end_date": "2025-12-31",
+         "status": "started" if i % 2 else "closed", "description": "", "created_by": "seed"}
+        for i in range(8)
+    ]))
+
+def fetch_all(client, headers, url, field="name", **params):
+    """Follow X-Next-Cursor to the last page, returning `field` of every item"""
+    values, cursor = [], None
+    while True:
+        response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})}, headers=headers)
+        assert response.status_code == 200
+        values += [item[field] for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return values
+
+def test_lists_are_bounded_without_a_limit(client, add_user, plans):
+    _, admin = add_user("SuperAdmin")
+    response = client.get("/api/plans", headers=admin)
+    assert [plan["name"] for plan in response.json()] == ["Plan 0", "Plan 1", "Plan 2"]
+    assert "X-Next-Cursor" in response.headers
+
+def test_limit_is_capped(client, add_user, plans):
+    _, admin = add_user("SuperAdmin")
+    assert len(client.get("/api/plans", params={"limit": 100}, headers=admin).json()) == 5
+    assert len(client.get("/api/plans", params={"limit": 0}, headers=admin).json()) == 3
+
+def test_cursor_round_trip_visits_every_document_once(client, add_user, plans):
+    _, admin = add_user("SuperAdmin")
+    assert fetch_all(client, admin, "/api/plans") == [f"Plan {i}" for i in range(8)]
+    assert fetch_all(client, admin, "/api/plans", limit=5, status="started") == ["Plan 1", "Plan 3", "Plan 5", "Plan 7"]
+
+def test_descending_lists_page_newest_first(client, add_user, db, monkeypatch):
+    monkeypatch.setattr(server, "DEFAULT_PAGE_LIMIT", 2)
+    _, admin = add_user("SuperAdmin")
+    for i in range(5):
+        client.post("/api/notifications", json={"title": f"N{i}", "message": "m"}, headers=admin)
+    assert fetch_all(client, admin, "/api/notifications", field="title") == ["N4", "N3", "N2", "N1", "N0"]
+
+def test_invalid_cursor_is_rejected(client, add_user, plans):
+    _, admin = add_user("SuperAdmin")
+    assert client.get("/api/plans", params={"cursor": "not-a-cursor"}, headers=admin).status_code == 400
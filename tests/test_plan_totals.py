@@ -0,0 +1,88 @@
+"""plan_totals stay equal to a recomputation across writes; drift is reported and repaired conditionally"""
+import asyncio
+
+import plan_totals
+from plan_totals import total_id, verify_totals
+
+def cell(product_id="prod-1", department_id="dept-1", **values):
+    return {"plan_id": "plan-1", "department_id": department_id, "product_id": product_id, **values}
+
+def stored(db, level="plan", **dimensions):
+    return asyncio.run(db.plan_totals.find_one({"_id": total_id(level, "plan-1", dimensions)}))
+
+def seed_products(db):
+    asyncio.run(db.products.insert_many([
+        {"id": "prod-1", "ean_code": "1", "brand_id": "brand-1", "category_id": "cat-1"},
+        {"id": "prod-2", "ean_code": "2", "brand_id": "brand-2", "category_id": "cat-1"},
+    ]))
+
+def test_writes_keep_totals_in_step(client, add_user, db):
+    seed_products(db)
+    _, admin = add_user("SuperAdmin")
+    created = client.post("/api/planning-data", json=cell(planned=10), headers=admin).json()
+    client.put("/api/planning-data/bulk", json={"changes": [cell(planned=4, actual=1), cell("prod-2", planned=6), cell("prod-2", "dept-2", actual=2)]}, headers=admin)
+    client.put(f"/api/planning-data/{created['id']}", json={"actual": 3}, headers=admin)
+
+    assert asyncio.run(verify_totals(db, "plan-1"))["drifted"] == 0
+    plan = stored(db)
+    assert (plan["planned"], plan["actual"], plan["rows"], plan["writes"]) == (10.0, 5.0, 3, 3)
+    assert stored(db, "brand", brand_id="brand-2")["planned"] == 6.0
+    assert client.get("/api/plan-totals/plan-1", params={"level": "department", "department_id": "dept-2"}, headers=admin).json()["actual"] == 2.0
+
+def test_drift_is_reported_then_repaired(db):
+    seed_products(db)
+    asyncio.run(db.planning_data.insert_many([cell(planned=5.0, actual=1.0), cell("prod-2", planned=2.0, actual=0.0)]))
+
+    report = asyncio.run(verify_totals(db, "plan-1"))
+    assert report["drifted"] == 8 and not report["repaired"]
+    assert stored(db) is None
+
+    assert asyncio.run(verify_totals(db, "plan-1", repair=True))["repaired"]
+    assert (stored(db)["planned"], stored(db)["rows"]) == (7.0, 2)
+
+    # A lost delta: the cell changed but its totals update never ran
+    asyncio.run(db.planning_data.update_one({"product_id": "prod-1"}, {"$set": {"planned": 8.0}}))
+    drift = asyncio.run(verify_totals(db, "plan-1", repair=True))["drift"]
+    assert {item["_id"] for item in drift} == {
+        total_id(level, "plan-1", {"department_id": "dept-1", "brand_id": "brand-1", "category_id": "cat-1"})
+        for level in ("plan", "department", "brand", "category", "department_brand", "department_category")
+    }
+    assert stored(db)["planned"] == 10.0
+    assert asyncio.run(verify_totals(db, "plan-1"))["drifted"] == 0
+
+def test_repair_skips_totals_changed_since_the_check(db, monkeypatch):
+    seed_products(db)
+    asyncio.run(db.planning_data.insert_one(cell(planned=5.0)))
+    asyncio.run(verify_totals(db, "plan-1", repair=True))
+    asyncio.run(db.planning_data.update_one({}, {"$set": {"planned": 9.0}}))
+
+    check = plan_totals._drift
+    async def check_then_concurrent_write(*args):
+        result = await check(*args)
+        # Another request's write and its $inc land between the check and the repair
+        await db.planning_data.update_one({}, {"$inc": {"planned": 1.0}})
+        await plan_totals.apply_deltas(db, [{**cell(), "planned": 1.0}])
+        return result
+    monkeypatch.setattr(plan_totals, "_drift", check_then_concurrent_write)
+    asyncio.run(verify_totals(db, "plan-1", repair=True))
+    # Setting the checked value (9) would have overwritten the concurrent +1
+    assert stored(db)["planned"] == 6.0
+
+    monkeypatch.setattr(plan_totals, "_drift", check)
+    asyncio.run(verify_totals(db, "plan-1", repair=True))
+    assert stored(db)["planned"] == 10.0
+
+def test_reclassified_products_move_their_totals(client, add_user, db):
+    seed_products(db)
+    asyncio.run(db.brands.insert_many([{"id": "brand-1", "name": "One"}, {"id": "brand-2", "name": "Two"}]))
+    asyncio.run(db.categories.insert_one({"id": "cat-1", "name": "Cat"}))
+    asyncio.run(db.subcategories.insert_one({"id": "sub-1", "name": "Sub", "category_id": "cat-1"}))
+    _, admin = add_user("SuperAdmin")
+    client.put("/api/planning-data/bulk", json={"changes": [cell(planned=4), cell("prod-2", planned=6)]}, headers=admin)
+
+    csv = "name,ean,brand,category,subcategory,price\nMoved,1,Two,Cat,Sub,1\n"
+    assert client.post("/api/products/import", files={"file": ("p.csv", csv.encode(), "text/csv")}, headers=admin).json()["updated"] == 1
+
+    assert stored(db, "brand", brand_id="brand-1")["planned"] == 0.0
+    assert stored(db, "brand", brand_id="brand-2")["planned"] == 10.0
+    assert asyncio.run(verify_totals(db, "plan-1"))["drifted"] == 0
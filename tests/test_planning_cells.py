@@ -0,0 +1,73 @@
+"""One row per (plan, department, product) cell: bulk upserts, duplicate creates and merging old duplicates"""
+import asyncio
+import uuid
+
+import pytest
+
+import migrations
+from migrations import DuplicatePlanningCells, ensure_unique_cells, merge_duplicate_cells
+from plan_totals import verify_totals
+
+def cell(plan_id="plan-1", department_id="dept-1", product_id="prod-1", **values):
+    return {"plan_id": plan_id, "department_id": department_id, "product_id": product_id, **values}
+
+def test_bulk_upsert_inserts_then_updates(client, add_user, db):
+    _, admin = add_user("SuperAdmin")
+    first = client.put("/api/planning-data/bulk", json={"changes": [cell(planned=10), cell(product_id="prod-2", planned=5)]}, headers=admin).json()
+    assert (first["inserted_count"], first["updated_count"], first["error_count"]) == (2, 0, 0)
+
+    second = client.put("/api/planning-data/bulk", json={"changes": [cell(planned=12), cell(planned=1), cell(product_id="prod-3")]}, headers=admin).json()
+    assert [row["result"] for row in second["results"]] == ["updated", "error", "error"]
+    assert [row["error"] for row in second["results"][1:]] == ["Duplicate change in batch", "Nothing to update"]
+
+    rows = {row["product_id"]: row for row in asyncio.run(db.planning_data.find({}, {"_id": 0}).to_list(length=None))}
+    assert len(rows) == 2
+    assert (rows["prod-1"]["planned"], rows["prod-1"]["version"], rows["prod-1"]["status"]) == (12, 1, "pending")
+    assert (rows["prod-2"]["planned"], rows["prod-2"]["version"], rows["prod-2"]["actual"]) == (5, 0, 0.0)
+    assert rows["prod-1"]["id"] == first["results"][0]["id"]
+
+def test_duplicate_create_is_a_conflict(client, add_user, db):
+    _, admin = add_user("SuperAdmin")
+    asyncio.run(ensure_unique_cells(db))
+    assert client.post("/api/planning-data", json=cell(planned=3), headers=admin).status_code == 200
+    response = client.post("/api/planning-data", json=cell(planned=4), headers=admin)
+    assert response.status_code == 409
+    assert asyncio.run(db.planning_data.count_documents({})) == 1
+
+def seed_duplicates(db):
+    rows = [
+        cell(id="old", planned=10.0, actual=1.0, version=0, updated_at="2025-01-01T00:00:00+00:00"),
+        cell(id="new", planned=5.0, actual=None, version=2, updated_at="2025-02-01T00:00:00+00:00"),
+        cell(id="other", product_id="prod-2", planned=7.0, actual=0.0, version=0, updated_at="2025-01-01T00:00:00+00:00"),
+    ]
+    asyncio.run(db.planning_data.insert_many(rows))
+    asyncio.run(verify_totals(db, "plan-1", repair=True))
+
+def test_startup_refuses_duplicate_cells(db):
+    seed_duplicates(db)
+    with pytest.raises(DuplicatePlanningCells):
+        asyncio.run(ensure_unique_cells(db))
+    assert asyncio.run(db.planning_data.count_documents({})) == 3
+
+def test_merge_dry_run_changes_nothing(db):
+    seed_duplicates(db)
+    report = asyncio.run(merge_duplicate_cells(db))
+    assert (report["applied"], report["cells"], report["duplicate_rows"], report["merged"]) == (False, 1, 1, 0)
+    assert report["details"][0]["keep"] == "new" and report["details"][0]["merge"] == ["old"]
+    assert asyncio.run(db.planning_data.count_documents({})) == 3
+
+def test_merge_sums_into_newest_row_and_keeps_an_audit_copy(db):
+    seed_duplicates(db)
+    report = asyncio.run(merge_duplicate_cells(db, apply=True))
+    assert report["merged"] == 1
+
+    rows = asyncio.run(db.planning_data.find({"product_id": "prod-1"}, {"_id": 0}).to_list(length=None))
+    assert len(rows) == 1
+    assert (rows[0]["id"], rows[0]["planned"], rows[0]["actual"], rows[0]["version"]) == ("new", 15.0, 1.0, 3)
+    archived = asyncio.run(db[migrations.MERGED_COLLECTION].find_one({"id": "old"}))
+    assert archived["merged_into"] == "new" and archived["planned"] == 10.0
+
+    # Figures are unchanged and the row count follows the merge
+    assert asyncio.run(verify_totals(db, "plan-1"))["drifted"] == 0
+    asyncio.run(ensure_unique_cells(db))
+    assert asyncio.run(db.planning_data.index_information())[migrations.CELL_INDEX]["unique"]
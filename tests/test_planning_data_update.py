@@ -0,0 +1,36 @@
+"""Planning cell updates: If-Match guards against lost updates and every write bumps the version"""
+import asyncio
+
+from plan_totals import total_id
+
+def cell(**values):
+    return {"plan_id": "plan-1", "department_id": "dept-1", "product_id": "prod-1", **values}
+
+def test_if_match_bumps_version_and_rejects_stale_writes(client, add_user, db):
+    _, admin = add_user("SuperAdmin")
+    created = client.post("/api/planning-data", json=cell(planned=10), headers=admin).json()
+    url = f"/api/planning-data/{created['id']}"
+    version = created["version"]
+
+    response = client.put(url, json={"planned": 12}, headers={**admin, "If-Match": f'"{version}"'})
+    assert response.status_code == 200
+    assert response.json()["version"] == version + 1
+    assert response.headers["ETag"] == f'"{version + 1}"'
+
+    # A second writer still holding the old version loses, and is told the current one
+    stale = client.put(url, json={"planned": 99}, headers={**admin, "If-Match": f'"{version}"'})
+    assert stale.status_code == 409
+    assert stale.headers["ETag"] == f'"{version + 1}"'
+    assert asyncio.run(db.planning_data.find_one({"id": created["id"]}))["planned"] == 12
+
+    # Without If-Match the write is unconditional
+    assert client.put(url, json={"actual": 1}, headers=admin).json()["version"] == version + 2
+
+def test_update_of_a_cell_with_null_values(client, add_user, db):
+    _, admin = add_user("SuperAdmin")
+    asyncio.run(db.planning_data.insert_one(cell(id="cell-1", planned=None, actual=None)))
+
+    response = client.put("/api/planning-data/cell-1", json={"planned": 4, "actual": 2}, headers=admin)
+    assert response.status_code == 200
+    totals = asyncio.run(db.plan_totals.find_one({"_id": total_id("plan", "plan-1", {})}))
+    assert (totals["planned"], totals["actual"]) == (4.0, 2.0)
@@ -0,0 +1,37 @@
+"""Cached principals: a user change on another worker is picked up once the shared version refreshes"""
+import asyncio
+
+import server
+
+def test_role_downgrade_on_another_worker(client, add_user, db, monkeypatch):
+    monkeypatch.setattr(server.reference_cache, "version_ttl", 60)
+    user, headers = add_user("Admin")
+    assert client.get("/api/users", headers=headers).status_code == 200
+
+    # What update_user on another worker writes
+    async def downgrade():
+        await db.users.update_one({"id": user["id"]}, {"$set": {"role": "User"}})
+        await db.ref_versions.update_one({"_id": "principals"}, {"$inc": {"version": 1}}, upsert=True)
+    asyncio.run(downgrade())
+
+    # Served from the cache until this worker re-reads the version, REFERENCE_VERSION_TTL at most
+    assert client.get("/api/users", headers=headers).status_code == 200
+    monkeypatch.setattr(server.reference_cache, "version_ttl", 0)
+    assert client.get("/api/users", headers=headers).status_code == 403
+    assert server.principal_cache.stats()["version"] == 1
+
+def test_update_user_bumps_the_shared_version(client, add_user, db):
+    _, admin = add_user("SuperAdmin")
+    user, _ = add_user("User")
+    assert client.put(f"/api/users/{user['id']}", json={"role": "Admin"}, headers=admin).status_code == 200
+    assert asyncio.run(db.ref_versions.find_one({"_id": "principals"}))["version"] == 1
+
+def test_sync_drops_entries_only_when_the_version_moves():
+    cache = server.PrincipalCache()
+    cache.sync(3)
+    cache.put("token", "user")
+    cache.sync(3)
+    assert cache.get("token") == "user"
+    cache.sync(4)
+    assert cache.get("token") is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,65 @@
+"""Product creation and CSV import: row validation errors and duplicate EAN codes"""
+import asyncio
+
+import pytest
+
+from indexes import ensure_indexes
+
+HEADER = "name,ean,brand,category,subcategory,price\n"
+
+@pytest.fixture
+def catalog(db):
+    asyncio.run(ensure_indexes(db))
+    asyncio.run(db.brands.insert_one({"id": "brand-1", "name": "Acme", "short_name": "ACM"}))
+    asyncio.run(db.categories.insert_one({"id": "cat-1", "name": "Snacks", "code": "SNK"}))
+    asyncio.run(db.subcategories.insert_many([
+        {"id": "sub-1", "name": "Chips", "code": "CHP", "category_id": "cat-1"},
+        {"id": "sub-2", "name": "Soda", "code": "SOD", "category_id": "cat-2"},
+    ]))
+    return db
+
+def upload(client, headers, body, filename="products.csv"):
+    return client.post("/api/products/import", files={"file": (filename, body.encode(), "text/csv")}, headers=headers)
+
+def test_create_product_with_duplicate_ean_is_a_conflict(client, add_user, catalog):
+    _, admin = add_user("SuperAdmin")
+    product = {"name": "Chips", "ean_code": "4001", "brand_id": "brand-1", "category_id": "cat-1", "subcategory_id": "sub-1", "mrp": 2.5}
+    assert client.post("/api/products", json=product, headers=admin).status_code == 200
+    response = client.post("/api/products", json={**product, "name": "Other"}, headers=admin)
+    assert response.status_code == 409
+    assert asyncio.run(catalog.products.count_documents({})) == 1
+
+def test_import_reports_row_errors_and_keeps_the_valid_rows(client, add_user, catalog):
+    _, admin = add_user("SuperAdmin")
+    body = HEADER + "\n".join([
+        "Salted,4001,Acme,Snacks,Chips,2.5",
+        "Salted v2,4001,ACM,SNK,CHP,2.75",      # repeated EAN: the later row wins
+        "Nameless,4002,Acme,Snacks,Chips,",     # missing price
+        "Cola,4003,Nope,Snacks,Chips,1",        # unknown brand
+        "Cola,4004,Acme,Snacks,sub-2,1",        # subcategory of another category
+        "Cola,4005,Acme,Snacks,Chips,cheap",    # not a number
+    ])
+    report = upload(client, admin, body).json()
+
+    assert (report["rows"], report["inserted"], report["failed"], report["duplicates"]) == (6, 1, 4, 1)
+    assert {error["row"]: error["ean_code"] for error in report["errors"]} == {4: "4002", 5: "4003", 6: "4004", 7: "4005"}
+    assert "mrp" in report["errors"][0]["error"]
+    assert "Unknown brand" in report["errors"][1]["error"]
+    assert "does not belong" in report["errors"][2]["error"]
+    product = asyncio.run(catalog.products.find_one({"ean_code": "4001"}))
+    assert (product["name"], product["mrp"], product["brand_id"], product["subcategory_id"]) == ("Salted v2", 2.75, "brand-1", "sub-1")
+
+def test_import_updates_existing_products_on_ean(client, add_user, catalog):
+    _, admin = add_user("SuperAdmin")
+    upload(client, admin, HEADER + "Salted,4001,Acme,Snacks,Chips,2.5\n")
+    product_id = asyncio.run(catalog.products.find_one({"ean_code": "4001"}))["id"]
+
+    report = upload(client, admin, HEADER + "Salted,4001,Acme,Snacks,Chips,3\nSalted,4001,Acme,Snacks,Chips,3\n").json()
+    assert (report["inserted"], report["updated"], report["duplicates"]) == (0, 1, 1)
+    product = asyncio.run(catalog.products.find_one({"ean_code": "4001"}))
+    assert (product["id"], product["mrp"]) == (product_id, 3.0)
+
+def test_import_rejects_unreadable_uploads(client, add_user, catalog):
+    _, admin = add_user("SuperAdmin")
+    assert upload(client, admin, "name,ean\nx,1\n").json()["detail"].startswith("Missing columns")
+    assert upload(client, admin, HEADER, filename="products.txt").status_code == 400
@@ -0,0 +1,42 @@
+"""Product search reloads: the new index is built off the loop and swapped in whole"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import product_search
+from product_search import ProductSearch
+
+PRODUCTS = [
+    {"id": "p1", "name": "Salted Chips", "ean_code": "8901000000011", "brand_id": "brand-1"},
+    {"id": "p2", "name": "Cola Zero", "ean_code": "8901000000028", "brand_id": "brand-2"},
+]
+
+def test_reload_swaps_in_a_new_index_and_replays_writes(db, monkeypatch):
+    search = ProductSearch()
+    build = product_search._build
+
+    def build_while_writing(products):
+        # Lands on the old index and must be replayed onto the new one
+        search.upsert({"id": "p3", "name": "Salted Peanuts", "ean_code": "8901000000035"})
+        return build(products)
+
+    async def run():
+        await db.products.insert_many([dict(product) for product in PRODUCTS])
+        assert not search.ready and search.search("salted") == []
+        await search.load(db)
+        first = search.index
+        assert [hit["id"] for hit in search.search("salted")] == ["p1"]
+
+        monkeypatch.setattr(product_search, "_build", build_while_writing)
+        await db.products.delete_one({"id": "p2"})
+        await search.load(db)
+        return first
+
+    first = asyncio.run(run())
+    assert search.index is not first
+    assert len(first) == 0
+    assert [hit["id"] for hit in search.search("salted")] == ["p1", "p3"]
+    assert search.search("cola") == []
+    assert search.stats()["products"] == 2
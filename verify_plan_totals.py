@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Recompute plan_totals from planning_data and report drift.
+
+Totals are updated right after each planning_data write; a worker that dies between the two leaves
+them off. Run this with --repair from one scheduled job (e.g. an hourly cron), not from every API
+worker: drift is re-checked after --settle seconds and only drift that held still is repaired.
+
+Usage:
+    python verify_plan_totals.py [--plan-id PLAN] [--repair] [--settle SECONDS]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent / 'backend'
+load_dotenv(ROOT_DIR / '.env')
+sys.path.insert(0, str(ROOT_DIR))
+
+from plan_totals import verify_totals  # noqa: E402
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url)
+db = client[os.environ['DB_NAME']]
+
+async def main(plan_id, repair, settle):
+    try:
+        report = await verify_totals(db, plan_id, repair, settle=settle)
+        print(f"Checked {report['checked']} totals, {report['drifted']} drifted")
+        for item in report["drift"]:
+            print(json.dumps(item))
+        if repair and report["drifted"]:
+            print("Drifted totals repaired")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or rebuild the plan_totals collection")
+    parser.add_argument("--plan-id", help="Only check one plan")
+    parser.add_argument("--repair", action="store_true", help="Rewrite drifted totals")
+    parser.add_argument("--settle", type=float, default=5, help="Seconds drift must hold still before it is repaired")
+    args = parser.parse_args()
+    asyncio.run(main(args.plan_id, args.repair, args.settle))